@@ -0,0 +1,168 @@
+from typing import Iterable
+
+from jorm.market.infrastructure import Category, Marketplace, Niche, Product, Warehouse
+from jorm.market.service import (
+    SimpleEconomySaveObject,
+    TransitEconomySaveObject,
+)
+from jorm.support.calculation import (
+    GreenTradeZoneCalculateResult,
+    NicheCharacteristicsCalculateResult,
+)
+from jorm.support.types import EconomyConstants
+
+from jarvis_db.access.jorm_collector_impl import JormCollectorImpl
+from jarvis_db.cache.niche_dashboard.niche_dashboard_service import NicheDashboard
+from jarvis_db.core.async_service import AsyncService
+
+
+class AsyncJormCollectorImpl:
+    def __init__(self, collector: AsyncService[JormCollectorImpl]):
+        self.__collector = collector
+
+    async def get_economy_constants(
+        self, marketplace_id: int
+    ) -> EconomyConstants | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_economy_constants(marketplace_id)
+        )
+
+    async def get_all_marketplaces(self) -> dict[int, Marketplace]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_marketplaces()
+        )
+
+    async def get_all_marketplaces_atomic(self) -> dict[int, Marketplace]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_marketplaces_atomic()
+        )
+
+    async def get_all_categories(self, marketplace_id: int) -> dict[int, Category]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_categories(marketplace_id)
+        )
+
+    async def get_all_categories_atomic(
+        self, marketplace_id: int
+    ) -> dict[int, Category]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_categories_atomic(marketplace_id)
+        )
+
+    async def get_all_niches(self, category_id: int) -> dict[int, Niche]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_niches(category_id)
+        )
+
+    async def get_all_niches_atomic(self, category_id: int) -> dict[int, Niche]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_niches_atomic(category_id)
+        )
+
+    async def get_niche(
+        self, niche_name: str, category_id: int, marketplace_id: int
+    ) -> Niche | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_niche(
+                niche_name, category_id, marketplace_id
+            )
+        )
+
+    async def get_niche_by_id(self, niche_id: int) -> Niche | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_niche_by_id(niche_id)
+        )
+
+    async def get_niche_without_history(self, niche_id: int) -> Niche | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_niche_without_history(niche_id)
+        )
+
+    async def get_niche_characteristics_cache(
+        self, niche_id: int
+    ) -> NicheCharacteristicsCalculateResult | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_niche_characteristics_cache(niche_id)
+        )
+
+    async def get_niche_characteristics_caches(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, NicheCharacteristicsCalculateResult]:
+        niche_ids = list(niche_ids)
+        return await self.__collector.run(
+            lambda collector: collector.get_niche_characteristics_caches(niche_ids)
+        )
+
+    async def get_niche_dashboard(self, category_id: int) -> dict[int, NicheDashboard]:
+        return await self.__collector.run(
+            lambda collector: collector.get_niche_dashboard(category_id)
+        )
+
+    async def get_warehouse(self, warehouse_id: int) -> Warehouse | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_warehouse(warehouse_id)
+        )
+
+    async def get_all_warehouses(self, marketplace_id: int) -> dict[int, Warehouse]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_warehouses(marketplace_id)
+        )
+
+    async def get_all_warehouses_atomic(
+        self, marketplace_id: int
+    ) -> dict[int, Warehouse]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_warehouses_atomic(marketplace_id)
+        )
+
+    async def get_products_by_user(
+        self, user_id: int, marketplace_id: int
+    ) -> dict[int, Product]:
+        return await self.__collector.run(
+            lambda collector: collector.get_products_by_user(user_id, marketplace_id)
+        )
+
+    async def get_products_by_user_atomic(
+        self, user_id: int, marketplace_id: int
+    ) -> dict[int, Product]:
+        return await self.__collector.run(
+            lambda collector: collector.get_products_by_user_atomic(
+                user_id, marketplace_id
+            )
+        )
+
+    async def get_users_warehouses(
+        self, user_id: int, marketplace_id: int
+    ) -> dict[int, Warehouse]:
+        return await self.__collector.run(
+            lambda collector: collector.get_users_warehouses(user_id, marketplace_id)
+        )
+
+    async def get_all_simple_economy_results(
+        self, user_id: int
+    ) -> list[SimpleEconomySaveObject]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_simple_economy_results(user_id)
+        )
+
+    async def get_all_transit_economy_results(
+        self, user_id: int
+    ) -> list[TransitEconomySaveObject]:
+        return await self.__collector.run(
+            lambda collector: collector.get_all_transit_economy_results(user_id)
+        )
+
+    async def get_green_zone_cache(
+        self, niche_id: int
+    ) -> GreenTradeZoneCalculateResult | None:
+        return await self.__collector.run(
+            lambda collector: collector.get_green_zone_cache(niche_id)
+        )
+
+    async def get_green_zone_caches(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, GreenTradeZoneCalculateResult]:
+        niche_ids = list(niche_ids)
+        return await self.__collector.run(
+            lambda collector: collector.get_green_zone_caches(niche_ids)
+        )
@@ -0,0 +1,79 @@
+from enum import Enum
+from typing import Callable, Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.fill.niche_fill_pipeline import NicheFillCheckpoint
+from jarvis_db.core.upsert import upsert
+from jarvis_db.schemas import FillCheckpoint
+
+
+class FillUnitType(Enum):
+    CATEGORY = "category"
+    NICHE = "niche"
+
+
+class FillCheckpointService:
+    def __init__(self, session: Session, job_name: str):
+        self.__session = session
+        self.__job_name = job_name
+
+    def find_completed(
+        self, unit_type: FillUnitType, unit_ids: Iterable[int] | None = None
+    ) -> set[int]:
+        statement = (
+            select(FillCheckpoint.unit_id)
+            .where(FillCheckpoint.job_name == self.__job_name)
+            .where(FillCheckpoint.unit_type == unit_type.value)
+        )
+        if unit_ids is not None:
+            statement = statement.where(FillCheckpoint.unit_id.in_(list(unit_ids)))
+        return set(self.__session.execute(statement).scalars())
+
+    def mark_completed(self, unit_type: FillUnitType, unit_ids: Iterable[int]) -> None:
+        values = [
+            {
+                "job_name": self.__job_name,
+                "unit_type": unit_type.value,
+                "unit_id": unit_id,
+            }
+            for unit_id in unit_ids
+        ]
+        upsert(
+            self.__session,
+            FillCheckpoint,
+            values,
+            index_elements=[
+                FillCheckpoint.job_name,
+                FillCheckpoint.unit_type,
+                FillCheckpoint.unit_id,
+            ],
+        )
+        self.__session.flush()
+
+    def clear(self, unit_type: FillUnitType | None = None) -> int:
+        statement = delete(FillCheckpoint).where(
+            FillCheckpoint.job_name == self.__job_name
+        )
+        if unit_type is not None:
+            statement = statement.where(FillCheckpoint.unit_type == unit_type.value)
+        return self.__session.execute(statement).rowcount
+
+
+class TableNicheFillCheckpoint(NicheFillCheckpoint):
+    def __init__(self, session_factory: Callable[[], Session], job_name: str):
+        self.__session_factory = session_factory
+        self.__job_name = job_name
+
+    def load(self) -> set[int]:
+        with self.__session_factory() as session:
+            return FillCheckpointService(session, self.__job_name).find_completed(
+                FillUnitType.CATEGORY
+            )
+
+    def save(self, category_ids: Iterable[int]) -> None:
+        with self.__session_factory() as session, session.begin():
+            FillCheckpointService(session, self.__job_name).mark_completed(
+                FillUnitType.CATEGORY, category_ids
+            )
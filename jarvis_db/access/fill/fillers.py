@@ -57,5 +57,5 @@ class StandardDbFiller(ABC):
         pass
 
     @abstractmethod
-    def check_warehouse_filled(self, products: list[Product]):
+    def check_warehouse_filled(self, products: list[Product]) -> dict[int, int]:
         pass
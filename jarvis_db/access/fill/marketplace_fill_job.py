@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable
+
+from jorm.market.items import Product
+from jorm.server.providers.providers import DataProviderWithoutKey
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.fill.fill_checkpoint_service import (
+    FillCheckpointService,
+    FillUnitType,
+    TableNicheFillCheckpoint,
+)
+from jarvis_db.access.fill.fillers import StandardDbFiller
+from jarvis_db.access.fill.niche_fill_pipeline import (
+    NicheFillPipeline,
+    NicheFillProgress,
+)
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetcher
+from jarvis_db.market.infrastructure.category.category_service import CategoryService
+from jarvis_db.market.infrastructure.niche.niche_service import NicheService
+from jarvis_db.market.items.product_card.product_card_service import ProductCardService
+
+
+@dataclass(frozen=True)
+class MarketplaceFillProgress:
+    niches_total: int = 0
+    niches_done: int = 0
+    niches_skipped: int = 0
+    products_upserted: int = 0
+
+
+class MarketplaceFillJob:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        filler_factory: Callable[[Session], StandardDbFiller],
+        category_service_factory: Callable[[Session], CategoryService],
+        niche_service_factory: Callable[[Session], NicheService],
+        product_card_service_factory: Callable[[Session], ProductCardService],
+        data_provider_without_key: DataProviderWithoutKey,
+        marketplace_id: int,
+        job_name: str = "marketplace_fill",
+        fetch_policy: FetchPolicy = FetchPolicy(max_workers=4),
+        niches_per_commit: int = 1,
+        progress_callback: Callable[[MarketplaceFillProgress], None] | None = None,
+    ):
+        self.__session_factory = session_factory
+        self.__filler_factory = filler_factory
+        self.__category_service_factory = category_service_factory
+        self.__niche_service_factory = niche_service_factory
+        self.__product_card_service_factory = product_card_service_factory
+        self.__data_provider_without_key = data_provider_without_key
+        self.__marketplace_id = marketplace_id
+        self.__job_name = job_name
+        self.__fetch_policy = fetch_policy
+        self.__niches_per_commit = niches_per_commit
+        self.__progress_callback = progress_callback
+
+    def run(
+        self, niche_num: int = -1, product_num: int = -1
+    ) -> MarketplaceFillProgress:
+        self.fill_structure(niche_num)
+        return self.fill_products(product_num=product_num)
+
+    def fill_structure(
+        self, niche_num: int = -1, category_num: int = -1
+    ) -> NicheFillProgress:
+        with self.__session_factory() as session, session.begin():
+            self.__filler_factory(session).fill_categories(
+                self.__category_service_factory(session),
+                self.__data_provider_without_key,
+                category_num,
+            )
+        return NicheFillPipeline(
+            self.__session_factory,
+            self.__category_service_factory,
+            self.__niche_service_factory,
+            self.__data_provider_without_key,
+            self.__marketplace_id,
+            checkpoint=TableNicheFillCheckpoint(
+                self.__session_factory, self.__job_name
+            ),
+            fetch_policy=self.__fetch_policy,
+        ).run(niche_num)
+
+    def split_niche_ranges(self, parts: int) -> list[tuple[int, int]]:
+        with self.__session_factory() as session:
+            return self.__niche_service_factory(session).split_id_ranges(
+                self.__marketplace_id, parts
+            )
+
+    def fill_products(
+        self, niche_id_range: tuple[int, int] | None = None, product_num: int = -1
+    ) -> MarketplaceFillProgress:
+        with self.__session_factory() as session:
+            niches = self.__niche_service_factory(session).find_names_in_marketplace(
+                self.__marketplace_id, niche_id_range
+            )
+            completed_ids = FillCheckpointService(
+                session, self.__job_name
+            ).find_completed(FillUnitType.NICHE, niches.keys())
+        pending_niches = [
+            (niche_id, category_name, niche_name)
+            for niche_id, (category_name, niche_name) in niches.items()
+            if niche_id not in completed_ids
+        ]
+        progress = MarketplaceFillProgress(
+            niches_total=len(niches),
+            niches_skipped=len(niches) - len(pending_niches),
+        )
+        results = ProviderFetcher(self.__fetch_policy).map(
+            lambda niche: self.__fetch_products(niche, product_num), pending_niches
+        )
+        try:
+            while True:
+                done_count = 0
+                products_upserted = 0
+                with self.__session_factory() as session, session.begin():
+                    filler = self.__filler_factory(session)
+                    product_card_service = self.__product_card_service_factory(session)
+                    checkpoint_service = FillCheckpointService(session, self.__job_name)
+                    for (niche_id, _, _), products in islice(
+                        results, self.__niches_per_commit
+                    ):
+                        if products:
+                            warehouse_ids = filler.check_warehouse_filled(products)
+                            products_upserted += len(
+                                product_card_service.upsert_products(
+                                    products, [niche_id], warehouse_ids=warehouse_ids
+                                )
+                            )
+                        checkpoint_service.mark_completed(
+                            FillUnitType.NICHE, [niche_id]
+                        )
+                        done_count += 1
+                if done_count == 0:
+                    return progress
+                progress = MarketplaceFillProgress(
+                    niches_total=progress.niches_total,
+                    niches_done=progress.niches_done + done_count,
+                    niches_skipped=progress.niches_skipped,
+                    products_upserted=progress.products_upserted + products_upserted,
+                )
+                if self.__progress_callback is not None:
+                    self.__progress_callback(progress)
+        finally:
+            results.close()
+
+    def __fetch_products(
+        self, niche: tuple[int, str, str], product_num: int
+    ) -> list[Product]:
+        _, category_name, niche_name = niche
+        products_global_ids = self.__data_provider_without_key.get_products_globals_ids(
+            niche_name, product_num
+        )
+        if not products_global_ids:
+            return []
+        return self.__data_provider_without_key.get_products(
+            niche_name, category_name, products_global_ids
+        )
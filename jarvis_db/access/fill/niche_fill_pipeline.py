@@ -0,0 +1,149 @@
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable
+
+from jorm.market.infrastructure import Niche
+from jorm.server.providers.providers import DataProviderWithoutKey
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetcher
+from jarvis_db.market.infrastructure.category.category_service import CategoryService
+from jarvis_db.market.infrastructure.niche.niche_service import NicheService
+
+
+@dataclass(frozen=True)
+class NicheFillProgress:
+    categories_total: int = 0
+    categories_done: int = 0
+    categories_skipped: int = 0
+    niches_created: int = 0
+
+
+class NicheFillCheckpoint(ABC):
+    @abstractmethod
+    def load(self) -> set[int]:
+        pass
+
+    @abstractmethod
+    def save(self, category_ids: Iterable[int]) -> None:
+        pass
+
+
+class InMemoryNicheFillCheckpoint(NicheFillCheckpoint):
+    def __init__(self):
+        self.__category_ids: set[int] = set()
+
+    def load(self) -> set[int]:
+        return set(self.__category_ids)
+
+    def save(self, category_ids: Iterable[int]) -> None:
+        self.__category_ids.update(category_ids)
+
+
+class FileNicheFillCheckpoint(NicheFillCheckpoint):
+    def __init__(self, path: Path | str):
+        self.__path = Path(path)
+
+    def load(self) -> set[int]:
+        if not self.__path.exists():
+            return set()
+        with self.__path.open() as file:
+            return {
+                int(category_id) for line in file for category_id in json.loads(line)
+            }
+
+    def save(self, category_ids: Iterable[int]) -> None:
+        with self.__path.open("a") as file:
+            file.write(json.dumps(sorted(category_ids)) + "\n")
+
+
+class NicheFillPipeline:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        category_service_factory: Callable[[Session], CategoryService],
+        niche_service_factory: Callable[[Session], NicheService],
+        data_provider_without_key: DataProviderWithoutKey,
+        marketplace_id: int,
+        checkpoint: NicheFillCheckpoint | None = None,
+        fetch_policy: FetchPolicy = FetchPolicy(max_workers=4),
+        categories_per_commit: int = 10,
+        progress_callback: Callable[[NicheFillProgress], None] | None = None,
+    ):
+        self.__session_factory = session_factory
+        self.__category_service_factory = category_service_factory
+        self.__niche_service_factory = niche_service_factory
+        self.__data_provider_without_key = data_provider_without_key
+        self.__marketplace_id = marketplace_id
+        self.__checkpoint = (
+            checkpoint if checkpoint is not None else InMemoryNicheFillCheckpoint()
+        )
+        self.__fetcher = ProviderFetcher(fetch_policy)
+        self.__categories_per_commit = categories_per_commit
+        self.__progress_callback = progress_callback
+
+    def run(self, niche_num: int = -1) -> NicheFillProgress:
+        with self.__session_factory() as session:
+            categories = self.__category_service_factory(
+                session
+            ).find_all_in_marketplace(self.__marketplace_id)
+            existing_names = self.__niche_service_factory(
+                session
+            ).find_names_by_category(self.__marketplace_id)
+        completed_ids = self.__checkpoint.load()
+        pending_categories = [
+            (category_id, category.name)
+            for category_id, category in categories.items()
+            if category_id not in completed_ids
+        ]
+        progress = NicheFillProgress(
+            categories_total=len(categories),
+            categories_skipped=len(categories) - len(pending_categories),
+        )
+        results = self.__fetcher.map(
+            lambda category: self.__fetch_new_niches(
+                category, existing_names.get(category[0], set()), niche_num
+            ),
+            pending_categories,
+        )
+        try:
+            while True:
+                done_ids: list[int] = []
+                niches_created = 0
+                with self.__session_factory() as session, session.begin():
+                    niche_service = self.__niche_service_factory(session)
+                    for (category_id, _), niches in islice(
+                        results, self.__categories_per_commit
+                    ):
+                        if niches:
+                            niche_service.create_all(niches, category_id)
+                        done_ids.append(category_id)
+                        niches_created += len(niches)
+                if not done_ids:
+                    return progress
+                self.__checkpoint.save(done_ids)
+                progress = NicheFillProgress(
+                    categories_total=progress.categories_total,
+                    categories_done=progress.categories_done + len(done_ids),
+                    categories_skipped=progress.categories_skipped,
+                    niches_created=progress.niches_created + niches_created,
+                )
+                if self.__progress_callback is not None:
+                    self.__progress_callback(progress)
+        finally:
+            results.close()
+
+    def __fetch_new_niches(
+        self, category: tuple[int, str], existing_names: set[str], niche_num: int
+    ) -> list[Niche]:
+        _, category_name = category
+        niches_names = self.__data_provider_without_key.get_niches_names(
+            category_name, niche_num
+        )
+        new_names = [name for name in niches_names if name not in existing_names]
+        if not new_names:
+            return []
+        return self.__data_provider_without_key.get_niches(new_names)
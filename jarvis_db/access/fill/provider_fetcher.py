@@ -0,0 +1,139 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Generator, Iterable, Iterator, TypeVar
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+class ProviderFetchError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class FetchPolicy:
+    max_workers: int = 8
+    timeout: float | None = 30.0
+    retries: int = 2
+    retry_delay: float = 0.5
+    batch_size: int = 100
+    max_pending: int | None = None
+
+
+@dataclass
+class _Attempt:
+    index: int
+    number: int
+    deadline: float | None = None
+
+
+class ProviderFetcher:
+    __poll_interval = 0.05
+
+    def __init__(self, policy: FetchPolicy = FetchPolicy()):
+        self.__policy = policy
+
+    def map(
+        self, call: Callable[[_T], _R], items: Iterable[_T]
+    ) -> Generator[tuple[_T, _R], None, None]:
+        items = list(items)
+        if not items:
+            return
+        # Timeouts count from submission, so time spent queued behind hung
+        # workers counts too; at most one call per worker is submitted so
+        # that healthy calls never wait in the executor queue.
+        max_pending = min(
+            self.__policy.max_pending or self.__policy.max_workers,
+            self.__policy.max_workers,
+        )
+        next_index = 0
+        executor = ThreadPoolExecutor(max_workers=self.__policy.max_workers)
+        try:
+            pending: dict[Future[_R], _Attempt] = {}
+            while pending or next_index < len(items):
+                while next_index < len(items) and len(pending) < max_pending:
+                    self.__submit(
+                        executor, pending, call, items, _Attempt(next_index, 0)
+                    )
+                    next_index += 1
+                done, _ = wait(
+                    pending, timeout=self.__wait_timeout(), return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    attempt = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        yield items[attempt.index], future.result()
+                    else:
+                        self.__retry(executor, pending, call, items, attempt, error)
+                for future, attempt in list(pending.items()):
+                    if not future.done() and self.__is_timed_out(attempt):
+                        del pending[future]
+                        future.cancel()
+                        timeout_error = TimeoutError(
+                            f"call timed out after {self.__policy.timeout}s"
+                        )
+                        self.__retry(
+                            executor, pending, call, items, attempt, timeout_error
+                        )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def map_batches(
+        self, call: Callable[[list[_T]], _R], items: Iterable[_T]
+    ) -> Iterator[_R]:
+        items_iterator = iter(items)
+        batches: list[list[_T]] = []
+        while batch := list(islice(items_iterator, self.__policy.batch_size)):
+            batches.append(batch)
+        for _, result in self.map(call, batches):
+            yield result
+
+    def __submit(
+        self,
+        executor: ThreadPoolExecutor,
+        pending: dict[Future[_R], _Attempt],
+        call: Callable[[_T], _R],
+        items: list[_T],
+        attempt: _Attempt,
+    ) -> None:
+        delay = 0.0
+        if attempt.number > 0:
+            delay = self.__policy.retry_delay * 2 ** (attempt.number - 1)
+        if self.__policy.timeout is not None:
+            attempt.deadline = time.monotonic() + delay + self.__policy.timeout
+
+        def run() -> _R:
+            if delay > 0:
+                time.sleep(delay)
+            return call(items[attempt.index])
+
+        pending[executor.submit(run)] = attempt
+
+    def __retry(
+        self,
+        executor: ThreadPoolExecutor,
+        pending: dict[Future[_R], _Attempt],
+        call: Callable[[_T], _R],
+        items: list[_T],
+        attempt: _Attempt,
+        error: BaseException,
+    ) -> None:
+        if attempt.number >= self.__policy.retries:
+            raise ProviderFetchError(
+                f"provider call #{attempt.index} failed "
+                f"after {attempt.number + 1} attempts"
+            ) from error
+        self.__submit(
+            executor, pending, call, items, _Attempt(attempt.index, attempt.number + 1)
+        )
+
+    def __is_timed_out(self, attempt: _Attempt) -> bool:
+        return attempt.deadline is not None and time.monotonic() > attempt.deadline
+
+    def __wait_timeout(self) -> float | None:
+        if self.__policy.timeout is None:
+            return None
+        return min(self.__poll_interval, self.__policy.timeout)
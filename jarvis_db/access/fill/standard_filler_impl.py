@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from jorm.market.infrastructure import (
     Address,
@@ -15,17 +15,29 @@ from jorm.server.providers.providers import (
 from jorm.support.constants import DEFAULT_CATEGORY_NAME
 
 from jarvis_db.access.fill.fillers import StandardDbFiller
+from jarvis_db.access.fill.provider_fetcher import ProviderFetcher
 from jarvis_db.access.fill.support.constants import NICHE_TO_CATEGORY
 from jarvis_db.market.infrastructure.category.category_service import CategoryService
 from jarvis_db.market.infrastructure.niche.niche_service import NicheService
+from jarvis_db.market.infrastructure.warehouse.warehouse_registry import (
+    WarehouseRegistry,
+)
 from jarvis_db.market.infrastructure.warehouse.warehouse_service import WarehouseService
 from jarvis_db.market.items.product_card.product_card_service import ProductCardService
 
 
 class StandardDbFillerImpl(StandardDbFiller):
-    def __init__(self, marketplace_id: int, warehouse_service: WarehouseService):
+    def __init__(
+        self,
+        marketplace_id: int,
+        warehouse_service: WarehouseService,
+        warehouse_registry: WarehouseRegistry | None = None,
+        provider_fetcher: ProviderFetcher | None = None,
+    ):
         self.__marketplace_id = marketplace_id
         self.__warehouse_service = warehouse_service
+        self.__warehouse_registry = warehouse_registry
+        self.__provider_fetcher = provider_fetcher
 
     def fill_categories(
         self,
@@ -114,23 +126,30 @@ class StandardDbFillerImpl(StandardDbFiller):
     ) -> Niche | None:
         niches: list[Niche] = data_provider_without_key.get_niches([niche_name])
         loaded_niche = niches[0]
-        loaded_products = self.__get_new_products(
+        loaded_niche.products = []
+        loaded_niche_id: int | None = None
+        for loaded_products in self.__get_new_products(
             product_card_service,
             data_provider_without_key,
             niche_name,
             DEFAULT_CATEGORY_NAME,
             product_num,
-        )
-        if len(loaded_products) == 0:
+        ):
+            if len(loaded_products) == 0:
+                continue
+            if loaded_niche_id is None:
+                niche_service.create(loaded_niche, category_id)
+                niche_tuple = niche_service.find_by_name(loaded_niche.name, category_id)
+                if niche_tuple is None:
+                    raise Exception("unexpected None niche_tuple")
+                _, loaded_niche_id = niche_tuple
+            warehouse_ids = self.check_warehouse_filled(loaded_products)
+            product_card_service.upsert_products(
+                loaded_products, [loaded_niche_id], warehouse_ids=warehouse_ids
+            )
+            loaded_niche.products.extend(loaded_products)
+        if loaded_niche_id is None:
             return None
-        loaded_niche.products = loaded_products
-        niche_service.create(loaded_niche, category_id)
-        niche_tuple = niche_service.find_by_name(loaded_niche.name, category_id)
-        if niche_tuple is None:
-            raise Exception("unexpected None niche_tuple")
-        _, loaded_niche_id = niche_tuple
-        self.check_warehouse_filled(loaded_niche.products)
-        product_card_service.create_products(loaded_niche.products, [loaded_niche_id])
         return loaded_niche
 
     def __get_new_products(
@@ -141,7 +160,7 @@ class StandardDbFillerImpl(StandardDbFiller):
         category_name: str,
         product_number: int = -1,
         niche_id: int = -1,
-    ) -> list[Product]:
+    ) -> Iterator[list[Product]]:
         products_global_ids: set[
             int
         ] = data_provider_without_key.get_products_globals_ids(
@@ -150,8 +169,16 @@ class StandardDbFillerImpl(StandardDbFiller):
         filtered_products_globals_ids = self.__filter_product_ids(
             product_card_service, products_global_ids, niche_id
         )
-        return data_provider_without_key.get_products(
-            niche_name, category_name, filtered_products_globals_ids
+        if self.__provider_fetcher is None:
+            yield data_provider_without_key.get_products(
+                niche_name, category_name, filtered_products_globals_ids
+            )
+            return
+        yield from self.__provider_fetcher.map_batches(
+            lambda products_ids: data_provider_without_key.get_products(
+                niche_name, category_name, products_ids
+            ),
+            filtered_products_globals_ids,
         )
 
     @staticmethod
@@ -166,21 +193,31 @@ class StandardDbFillerImpl(StandardDbFiller):
             )
         return list(products_global_ids)
 
-    def check_warehouse_filled(self, products: list[Product]):
-        warehouse_ids: set[int] = set()
-        for product in products:
-            for history_unit in product.history.get_history():
-                for warehouse_id in history_unit.leftover:
-                    warehouse_ids.add(warehouse_id)
-        filtered_warehouse_global_ids = (
-            self.__warehouse_service.filter_existing_global_ids(warehouse_ids)
+    def check_warehouse_filled(self, products: list[Product]) -> dict[int, int]:
+        warehouse_ids = {
+            warehouse_id
+            for product in products
+            for history_unit in product.history.get_history()
+            for warehouse_id in history_unit.leftover
+        }
+        known_warehouse_ids = (
+            {}
+            if self.__warehouse_registry is None
+            else {
+                global_id: warehouse_id
+                for global_id, warehouse_id in self.__warehouse_registry.find_ids(
+                    self.__marketplace_id
+                ).items()
+                if global_id in warehouse_ids
+            }
         )
-        warehouse_to_add_as_unfilled: list[Warehouse] = []
-        for global_id in filtered_warehouse_global_ids:
-            warehouse_to_add_as_unfilled.append(
+        return known_warehouse_ids | self.__warehouse_service.ensure_all(
+            (
                 self.__create_warehouse_with_global_id(global_id)
-            )
-        self.__fill_warehouses(warehouse_to_add_as_unfilled)
+                for global_id in warehouse_ids - known_warehouse_ids.keys()
+            ),
+            self.__marketplace_id,
+        )
 
     @staticmethod
     def __create_warehouse_with_global_id(global_id: int) -> Warehouse:
@@ -190,7 +227,3 @@ class StandardDbFillerImpl(StandardDbFiller):
             HandlerType.MARKETPLACE,
             Address("", ""),
         )
-
-    def __fill_warehouses(self, warehouses: list[Warehouse]):
-        for warehouse in warehouses:
-            self.__warehouse_service.create_warehouse(warehouse, self.__marketplace_id)
@@ -1,3 +1,7 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Collection, Iterator
+
 from jorm.jarvis.db_update import JORMChanger
 from jorm.market.infrastructure import Category, Niche, Warehouse, HandlerType
 from jorm.market.items import Product, ProductHistory
@@ -13,6 +17,7 @@ from jorm.support.calculation import (
 from jorm.support.types import EconomyConstants
 
 from jarvis_db.access.fill.fillers import StandardDbFiller
+from jarvis_db.access.fill.provider_fetcher import ProviderFetcher
 from jarvis_db.cache.green_trade_zone.green_trade_zone_service import (
     GreenTradeZoneService,
 )
@@ -22,6 +27,7 @@ from jarvis_db.cache.niche_characteristics.niche_characteristics_service import
 from jarvis_db.market.infrastructure.category.category_service import CategoryService
 from jarvis_db.market.infrastructure.niche.niche_service import NicheService
 from jarvis_db.market.items.product_card.product_card_service import ProductCardService
+from jarvis_db.market.items.product_card_history.history_window import HistoryWindow
 from jarvis_db.market.items.product_card_history.product_history_service import (
     ProductHistoryService,
 )
@@ -51,6 +57,8 @@ class JormChangerImpl(JORMChanger):
         data_provider_without_key: DataProviderWithoutKey,
         user_market_data_provider: UserMarketDataProvider,
         standard_filler: StandardDbFiller,
+        provider_fetcher: ProviderFetcher | None = None,
+        history_window: HistoryWindow | None = None,
     ):
         self.__economy_constants_service = economy_constants_service
         self.__category_service = category_service
@@ -65,6 +73,8 @@ class JormChangerImpl(JORMChanger):
         self.__data_provider_without_key = data_provider_without_key
         self.__user_market_data_provider = user_market_data_provider
         self.__standard_filler = standard_filler
+        self.__provider_fetcher = provider_fetcher
+        self.__history_window = history_window
 
     def update_niche(
         self, niche_id: int, category_id: int, marketplace_id: int
@@ -77,7 +87,9 @@ class JormChangerImpl(JORMChanger):
         category = self.__category_service.find_by_id(category_id)
         if category is None:
             return None
-        niche_tuple = self.__niche_service.find_by_name_atomic(niche.name, category_id)
+        niche_tuple = self.__niche_service.find_by_name_atomic(
+            niche.name, category_id, self.__history_window
+        )
         if niche_tuple is None:
             return None
         niche, _ = niche_tuple
@@ -153,11 +165,8 @@ class JormChangerImpl(JORMChanger):
         user_products_in_db = self.__user_items_service.fetch_user_products(
             user_id, marketplace_id
         )
-        existing_products = [
-            user_products_in_db[product_id] for product_id in user_products_in_db
-        ]
         user_products = self.__create_and_update_user_products(
-            user_id, existing_products, user_products, marketplace_id
+            user_id, user_products_in_db, user_products, marketplace_id
         )
         return user_products
 
@@ -175,29 +184,64 @@ class JormChangerImpl(JORMChanger):
             self.__data_provider_without_key
         )
 
-    @staticmethod
     def __get_products_category_and_niche(
-        products_ids: list[int], data_provider_without_key: DataProviderWithoutKey
+        self, products_ids: list[int], data_provider_without_key: DataProviderWithoutKey
     ) -> dict[int, tuple[str, str]]:
-        result: dict[int, tuple[str, str]] = {}
-        for product_id in products_ids:
-            category_and_niche = data_provider_without_key.get_category_and_niche(
-                product_id
+        get_category_and_niche = data_provider_without_key.get_category_and_niche
+        fetched = (
+            (
+                (product_id, get_category_and_niche(product_id))
+                for product_id in products_ids
             )
-            if category_and_niche is None:
-                continue
-            result[product_id] = category_and_niche
-        return result
+            if self.__provider_fetcher is None
+            else self.__provider_fetcher.map(get_category_and_niche, products_ids)
+        )
+        return {
+            product_id: category_and_niche
+            for product_id, category_and_niche in fetched
+            if category_and_niche is not None
+        }
+
+    def __fetch_products(
+        self,
+        fetch: Callable[[Collection[int]], list[Product]],
+        products_ids: Collection[int],
+    ) -> Iterator[list[Product]]:
+        if self.__provider_fetcher is None:
+            yield fetch(products_ids)
+        else:
+            yield from self.__provider_fetcher.map_batches(fetch, products_ids)
 
     @staticmethod
     def __extract_only_new_histories(
-        old_history: ProductHistory, new_history: ProductHistory
+        old_history: ProductHistory,
+        new_history: ProductHistory,
+        history_window: HistoryWindow | None = None,
     ) -> ProductHistory:
         old_units = old_history.get_history()
         new_units = new_history.get_history()
         existing_dates = {unit.unit_date for unit in old_units}
+        # Units outside of the loaded window may already be stored,
+        # so they are never treated as new.
+        since: datetime | None = None
+        until: datetime | None = None
+        if history_window is not None:
+            since, until = history_window.since, history_window.until
+            if (
+                history_window.last_units is not None
+                and existing_dates
+                and len(existing_dates) >= history_window.last_units
+            ):
+                oldest_loaded = min(existing_dates)
+                since = oldest_loaded if since is None else max(since, oldest_loaded)
         return ProductHistory(
-            (unit for unit in new_units if unit.unit_date not in existing_dates)
+            (
+                unit
+                for unit in new_units
+                if unit.unit_date not in existing_dates
+                and (since is None or unit.unit_date >= since)
+                and (until is None or unit.unit_date < until)
+            )
         )
 
     def __update_niche(
@@ -211,31 +255,54 @@ class JormChangerImpl(JORMChanger):
             niche.name
         )
         all_products_ids.union({product.global_id for product in niche.products})
-        new_products = data_provider_without_key.get_products(
-            niche.name, category.name, all_products_ids
-        )
-        to_create, to_update = self.__split_products_to_create_and_update(
-            niche.products, new_products
-        )
-        self.__standard_filler.check_warehouse_filled(to_create)
-        self.__product_card_service.create_products(to_create, [niche_id])
-        for product in to_update:
-            product_id = self.__product_card_service.find_id_by_global_id(
-                product.global_id, niche_id
+        global_id_to_product_id: dict[int, int] | None = None
+        all_updated_products: list[Product] = []
+        for new_products in self.__fetch_products(
+            lambda products_ids: data_provider_without_key.get_products(
+                niche.name, category.name, products_ids
+            ),
+            all_products_ids,
+        ):
+            to_create, to_update = self.__split_products_to_create_and_update(
+                niche.products, new_products, self.__history_window
+            )
+            warehouse_ids = self.__standard_filler.check_warehouse_filled(to_create)
+            self.__product_card_service.upsert_products(
+                to_create, [niche_id], warehouse_ids=warehouse_ids
             )
+            if to_update:
+                if global_id_to_product_id is None:
+                    global_id_to_product_id = (
+                        self.__product_card_service.find_ids_in_niche(niche_id)
+                    )
+                self.__refresh_products(to_update, global_id_to_product_id)
+            all_updated_products.extend((*to_update, *to_create))
+        self.__niche_service.mark_updated(niche_id)
+        niche.products = all_updated_products
+        return niche
+
+    def __refresh_products(
+        self, products: list[Product], global_id_to_product_id: dict[int, int]
+    ):
+        products_with_ids: list[tuple[int, Product]] = []
+        for product in products:
+            product_id = global_id_to_product_id.get(product.global_id)
             if product_id is None:
                 raise Exception(
                     "unexpected None result"
                     f"for product with global id {product.global_id}"
                 )
-            self.__product_card_service.update(product_id, product)
-            self.__product_history_service.create(product.history, product_id)
-        all_updated_products = [*to_update, *to_create]
-        niche.products = all_updated_products
-        return niche
+            products_with_ids.append((product_id, product))
+        self.__product_card_service.update_all(products_with_ids)
+        self.__product_history_service.create_all(
+            (product_id, product.history) for product_id, product in products_with_ids
+        )
 
     def __split_products_to_create_and_update(
-        self, existing_products: list[Product], new_products: list[Product]
+        self,
+        existing_products: list[Product],
+        new_products: list[Product],
+        history_window: HistoryWindow | None = None,
     ) -> tuple[list[Product], list[Product]]:
         global_id_to_existing_product = {
             product.global_id: product for product in existing_products
@@ -250,18 +317,22 @@ class JormChangerImpl(JORMChanger):
                 product_to_update = self.__merge_products(
                     global_id_to_existing_product[global_id],
                     global_id_to_new_product[global_id],
+                    history_window,
                 )
                 to_update.append(product_to_update)
             else:
                 to_create.append(global_id_to_new_product[global_id])
         return to_create, to_update
 
-    def __merge_products(self, into: Product, new_product: Product) -> Product:
-        new_history = new_product.history.get_history()
-        if new_history:
-            into.history = self.__extract_only_new_histories(
-                into.history, new_product.history
-            )
+    def __merge_products(
+        self,
+        into: Product,
+        new_product: Product,
+        history_window: HistoryWindow | None = None,
+    ) -> Product:
+        into.history = self.__extract_only_new_histories(
+            into.history, new_product.history, history_window
+        )
         into.name = new_product.name
         into.width = new_product.width
         into.height = new_product.height
@@ -275,63 +346,65 @@ class JormChangerImpl(JORMChanger):
     def __create_and_update_user_products(
         self,
         user_id: int,
-        existing_products: list[Product],
+        existing_products: dict[int, Product],
         new_products: list[Product],
         marketplace_id: int,
     ) -> list[Product]:
+        global_id_to_product_id = {
+            product.global_id: product_id
+            for product_id, product in existing_products.items()
+        }
         to_create, to_update = self.__split_products_to_create_and_update(
-            existing_products, new_products
+            list(existing_products.values()), new_products
         )
-        self.__standard_filler.check_warehouse_filled(to_create)
+        to_create = [product for product in to_create if product.category_niche_list]
+        warehouse_ids = self.__standard_filler.check_warehouse_filled(to_create)
+        niche_ids = self.__ensure_products_niches(to_create, marketplace_id)
+        niche_id_to_products: dict[int, list[Product]] = defaultdict(list)
         for product in to_create:
-            niche_id: int = self.__get_niche_id_for_product(product, marketplace_id)
-            product_id = self.__product_card_service.create_product(product, [niche_id])
-            self.__user_items_service.append_product(user_id, product_id)
-        for product in to_update:
-            category_name = product.category_niche_list[0][0]
-            niche_name = product.category_niche_list[0][1]
-            found_info: tuple[Category, int] = self.__category_service.find_by_name(
-                category_name, marketplace_id
+            category_name, niche_name = product.category_niche_list[0]
+            niche_id_to_products[niche_ids[(category_name, niche_name)]].append(product)
+        created_ids: list[int] = []
+        for niche_id, products in niche_id_to_products.items():
+            created_ids.extend(
+                self.__product_card_service.upsert_products(
+                    products, [niche_id], warehouse_ids=warehouse_ids
+                ).values()
             )
-            if found_info is None:
-                continue
-            category_id: int = found_info[1]
-            found_info: tuple[Niche, int] = self.__niche_service.find_by_name(
-                niche_name, category_id
+        self.__user_items_service.append_products(user_id, created_ids)
+        if to_update:
+            self.__product_card_service.update_all(
+                (global_id_to_product_id[product.global_id], product)
+                for product in to_update
             )
-            if found_info is None:
-                continue
-            niche_id: int = found_info[1]
-            product_id = self.__product_card_service.find_id_by_global_id(
-                product.global_id, niche_id
-            )
-            if product_id is None:
-                continue
-            self.__product_card_service.update(product_id, product)
         return [*to_create, *to_update]
 
-    def __get_niche_id_for_product(self, product: Product, marketplace_id: int) -> int:
-        category_name = product.category_niche_list[0][0]
-        niche_name = product.category_niche_list[0][1]
-        found_info = self.__category_service.find_by_name(
-            category_name, marketplace_id
-        )
-        if found_info is None:
-            self.__category_service.create(Category(category_name), marketplace_id=marketplace_id)
-            found_info: tuple[Category, int] = self.__category_service.find_by_name(
-                category_name, marketplace_id
+    def __ensure_products_niches(
+        self, products: list[Product], marketplace_id: int
+    ) -> dict[tuple[str, str], int]:
+        category_niche_names = {
+            (category_name, niche_name)
+            for category_name, niche_name in (
+                product.category_niche_list[0] for product in products
             )
-        category_id: int = found_info[1]
-        found_info: tuple[Niche, int] = self.__niche_service.find_by_name(
-            niche_name, category_id
+        }
+        category_ids = self.__category_service.ensure_all(
+            (Category(category_name) for category_name, _ in category_niche_names),
+            marketplace_id,
         )
-        if found_info is None:
-            self.__niche_service.create(Niche(niche_name, self.__create_empty_commissions(), 0),
-                                        category_id=category_id)
-            found_info: tuple[Niche, int] = self.__niche_service.find_by_name(
-                niche_name, category_id
+        niche_ids = self.__niche_service.ensure_all(
+            (
+                category_ids[category_name],
+                Niche(niche_name, self.__create_empty_commissions(), 0),
             )
-        return found_info[1]
+            for category_name, niche_name in category_niche_names
+        )
+        return {
+            (category_name, niche_name): niche_ids[
+                (category_ids[category_name], niche_name)
+            ]
+            for category_name, niche_name in category_niche_names
+        }
 
     @staticmethod
     def __create_empty_commissions() -> dict[HandlerType, float]:
@@ -347,7 +420,13 @@ class JormChangerImpl(JORMChanger):
         data_provider_without_key: DataProviderWithoutKey,
     ) -> list[Product]:
         products_global_ids: list[int] = user_market_data_provider.get_user_products()
-        base_products = data_provider_without_key.get_base_products(products_global_ids)
+        base_products = [
+            product
+            for products in self.__fetch_products(
+                data_provider_without_key.get_base_products, products_global_ids
+            )
+            for product in products
+        ]
         products_id_to_cat_niche_name = self.__get_products_category_and_niche(
             [product.global_id for product in base_products], data_provider_without_key
         )
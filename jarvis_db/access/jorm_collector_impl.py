@@ -1,3 +1,5 @@
+from typing import Iterable
+
 from jorm.jarvis.db_access import JORMCollector
 from jorm.market.infrastructure import Category, Marketplace, Niche, Product, Warehouse
 from jorm.market.service import (
@@ -14,12 +16,17 @@ from jarvis_db.cache.green_trade_zone.green_trade_zone_service import GreenTrade
 from jarvis_db.cache.niche_characteristics.niche_characteristics_service import (
     NicheCharacteristicsService,
 )
+from jarvis_db.cache.niche_dashboard.niche_dashboard_service import (
+    NicheDashboard,
+    NicheDashboardService,
+)
 from jarvis_db.market.infrastructure.category.category_service import CategoryService
 from jarvis_db.market.infrastructure.marketplace.marketplace_service import (
     MarketplaceService,
 )
 from jarvis_db.market.infrastructure.niche.niche_service import NicheService
 from jarvis_db.market.infrastructure.warehouse.warehouse_service import WarehouseService
+from jarvis_db.market.items.product_card_history.history_window import HistoryWindow
 from jarvis_db.market.person.user.user_items_service import UserItemsService
 from jarvis_db.market.service.economy_constants.economy_constants_service import (
     EconomyConstantsService,
@@ -43,6 +50,8 @@ class JormCollectorImpl(JORMCollector):
         user_items_service: UserItemsService,
         niche_characteristics_service: NicheCharacteristicsService,
         green_trade_zone_service: GreenTradeZoneService,
+        niche_dashboard_service: NicheDashboardService | None = None,
+        history_window: HistoryWindow | None = None,
     ):
         self.__marketplace_service = marketplace_service
         self.__economy_constants_service = economy_constants_service
@@ -54,6 +63,8 @@ class JormCollectorImpl(JORMCollector):
         self.__user_items_service = user_items_service
         self.__niche_characteristics_service = niche_characteristics_service
         self.__green_trade_zone_service = green_trade_zone_service
+        self.__niche_dashboard_service = niche_dashboard_service
+        self.__history_window = history_window
 
     def get_economy_constants(self, marketplace_id: int) -> EconomyConstants | None:
         return self.__economy_constants_service.find_by_marketplace_id(marketplace_id)
@@ -74,19 +85,23 @@ class JormCollectorImpl(JORMCollector):
         return self.__niche_service.find_all_in_category(category_id)
 
     def get_all_niches_atomic(self, category_id: int) -> dict[int, Niche]:
-        return self.__niche_service.fetch_all_in_category_atomic(category_id)
+        return self.__niche_service.fetch_all_in_category_atomic(
+            category_id, self.__history_window
+        )
 
     def get_niche(
         self, niche_name: str, category_id: int, marketplace_id: int
     ) -> Niche | None:
-        niche_tuple = self.__niche_service.find_by_name_atomic(niche_name, category_id)
+        niche_tuple = self.__niche_service.find_by_name_atomic(
+            niche_name, category_id, self.__history_window
+        )
         if niche_tuple is None:
             return None
         niche, _ = niche_tuple
         return niche
 
     def get_niche_by_id(self, niche_id: int) -> Niche | None:
-        return self.__niche_service.fetch_by_id_atomic(niche_id)
+        return self.__niche_service.fetch_by_id_atomic(niche_id, self.__history_window)
 
     def get_niche_without_history(self, niche_id: int) -> Niche | None:
         return self.__niche_service.find_by_id_without_histories(niche_id)
@@ -96,6 +111,30 @@ class JormCollectorImpl(JORMCollector):
     ) -> NicheCharacteristicsCalculateResult | None:
         return self.__niche_characteristics_service.find_by_niche_id(niche_id)
 
+    def get_niche_characteristics_caches(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, NicheCharacteristicsCalculateResult]:
+        return self.__niche_characteristics_service.find_by_niche_ids(niche_ids)
+
+    def get_niche_dashboard(self, category_id: int) -> dict[int, NicheDashboard]:
+        if self.__niche_dashboard_service is not None:
+            return self.__niche_dashboard_service.find_all_in_category(category_id)
+        niches = self.__niche_service.find_all_in_category(category_id)
+        characteristics = self.__niche_characteristics_service.find_by_niche_ids(
+            niches.keys()
+        )
+        green_trade_zones = self.__green_trade_zone_service.find_by_niche_ids(
+            niches.keys()
+        )
+        return {
+            niche_id: NicheDashboard(
+                niche=niche,
+                characteristics=characteristics.get(niche_id),
+                green_trade_zone=green_trade_zones.get(niche_id),
+            )
+            for niche_id, niche in niches.items()
+        }
+
     def get_warehouse(self, warehouse_id: int) -> Warehouse | None:
         return self.__warehouse_service.find_by_id(warehouse_id)
 
@@ -136,3 +175,8 @@ class JormCollectorImpl(JORMCollector):
         self, niche_id: int
     ) -> GreenTradeZoneCalculateResult | None:
         return self.__green_trade_zone_service.find_by_niche_id(niche_id)
+
+    def get_green_zone_caches(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, GreenTradeZoneCalculateResult]:
+        return self.__green_trade_zone_service.find_by_niche_ids(niche_ids)
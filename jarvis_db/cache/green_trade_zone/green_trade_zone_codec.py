@@ -0,0 +1,77 @@
+import struct
+import sys
+from array import array
+
+from pydantic import BaseModel
+
+
+class GreenZoneSegmentData(BaseModel):
+    segments: list[tuple[int, int]]
+    segment_profits: list[int]
+    mean_segment_profit: list[int]
+    mean_product_profit: list[int]
+    segment_product_count: list[int]
+    segment_product_with_trades_count: list[int]
+
+
+SEGMENT_DATA_FORMAT_VERSION = 1
+
+_MAGIC = b"GZSD"
+_HEADER = struct.Struct("<4sB")
+_LENGTH = struct.Struct("<I")
+_ITEM_SIZE = array("q").itemsize
+_ARRAY_FIELDS = (
+    "segment_profits",
+    "mean_segment_profit",
+    "mean_product_profit",
+    "segment_product_count",
+    "segment_product_with_trades_count",
+)
+
+
+def encode_segment_data(segment_data: GreenZoneSegmentData) -> bytes:
+    chunks = [_HEADER.pack(_MAGIC, SEGMENT_DATA_FORMAT_VERSION)]
+    flat_segments = [bound for segment in segment_data.segments for bound in segment]
+    for values in (
+        flat_segments,
+        *(getattr(segment_data, field) for field in _ARRAY_FIELDS),
+    ):
+        packed = array("q", values)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        chunks.append(_LENGTH.pack(len(packed)))
+        chunks.append(packed.tobytes())
+    return b"".join(chunks)
+
+
+def decode_segment_data(data: bytes) -> GreenZoneSegmentData:
+    if len(data) < _HEADER.size:
+        raise ValueError("segment data is too short")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("segment data has unknown format")
+    if version != SEGMENT_DATA_FORMAT_VERSION:
+        raise ValueError(f"unsupported segment data format version {version}")
+    view = memoryview(data)
+    offset = _HEADER.size
+    arrays: list[list[int]] = []
+    for _ in range(len(_ARRAY_FIELDS) + 1):
+        if offset + _LENGTH.size > len(data):
+            raise ValueError("segment data is truncated")
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        end = offset + length * _ITEM_SIZE
+        if end > len(data):
+            raise ValueError("segment data is truncated")
+        values = array("q")
+        values.frombytes(view[offset:end])
+        if sys.byteorder == "big":
+            values.byteswap()
+        arrays.append(values.tolist())
+        offset = end
+    flat_segments, *columns = arrays
+    bounds = iter(flat_segments)
+    return GreenZoneSegmentData.model_construct(
+        segments=list(zip(bounds, bounds)),
+        **dict(zip(_ARRAY_FIELDS, columns)),
+    )
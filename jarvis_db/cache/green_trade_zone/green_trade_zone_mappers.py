@@ -2,7 +2,10 @@ from jarvis_db.core.mapper import Mapper
 from jarvis_db.schemas import GreenTradeZoneCalculationResult
 from jorm.support.calculation import GreenTradeZoneCalculateResult
 
-from jarvis_db.cache.green_trade_zone.green_trade_zone_service import GreenZoneSegmentData
+from jarvis_db.cache.green_trade_zone.green_trade_zone_codec import (
+    GreenZoneSegmentData,
+    decode_segment_data,
+)
 
 
 class GreenTradeZoneTableToJormMapper(
@@ -11,7 +14,11 @@ class GreenTradeZoneTableToJormMapper(
     def map(
         self, value: GreenTradeZoneCalculationResult
     ) -> GreenTradeZoneCalculateResult:
-        segment_data = GreenZoneSegmentData.model_validate(value.segment_data)
+        segment_data = (
+            decode_segment_data(value.segment_data_binary)
+            if value.segment_data_binary is not None
+            else GreenZoneSegmentData.model_validate(value.segment_data)
+        )
         return GreenTradeZoneCalculateResult(
             segments=segment_data.segments,
             segment_product_count=segment_data.segment_product_count,
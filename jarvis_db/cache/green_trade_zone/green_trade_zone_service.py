@@ -1,24 +1,26 @@
-from datetime import datetime
-from typing import TypedDict
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Mapping, TypedDict
 
 from jorm.support.calculation import GreenTradeZoneCalculateResult
-from pydantic import BaseModel
 from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.cache.green_trade_zone.green_trade_zone_codec import (
+    GreenZoneSegmentData,
+    encode_segment_data,
+)
+from jarvis_db.cache.staleness import (
+    CachedResult,
+    CacheStatus,
+    find_cache_records,
+    find_stale_niche_ids,
+)
+from jarvis_db.core.upsert import upsert
 
 from jarvis_db.schemas import GreenTradeZoneCalculationResult
 
 
-class GreenZoneSegmentData(BaseModel):
-    segments: list[tuple[int, int]]
-    segment_profits: list[int]
-    mean_segment_profit: list[int]
-    mean_product_profit: list[int]
-    segment_product_count: list[int]
-    segment_product_with_trades_count: list[int]
-
-
 class _GreenTradeZoneTypedDict(TypedDict):
     best_segment_index: int
     best_segment_profit_index: int
@@ -42,49 +44,139 @@ class GreenTradeZoneService:
     def upsert(
         self, niche_id: int, green_zone_trade_result: GreenTradeZoneCalculateResult
     ) -> None:
-        existing_result = self.__session.execute(
+        self.upsert_many({niche_id: green_zone_trade_result})
+
+    def upsert_many(
+        self,
+        green_zone_trade_results: Mapping[int, GreenTradeZoneCalculateResult],
+        batch_size: int = 1000,
+    ) -> None:
+        results_iterator = iter(green_zone_trade_results.items())
+        while batch := list(islice(results_iterator, batch_size)):
+            date = datetime.utcnow()
+            upsert(
+                self.__session,
+                GreenTradeZoneCalculationResult,
+                [
+                    {
+                        "niche_id": niche_id,
+                        "date": date,
+                        "segment_data": None,
+                        "segment_data_binary": GreenTradeZoneService.__map_segment_data(
+                            green_zone_trade_result
+                        ),
+                        **GreenTradeZoneService.__map_entity_to_typed_dict(
+                            green_zone_trade_result
+                        ),
+                    }
+                    for niche_id, green_zone_trade_result in batch
+                ],
+                index_elements=[GreenTradeZoneCalculationResult.niche_id],
+                update_columns=(
+                    *_GreenTradeZoneTypedDict.__annotations__,
+                    "segment_data",
+                    "segment_data_binary",
+                    "date",
+                ),
+            )
+        self.__session.flush()
+
+    def find_by_niche_id(self, niche_id: int) -> GreenTradeZoneCalculateResult | None:
+        db_result = self.__session.execute(
             select(GreenTradeZoneCalculationResult).where(
                 GreenTradeZoneCalculationResult.niche_id == niche_id
             )
         ).scalar_one_or_none()
-        segment_data = GreenZoneSegmentData(
-            segments=green_zone_trade_result.segments,
-            segment_profits=green_zone_trade_result.segment_profits,
-            mean_segment_profit=green_zone_trade_result.mean_segment_profit,
-            mean_product_profit=green_zone_trade_result.mean_product_profit,
-            segment_product_count=green_zone_trade_result.segment_product_count,
-            segment_product_with_trades_count=green_zone_trade_result.segment_product_with_trades_count,
-        )
-        typed_dict = GreenTradeZoneService.__map_entity_to_typed_dict(
-            green_zone_trade_result
+        return self.__table_mapper.map(db_result) if db_result is not None else None
+
+    def find_by_niche_ids(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, GreenTradeZoneCalculateResult]:
+        db_results = self.__session.execute(
+            select(GreenTradeZoneCalculationResult).where(
+                GreenTradeZoneCalculationResult.niche_id.in_(list(niche_ids))
+            )
+        ).scalars()
+        return {
+            db_result.niche_id: self.__table_mapper.map(db_result)
+            for db_result in db_results
+        }
+
+    def lookup(
+        self, niche_id: int, max_age: timedelta | None = None
+    ) -> CachedResult[GreenTradeZoneCalculateResult]:
+        return self.lookup_many([niche_id], max_age)[niche_id]
+
+    def lookup_many(
+        self, niche_ids: Iterable[int], max_age: timedelta | None = None
+    ) -> dict[int, CachedResult[GreenTradeZoneCalculateResult]]:
+        niche_ids = list(niche_ids)
+        records = find_cache_records(
+            self.__session, GreenTradeZoneCalculationResult, niche_ids, max_age
         )
-        if existing_result is None:
-            self.__session.add(
-                GreenTradeZoneCalculationResult(
-                    niche_id=niche_id,
-                    segment_data=segment_data.model_dump(),
-                    **typed_dict
+        return {
+            niche_id: (
+                CachedResult(
+                    status=records[niche_id][0],
+                    value=self.__table_mapper.map(records[niche_id][1]),
+                    date=records[niche_id][1].date,
                 )
+                if niche_id in records
+                else CachedResult(status=CacheStatus.MISSING)
+            )
+            for niche_id in niche_ids
+        }
+
+    def find_stale_niche_ids(
+        self, marketplace_id: int, max_age: timedelta | None = None
+    ) -> list[int]:
+        return find_stale_niche_ids(
+            self.__session, GreenTradeZoneCalculationResult, marketplace_id, max_age
+        )
+
+    def migrate_segment_data(self, batch_size: int = 1000) -> int:
+        migrated = 0
+        while rows := self.__session.execute(
+            select(
+                GreenTradeZoneCalculationResult.id,
+                GreenTradeZoneCalculationResult.segment_data,
             )
-        else:
+            .where(GreenTradeZoneCalculationResult.segment_data_binary.is_(None))
+            .where(GreenTradeZoneCalculationResult.segment_data.is_not(None))
+            .order_by(GreenTradeZoneCalculationResult.id)
+            .limit(batch_size)
+        ).all():
             self.__session.execute(
-                update(GreenTradeZoneCalculationResult)
-                .where(GreenTradeZoneCalculationResult.niche_id == niche_id)
-                .values(
-                    segment_data=segment_data.model_dump(),
-                    date=datetime.utcnow(),
-                    **typed_dict
-                )
+                update(GreenTradeZoneCalculationResult),
+                [
+                    {
+                        "id": result_id,
+                        "segment_data": None,
+                        "segment_data_binary": encode_segment_data(
+                            GreenZoneSegmentData.model_validate(segment_data)
+                        ),
+                    }
+                    for result_id, segment_data in rows
+                ],
             )
+            migrated += len(rows)
         self.__session.flush()
+        return migrated
 
-    def find_by_niche_id(self, niche_id: int) -> GreenTradeZoneCalculateResult | None:
-        db_result = self.__session.execute(
-            select(GreenTradeZoneCalculationResult).where(
-                GreenTradeZoneCalculationResult.niche_id == niche_id
+    @staticmethod
+    def __map_segment_data(
+        green_zone_trade_result: GreenTradeZoneCalculateResult,
+    ) -> bytes:
+        return encode_segment_data(
+            GreenZoneSegmentData(
+                segments=green_zone_trade_result.segments,
+                segment_profits=green_zone_trade_result.segment_profits,
+                mean_segment_profit=green_zone_trade_result.mean_segment_profit,
+                mean_product_profit=green_zone_trade_result.mean_product_profit,
+                segment_product_count=green_zone_trade_result.segment_product_count,
+                segment_product_with_trades_count=green_zone_trade_result.segment_product_with_trades_count,
             )
-        ).scalar_one_or_none()
-        return self.__table_mapper.map(db_result) if db_result is not None else None
+        )
 
     @staticmethod
     def __map_entity_to_typed_dict(
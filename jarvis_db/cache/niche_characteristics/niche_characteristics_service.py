@@ -1,11 +1,19 @@
-from datetime import datetime
-from typing import TypedDict
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Mapping, TypedDict
 
 from jorm.support.calculation import NicheCharacteristicsCalculateResult
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.cache.staleness import (
+    CachedResult,
+    CacheStatus,
+    find_cache_records,
+    find_stale_niche_ids,
+)
+from jarvis_db.core.upsert import upsert
 from jarvis_db.schemas import NicheCharacteristicsCalculationResult
 
 
@@ -37,23 +45,34 @@ class NicheCharacteristicsService:
     def upsert(
         self, niche_id: int, niche_characteristics: NicheCharacteristicsCalculateResult
     ) -> None:
-        existing_characteristics = self.__session.execute(
-            select(NicheCharacteristicsCalculationResult).where(
-                NicheCharacteristicsCalculationResult.niche_id == niche_id
-            )
-        ).scalar_one_or_none()
-        typed_dict = NicheCharacteristicsService.__map_entity_to_record(
-            niche_characteristics
-        )
-        if existing_characteristics is None:
-            self.__session.add(
-                NicheCharacteristicsCalculationResult(niche_id=niche_id, **typed_dict)
-            )
-        else:
-            self.__session.execute(
-                update(NicheCharacteristicsCalculationResult)
-                .where(NicheCharacteristicsCalculationResult.niche_id == niche_id)
-                .values(date=datetime.utcnow(), **typed_dict)
+        self.upsert_many({niche_id: niche_characteristics})
+
+    def upsert_many(
+        self,
+        niche_characteristics: Mapping[int, NicheCharacteristicsCalculateResult],
+        batch_size: int = 1000,
+    ) -> None:
+        characteristics_iterator = iter(niche_characteristics.items())
+        while batch := list(islice(characteristics_iterator, batch_size)):
+            date = datetime.utcnow()
+            upsert(
+                self.__session,
+                NicheCharacteristicsCalculationResult,
+                [
+                    {
+                        "niche_id": niche_id,
+                        "date": date,
+                        **NicheCharacteristicsService.__map_entity_to_record(
+                            characteristics
+                        ),
+                    }
+                    for niche_id, characteristics in batch
+                ],
+                index_elements=[NicheCharacteristicsCalculationResult.niche_id],
+                update_columns=(
+                    *_NicheCharacteristicsTypedDict.__annotations__,
+                    "date",
+                ),
             )
         self.__session.flush()
 
@@ -71,6 +90,56 @@ class NicheCharacteristicsService:
             else None
         )
 
+    def find_by_niche_ids(
+        self, niche_ids: Iterable[int]
+    ) -> dict[int, NicheCharacteristicsCalculateResult]:
+        characteristics = self.__session.execute(
+            select(NicheCharacteristicsCalculationResult).where(
+                NicheCharacteristicsCalculationResult.niche_id.in_(list(niche_ids))
+            )
+        ).scalars()
+        return {
+            niche_characteristics.niche_id: self.__table_mapper.map(
+                niche_characteristics
+            )
+            for niche_characteristics in characteristics
+        }
+
+    def lookup(
+        self, niche_id: int, max_age: timedelta | None = None
+    ) -> CachedResult[NicheCharacteristicsCalculateResult]:
+        return self.lookup_many([niche_id], max_age)[niche_id]
+
+    def lookup_many(
+        self, niche_ids: Iterable[int], max_age: timedelta | None = None
+    ) -> dict[int, CachedResult[NicheCharacteristicsCalculateResult]]:
+        niche_ids = list(niche_ids)
+        records = find_cache_records(
+            self.__session, NicheCharacteristicsCalculationResult, niche_ids, max_age
+        )
+        return {
+            niche_id: (
+                CachedResult(
+                    status=records[niche_id][0],
+                    value=self.__table_mapper.map(records[niche_id][1]),
+                    date=records[niche_id][1].date,
+                )
+                if niche_id in records
+                else CachedResult(status=CacheStatus.MISSING)
+            )
+            for niche_id in niche_ids
+        }
+
+    def find_stale_niche_ids(
+        self, marketplace_id: int, max_age: timedelta | None = None
+    ) -> list[int]:
+        return find_stale_niche_ids(
+            self.__session,
+            NicheCharacteristicsCalculationResult,
+            marketplace_id,
+            max_age,
+        )
+
     @staticmethod
     def __map_entity_to_record(
         characteristics: NicheCharacteristicsCalculateResult,
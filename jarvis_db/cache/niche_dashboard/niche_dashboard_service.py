@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+
+from jorm.market.infrastructure import Niche as NicheEntity
+from jorm.support.calculation import (
+    GreenTradeZoneCalculateResult,
+    NicheCharacteristicsCalculateResult,
+)
+from sqlalchemy import select
+from sqlalchemy.orm import Session, noload
+
+from jarvis_db.core.mapper import Mapper
+from jarvis_db.schemas import (
+    GreenTradeZoneCalculationResult,
+    Niche,
+    NicheCharacteristicsCalculationResult,
+)
+
+
+@dataclass(frozen=True)
+class NicheDashboard:
+    niche: NicheEntity
+    characteristics: NicheCharacteristicsCalculateResult | None
+    green_trade_zone: GreenTradeZoneCalculateResult | None
+
+
+class NicheDashboardService:
+    def __init__(
+        self,
+        session: Session,
+        niche_mapper: Mapper[Niche, NicheEntity],
+        characteristics_mapper: Mapper[
+            NicheCharacteristicsCalculationResult, NicheCharacteristicsCalculateResult
+        ],
+        green_trade_zone_mapper: Mapper[
+            GreenTradeZoneCalculationResult, GreenTradeZoneCalculateResult
+        ],
+    ):
+        self.__session = session
+        self.__niche_mapper = niche_mapper
+        self.__characteristics_mapper = characteristics_mapper
+        self.__green_trade_zone_mapper = green_trade_zone_mapper
+
+    def find_all_in_category(self, category_id: int) -> dict[int, NicheDashboard]:
+        rows = self.__session.execute(
+            select(
+                Niche,
+                NicheCharacteristicsCalculationResult,
+                GreenTradeZoneCalculationResult,
+            )
+            .outerjoin(
+                NicheCharacteristicsCalculationResult,
+                NicheCharacteristicsCalculationResult.niche_id == Niche.id,
+            )
+            .outerjoin(
+                GreenTradeZoneCalculationResult,
+                GreenTradeZoneCalculationResult.niche_id == Niche.id,
+            )
+            .where(Niche.category_id == category_id)
+            .options(noload(Niche.products))
+        ).tuples()
+        return {
+            niche.id: NicheDashboard(
+                niche=self.__niche_mapper.map(niche),
+                characteristics=(
+                    self.__characteristics_mapper.map(characteristics)
+                    if characteristics is not None
+                    else None
+                ),
+                green_trade_zone=(
+                    self.__green_trade_zone_mapper.map(green_trade_zone)
+                    if green_trade_zone is not None
+                    else None
+                ),
+            )
+            for niche, characteristics, green_trade_zone in rows
+        }
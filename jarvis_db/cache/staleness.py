@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Generic, Iterable, TypeVar
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from jarvis_db.schemas import (
+    Category,
+    GreenTradeZoneCalculationResult,
+    Niche,
+    NicheCharacteristicsCalculationResult,
+)
+
+_T = TypeVar("_T")
+_CacheRecord = TypeVar(
+    "_CacheRecord",
+    NicheCharacteristicsCalculationResult,
+    GreenTradeZoneCalculationResult,
+)
+
+
+class CacheStatus(Enum):
+    FRESH = "fresh"
+    STALE = "stale"
+    MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class CachedResult(Generic[_T]):
+    status: CacheStatus
+    value: _T | None = None
+    date: datetime | None = None
+
+
+def find_cache_records(
+    session: Session,
+    table: type[_CacheRecord],
+    niche_ids: Iterable[int],
+    max_age: timedelta | None,
+) -> dict[int, tuple[CacheStatus, _CacheRecord]]:
+    fresh_after = datetime.utcnow() - max_age if max_age is not None else None
+    rows = session.execute(
+        select(table, Niche.update_date)
+        .join(Niche, Niche.id == table.niche_id)
+        .where(table.niche_id.in_(list(niche_ids)))
+    ).tuples()
+    return {
+        record.niche_id: (
+            (
+                CacheStatus.STALE
+                if record.date < update_date
+                or (fresh_after is not None and record.date < fresh_after)
+                else CacheStatus.FRESH
+            ),
+            record,
+        )
+        for record, update_date in rows
+    }
+
+
+def find_stale_niche_ids(
+    session: Session,
+    table: type[_CacheRecord],
+    marketplace_id: int,
+    max_age: timedelta | None,
+) -> list[int]:
+    stale_conditions = [table.id.is_(None), table.date < Niche.update_date]
+    if max_age is not None:
+        stale_conditions.append(table.date < datetime.utcnow() - max_age)
+    return list(
+        session.execute(
+            select(Niche.id)
+            .join(Niche.category)
+            .outerjoin(table, table.niche_id == Niche.id)
+            .where(Category.marketplace_id == marketplace_id)
+            .where(or_(*stale_conditions))
+            .order_by(Niche.id)
+        ).scalars()
+    )
@@ -0,0 +1,18 @@
+from typing import Callable, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+_S = TypeVar("_S")
+_R = TypeVar("_R")
+
+
+class AsyncService(Generic[_S]):
+    def __init__(self, session: AsyncSession, service_factory: Callable[[Session], _S]):
+        self.__session = session
+        self.__service_factory = service_factory
+
+    async def run(self, call: Callable[[_S], _R]) -> _R:
+        return await self.__session.run_sync(
+            lambda session: call(self.__service_factory(session))
+        )
@@ -0,0 +1,189 @@
+import copy
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    local_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.local_hits + self.shared_hits
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class LruCacheBackend(CacheBackend):
+    def __init__(
+        self, max_size: int = 1024, clock: Callable[[], float] = time.monotonic
+    ):
+        self.__max_size = max_size
+        self.__clock = clock
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= self.__clock():
+                del self.__entries[key]
+                return False, None
+            self.__entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        with self.__lock:
+            self.__entries[key] = (self.__clock() + ttl_seconds, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+class LocalSharedCacheBackend(CacheBackend):
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.__clock = clock
+        self.__entries: dict[bytes, tuple[float, bytes]] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        serialized_key = pickle.dumps(key)
+        with self.__lock:
+            entry = self.__entries.get(serialized_key)
+            if entry is None:
+                return False, None
+            expires_at, serialized_value = entry
+            if expires_at <= self.__clock():
+                del self.__entries[serialized_key]
+                return False, None
+        return True, pickle.loads(serialized_value)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        entry = (self.__clock() + ttl_seconds, pickle.dumps(value))
+        with self.__lock:
+            self.__entries[pickle.dumps(key)] = entry
+
+    def delete(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__entries.pop(pickle.dumps(key), None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+class TwoLevelCache:
+    # Invalidation reaches the local backend of this process and the shared
+    # backend only: local backends of other processes keep serving their copy
+    # until it expires, so they may be stale for up to ttl_seconds.
+    def __init__(
+        self,
+        local_backend: CacheBackend,
+        shared_backend: CacheBackend | None = None,
+        ttl_seconds: float = 300,
+    ):
+        self.__local_backend = local_backend
+        self.__shared_backend = shared_backend
+        self.__ttl_seconds = ttl_seconds
+        self.__pending_key = ("cache_invalidations", id(self))
+        self.__stats = CacheStats()
+        self.__stats_lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.__stats
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], _T]) -> _T:
+        found, value = self.__local_backend.get(key)
+        if found:
+            self.__count(local_hits=1)
+            return copy.deepcopy(value)
+        if self.__shared_backend is not None:
+            found, value = self.__shared_backend.get(key)
+            if found:
+                self.__count(shared_hits=1)
+                self.__local_backend.set(key, value, self.__ttl_seconds)
+                return copy.deepcopy(value)
+        self.__count(misses=1)
+        value = loader()
+        if self.__shared_backend is not None:
+            self.__shared_backend.set(key, value, self.__ttl_seconds)
+        self.__local_backend.set(key, copy.deepcopy(value), self.__ttl_seconds)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        self.__local_backend.delete(key)
+        if self.__shared_backend is not None:
+            self.__shared_backend.delete(key)
+
+    def invalidate_in_transaction(self, session: Session, key: Hashable) -> None:
+        self.invalidate(key)
+        pending_keys = session.info.get(self.__pending_key)
+        if pending_keys is None:
+            pending_keys = session.info[self.__pending_key] = set()
+            for event_name in ("after_commit", "after_rollback"):
+                event.listen(
+                    session, event_name, lambda _: self.__invalidate_pending(session)
+                )
+        pending_keys.add(key)
+
+    def __invalidate_pending(self, session: Session) -> None:
+        pending_keys = session.info[self.__pending_key]
+        while pending_keys:
+            self.invalidate(pending_keys.pop())
+
+    def clear(self) -> None:
+        self.__local_backend.clear()
+        if self.__shared_backend is not None:
+            self.__shared_backend.clear()
+
+    def reset_stats(self) -> None:
+        with self.__stats_lock:
+            self.__stats = CacheStats()
+
+    def __count(self, local_hits: int = 0, shared_hits: int = 0, misses: int = 0):
+        with self.__stats_lock:
+            self.__stats = CacheStats(
+                local_hits=self.__stats.local_hits + local_hits,
+                shared_hits=self.__stats.shared_hits + shared_hits,
+                misses=self.__stats.misses + misses,
+            )
@@ -0,0 +1,13 @@
+import string
+
+from sqlalchemy import Dialect
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def lower_name(dialect: Dialect, name: str) -> str:
+    # Mirrors SQL lower() of the dialect so that names lowered here compare
+    # like the lower(name) lookups; SQLite lower() folds ASCII letters only.
+    if dialect.name == "sqlite":
+        return name.translate(_ASCII_LOWER)
+    return name.lower()
@@ -0,0 +1,50 @@
+from typing import Any, Iterator, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+_T = TypeVar("_T")
+_K = TypeVar("_K")
+
+
+def iter_keyset(
+    session: Session,
+    statement: Select[tuple[_T]],
+    key_column: InstrumentedAttribute[Any],
+    page_size: int = 1000,
+    yield_per: int | None = None,
+) -> Iterator[_T]:
+    execution_options = {"yield_per": yield_per} if yield_per is not None else {}
+    last_key = None
+    while True:
+        page_statement = statement.order_by(key_column).limit(page_size)
+        if last_key is not None:
+            page_statement = page_statement.where(key_column > last_key)
+        fetched = 0
+        for item in session.execute(
+            page_statement, execution_options=execution_options
+        ).scalars():
+            fetched += 1
+            last_key = getattr(item, key_column.key)
+            yield item
+        if fetched < page_size:
+            return
+
+
+def iter_keyset_pages(
+    session: Session,
+    statement: Select[tuple[_K]],
+    key_column: InstrumentedAttribute[_K],
+    page_size: int = 1000,
+) -> Iterator[list[_K]]:
+    last_key = None
+    while True:
+        page_statement = statement.order_by(key_column).limit(page_size)
+        if last_key is not None:
+            page_statement = page_statement.where(key_column > last_key)
+        keys = list(session.execute(page_statement).scalars())
+        if keys:
+            last_key = keys[-1]
+            yield keys
+        if len(keys) < page_size:
+            return
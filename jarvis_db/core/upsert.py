@@ -0,0 +1,100 @@
+from typing import Any, Iterable, Mapping, Sequence
+
+from sqlalchemy import ColumnElement, Row, and_, insert, or_, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+_native_inserts = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert(
+    session: Session,
+    entity: Any,
+    rows: Sequence[Mapping[str, Any]],
+    index_elements: Sequence[Any],
+    update_columns: Iterable[str] = (),
+    index_where: ColumnElement[bool] | None = None,
+    returning: Sequence[Any] = (),
+) -> Sequence[Row[Any]]:
+    if not rows:
+        return []
+    update_columns = list(update_columns)
+    native_insert = _native_inserts.get(session.get_bind().dialect.name)
+    if native_insert is None:
+        return _emulated_upsert(
+            session,
+            entity,
+            rows,
+            index_elements,
+            update_columns,
+            index_where,
+            returning,
+        )
+    statement = native_insert(entity)
+    if update_columns:
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            index_where=index_where,
+            set_={column: statement.excluded[column] for column in update_columns},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=index_elements, index_where=index_where
+        )
+    if not returning:
+        session.execute(statement, rows)
+        return []
+    return session.execute(statement.returning(*returning), rows).all()
+
+
+def _emulated_upsert(
+    session: Session,
+    entity: Any,
+    rows: Sequence[Mapping[str, Any]],
+    index_elements: Sequence[Any],
+    update_columns: list[str],
+    index_where: ColumnElement[bool] | None,
+    returning: Sequence[Any],
+) -> Sequence[Row[Any]]:
+    # Select-then-write fallback for dialects without ON CONFLICT. Unlike the
+    # native statements it is not safe against concurrent writers.
+    def key_of(row: Mapping[str, Any]) -> tuple[Any, ...]:
+        return tuple(row[element.key] for element in index_elements)
+
+    def match(keys: Iterable[tuple[Any, ...]]) -> ColumnElement[bool]:
+        return and_(
+            or_(
+                *(
+                    and_(
+                        *(
+                            element.is_(value) if value is None else element == value
+                            for element, value in zip(index_elements, key)
+                        )
+                    )
+                    for key in keys
+                )
+            ),
+            index_where if index_where is not None else true(),
+        )
+
+    rows_by_key = {key_of(row): row for row in rows}
+    existing_keys = set(
+        session.execute(
+            select(*index_elements).where(match(rows_by_key.keys()))
+        ).tuples()
+    )
+    inserted = [row for key, row in rows_by_key.items() if key not in existing_keys]
+    if inserted:
+        session.execute(insert(entity), inserted)
+    written_keys = [key_of(row) for row in inserted]
+    if update_columns:
+        for key in existing_keys:
+            session.execute(
+                update(entity)
+                .where(match([key]))
+                .values({column: rows_by_key[key][column] for column in update_columns})
+            )
+        written_keys.extend(existing_keys)
+    if not returning or not written_keys:
+        return []
+    return session.execute(select(*returning).where(match(written_keys))).all()
@@ -1,7 +1,8 @@
-from db_config import Base, engine
+from jarvis_db.db_config import Base, get_engine
 
 
 def create_tables():
+    engine = get_engine()
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
 
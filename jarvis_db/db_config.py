@@ -1,10 +1,156 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.orm import sessionmaker
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
-engine = create_engine("sqlite://")
-session = sessionmaker(bind=engine, autoflush=False)
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 
 class Base(DeclarativeBase):
     pass
+
+
+@dataclass(frozen=True)
+class DbSettings:
+    url: str = "sqlite://"
+    echo: bool = False
+    pool_size: int | None = None
+    max_overflow: int | None = None
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    insertmanyvalues_page_size: int = 1000
+    statement_timeout_ms: int | None = None
+    sqlite_journal_mode: str | None = None
+    sqlite_synchronous: str | None = None
+    sqlite_foreign_keys: bool = False
+    connect_args: dict[str, Any] = field(default_factory=dict)
+
+
+def create_db_engine(settings: DbSettings) -> Engine:
+    engine = create_engine(settings.url, **_create_engine_kwargs(settings))
+    _listen_dialect_events(engine, settings)
+    return engine
+
+
+def create_session_factory(engine: Engine) -> sessionmaker[Session]:
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+# The async factories need the optional "async" extra (aiosqlite, greenlet),
+# so sqlalchemy.ext.asyncio is only imported once they are called.
+def create_async_db_engine(settings: DbSettings) -> "AsyncEngine":
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(settings.url, **_create_engine_kwargs(settings))
+    _listen_dialect_events(engine.sync_engine, settings)
+    return engine
+
+
+def create_async_session_factory(
+    engine: "AsyncEngine",
+) -> "async_sessionmaker[AsyncSession]":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def _create_engine_kwargs(settings: DbSettings) -> dict[str, Any]:
+    engine_kwargs: dict[str, Any] = {
+        "echo": settings.echo,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+        "insertmanyvalues_page_size": settings.insertmanyvalues_page_size,
+        "connect_args": dict(settings.connect_args),
+    }
+    if settings.pool_size is not None:
+        engine_kwargs["pool_size"] = settings.pool_size
+    if settings.max_overflow is not None:
+        engine_kwargs["max_overflow"] = settings.max_overflow
+    return engine_kwargs
+
+
+def _listen_dialect_events(engine: Engine, settings: DbSettings) -> None:
+    if engine.dialect.name == "sqlite":
+        _listen_sqlite_pragmas(engine, settings)
+    elif engine.dialect.name == "postgresql":
+        _listen_postgresql_timeout(engine, settings)
+
+
+def _listen_sqlite_pragmas(engine: Engine, settings: DbSettings) -> None:
+    pragmas = []
+    if settings.sqlite_foreign_keys:
+        pragmas.append("PRAGMA foreign_keys=ON")
+    if settings.sqlite_journal_mode is not None:
+        pragmas.append(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    if settings.sqlite_synchronous is not None:
+        pragmas.append(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _listen_postgresql_timeout(engine: Engine, settings: DbSettings) -> None:
+    if settings.statement_timeout_ms is None:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {settings.statement_timeout_ms}")
+        cursor.close()
+        dbapi_connection.commit()
+
+
+_settings = DbSettings()
+_engine: Engine | None = None
+_session_factory: sessionmaker[Session] | None = None
+_lock = threading.RLock()
+
+
+def configure(settings: DbSettings) -> None:
+    global _settings, _engine, _session_factory
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        _settings = settings
+        _engine = None
+        _session_factory = None
+
+
+def get_engine() -> Engine:
+    global _engine
+    engine = _engine
+    if engine is not None:
+        return engine
+    with _lock:
+        if _engine is None:
+            _engine = create_db_engine(_settings)
+        return _engine
+
+
+def get_session_factory() -> sessionmaker[Session]:
+    global _session_factory
+    session_factory = _session_factory
+    if session_factory is not None:
+        return session_factory
+    with _lock:
+        if _session_factory is None:
+            _session_factory = create_session_factory(get_engine())
+        return _session_factory
+
+
+def __getattr__(name: str) -> Any:
+    if name == "engine":
+        return get_engine()
+    if name == "session":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,9 @@
+from jarvis_db.core.cache import CacheBackend, LruCacheBackend, TwoLevelCache
+
+
+def create_metadata_cache(
+    ttl_seconds: float = 300,
+    max_size: int = 1024,
+    shared_backend: CacheBackend | None = None,
+) -> TwoLevelCache:
+    return TwoLevelCache(LruCacheBackend(max_size), shared_backend, ttl_seconds)
@@ -0,0 +1,87 @@
+from jorm.server.providers.providers import (
+    DataProviderWithoutKey,
+    UserMarketDataProvider,
+)
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.fill.provider_fetcher import ProviderFetcher
+from jarvis_db.access.fill.standard_filler_impl import StandardDbFillerImpl
+from jarvis_db.access.jorm_changer import JormChangerImpl
+from jarvis_db.core.cache import TwoLevelCache
+from jarvis_db.factories.services import (
+    create_category_service,
+    create_economy_constants_service,
+    create_economy_service,
+    create_green_trade_zone_service,
+    create_niche_characteristics_service,
+    create_niche_service,
+    create_product_card_service,
+    create_product_history_service,
+    create_transit_economy_service,
+    create_user_items_service,
+    create_warehouse_registry,
+    create_warehouse_service,
+)
+from jarvis_db.market.infrastructure.warehouse.warehouse_registry import (
+    WarehouseRegistry,
+)
+from jarvis_db.market.items.product_card_history.history_window import HistoryWindow
+
+
+def create_standard_filler(
+    session: Session,
+    marketplace_id: int,
+    warehouse_registry: WarehouseRegistry | None = None,
+    provider_fetcher: ProviderFetcher | None = None,
+    cache: TwoLevelCache | None = None,
+) -> StandardDbFillerImpl:
+    warehouse_registry = (
+        create_warehouse_registry(session)
+        if warehouse_registry is None
+        else warehouse_registry
+    )
+    return StandardDbFillerImpl(
+        marketplace_id,
+        create_warehouse_service(session, cache=cache, registry=warehouse_registry),
+        warehouse_registry,
+        provider_fetcher,
+    )
+
+
+def create_jorm_changer(
+    session: Session,
+    data_provider_without_key: DataProviderWithoutKey,
+    user_market_data_provider: UserMarketDataProvider,
+    marketplace_id: int,
+    provider_fetcher: ProviderFetcher | None = None,
+    cache: TwoLevelCache | None = None,
+    history_window: HistoryWindow | None = None,
+) -> JormChangerImpl:
+    warehouse_registry = create_warehouse_registry(session)
+    warehouse_service = create_warehouse_service(
+        session, cache=cache, registry=warehouse_registry
+    )
+    product_history_service = create_product_history_service(
+        session, warehouse_registry
+    )
+    return JormChangerImpl(
+        economy_constants_service=create_economy_constants_service(session, cache),
+        category_service=create_category_service(session),
+        niche_service=create_niche_service(session),
+        product_card_service=create_product_card_service(
+            session, product_history_service
+        ),
+        product_history_service=product_history_service,
+        economy_service=create_economy_service(session, warehouse_registry),
+        transit_service=create_transit_economy_service(session, warehouse_service),
+        user_items_service=create_user_items_service(session),
+        niche_characteristics_service=create_niche_characteristics_service(session),
+        green_trade_zone_service=create_green_trade_zone_service(session),
+        data_provider_without_key=data_provider_without_key,
+        user_market_data_provider=user_market_data_provider,
+        standard_filler=create_standard_filler(
+            session, marketplace_id, warehouse_registry, provider_fetcher, cache
+        ),
+        provider_fetcher=provider_fetcher,
+        history_window=history_window,
+    )
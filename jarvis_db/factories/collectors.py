@@ -0,0 +1,69 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.jorm_collector_impl import JormCollectorImpl
+from jarvis_db.core.cache import TwoLevelCache
+from jarvis_db.market.items.product_card_history.history_window import HistoryWindow
+from jarvis_db.factories.services import (
+    create_category_service,
+    create_economy_constants_service,
+    create_economy_service,
+    create_green_trade_zone_service,
+    create_marketplace_service,
+    create_niche_characteristics_service,
+    create_niche_dashboard_service,
+    create_niche_service,
+    create_transit_economy_service,
+    create_user_items_service,
+    create_warehouse_registry,
+    create_warehouse_service,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from jarvis_db.access.async_jorm_collector_impl import AsyncJormCollectorImpl
+
+
+def create_jorm_collector(
+    session: Session,
+    cache: TwoLevelCache | None = None,
+    history_window: HistoryWindow | None = None,
+) -> JormCollectorImpl:
+    warehouse_registry = create_warehouse_registry(session)
+    warehouse_service = create_warehouse_service(
+        session, cache=cache, registry=warehouse_registry
+    )
+    return JormCollectorImpl(
+        marketplace_service=create_marketplace_service(session, cache=cache),
+        economy_constants_service=create_economy_constants_service(session, cache),
+        niche_service=create_niche_service(session),
+        category_service=create_category_service(session),
+        warehouse_service=warehouse_service,
+        economy_service=create_economy_service(session, warehouse_registry),
+        transit_service=create_transit_economy_service(session, warehouse_service),
+        user_items_service=create_user_items_service(session),
+        niche_characteristics_service=create_niche_characteristics_service(session),
+        green_trade_zone_service=create_green_trade_zone_service(session),
+        niche_dashboard_service=create_niche_dashboard_service(session),
+        history_window=history_window,
+    )
+
+
+def create_async_jorm_collector(
+    session: "AsyncSession",
+    cache: TwoLevelCache | None = None,
+    history_window: HistoryWindow | None = None,
+) -> "AsyncJormCollectorImpl":
+    from jarvis_db.access.async_jorm_collector_impl import AsyncJormCollectorImpl
+    from jarvis_db.core.async_service import AsyncService
+
+    return AsyncJormCollectorImpl(
+        AsyncService(
+            session,
+            lambda sync_session: create_jorm_collector(
+                sync_session, cache, history_window
+            ),
+        )
+    )
@@ -1,7 +1,20 @@
+from typing import Any, Callable
+
 from jorm.market.infrastructure import Marketplace, Niche, Product, Warehouse
+from jorm.server.providers.providers import DataProviderWithoutKey
 from sqlalchemy.orm import Load, Session
 
 from jarvis_db import schemas
+from jarvis_db.access.fill.fillers import StandardDbFiller
+from jarvis_db.access.fill.marketplace_fill_job import (
+    MarketplaceFillJob,
+    MarketplaceFillProgress,
+)
+from jarvis_db.access.fill.niche_fill_pipeline import (
+    NicheFillCheckpoint,
+    NicheFillPipeline,
+    NicheFillProgress,
+)
 from jarvis_db.cache.green_trade_zone.green_trade_zone_mappers import (
     GreenTradeZoneTableToJormMapper,
 )
@@ -14,6 +27,10 @@ from jarvis_db.cache.niche_characteristics.niche_characteristics_mappers import
 from jarvis_db.cache.niche_characteristics.niche_characteristics_service import (
     NicheCharacteristicsService,
 )
+from jarvis_db.cache.niche_dashboard.niche_dashboard_service import (
+    NicheDashboardService,
+)
+from jarvis_db.core.cache import TwoLevelCache
 from jarvis_db.core.mapper import Mapper
 from jarvis_db.factories.mappers import (
     create_category_table_mapper,
@@ -31,15 +48,28 @@ from jarvis_db.market.infrastructure.category.category_service import CategorySe
 from jarvis_db.market.infrastructure.marketplace.marketplace_service import (
     MarketplaceService,
 )
+from jarvis_db.market.infrastructure.niche.niche_flat_loader import NicheFlatLoader
 from jarvis_db.market.infrastructure.niche.niche_service import (
     NicheLoadOptions,
+    NicheLoadStrategy,
     NicheService,
 )
 from jarvis_db.market.infrastructure.warehouse.warehouse_mappers import (
     WarehouseTableToJormMapper,
 )
+from jarvis_db.market.infrastructure.warehouse.warehouse_registry import (
+    WarehouseRegistry,
+)
 from jarvis_db.market.infrastructure.warehouse.warehouse_service import WarehouseService
 from jarvis_db.market.items.product_card.product_card_service import ProductCardService
+from jarvis_db.market.items.product_card_history.history_partitioning import (
+    HistoryPartitioning,
+)
+from jarvis_db.market.items.product_card_history.history_retention import (
+    HistoryRetentionJob,
+    HistoryRetentionPolicy,
+    ProductHistoryCompactor,
+)
 from jarvis_db.market.items.product_card_history.leftover_mappers import (
     LeftoverTableToJormMapper,
 )
@@ -101,13 +131,14 @@ def create_token_service(session: Session) -> TokenService:
 def create_marketplace_service(
     session: Session,
     marketplace_mapper: Mapper[schemas.Marketplace, Marketplace] | None = None,
+    cache: TwoLevelCache | None = None,
 ) -> MarketplaceService:
     marketplace_mapper = (
         create_marketplace_table_mapper()
         if marketplace_mapper is None
         else marketplace_mapper
     )
-    return MarketplaceService(session, marketplace_mapper)
+    return MarketplaceService(session, marketplace_mapper, cache)
 
 
 def create_category_service(
@@ -123,47 +154,82 @@ def create_category_service(
     )
 
 
+_COLLECTION_LOADERS: dict[NicheLoadStrategy, Callable[[Load, Any], Load]] = {
+    NicheLoadStrategy.JOINED: Load.joinedload,
+    NicheLoadStrategy.SELECTIN: Load.selectinload,
+    NicheLoadStrategy.SUBQUERY: Load.subqueryload,
+}
+
+
+def create_niche_load_options(
+    strategy: NicheLoadStrategy = NicheLoadStrategy.JOINED,
+) -> NicheLoadOptions:
+    load_collection = _COLLECTION_LOADERS[strategy]
+    products = load_collection(Load(schemas.Niche), schemas.Niche.products)
+    product_niches = load_collection(products, schemas.ProductCard.niches).joinedload(
+        schemas.Niche.category
+    )
+    return NicheLoadOptions(
+        atomic_options=[
+            Load(schemas.Niche).joinedload(schemas.Niche.category),
+            product_niches,
+            load_collection(
+                load_collection(products, schemas.ProductCard.histories),
+                schemas.ProductHistory.leftovers,
+            ).joinedload(schemas.Leftover.warehouse),
+        ],
+        no_history_options=[
+            Load(schemas.Niche).joinedload(schemas.Niche.category),
+            product_niches,
+            products.noload(schemas.ProductCard.histories),
+        ],
+    )
+
+
 def create_niche_service(
-    session: Session, niche_mapper: Mapper[schemas.Niche, Niche] | None = None
+    session: Session,
+    niche_mapper: Mapper[schemas.Niche, Niche] | None = None,
+    load_strategy: NicheLoadStrategy = NicheLoadStrategy.JOINED,
 ) -> NicheService:
     niche_mapper = create_niche_table_mapper() if niche_mapper is None else niche_mapper
     return NicheService(
         session,
-        NicheLoadOptions(
-            atomic_options=[
-                Load(schemas.Niche).joinedload(schemas.Niche.category),
-                Load(schemas.Niche)
-                .joinedload(schemas.Niche.products)
-                .joinedload(schemas.ProductCard.histories)
-                .joinedload(schemas.ProductHistory.leftovers)
-                .joinedload(schemas.Leftover.warehouse),
-            ],
-            no_history_options=[
-                Load(schemas.Niche).joinedload(schemas.Niche.category),
-                Load(schemas.Niche)
-                .joinedload(schemas.Niche.products)
-                .noload(schemas.ProductCard.histories),
-            ],
-        ),
+        create_niche_load_options(load_strategy),
         niche_mapper,
     )
 
 
+def create_niche_flat_loader(session: Session) -> NicheFlatLoader:
+    return NicheFlatLoader(session)
+
+
 def create_warehouse_service(
     session: Session,
     warehouse_mapper: Mapper[schemas.Warehouse, Warehouse] | None = None,
+    cache: TwoLevelCache | None = None,
+    registry: WarehouseRegistry | None = None,
 ) -> WarehouseService:
     warehouse_mapper = (
         WarehouseTableToJormMapper() if warehouse_mapper is None else warehouse_mapper
     )
-    return WarehouseService(session, warehouse_mapper)
+    return WarehouseService(session, warehouse_mapper, cache, registry)
+
 
+def create_warehouse_registry(session: Session) -> WarehouseRegistry:
+    if "warehouse_registry" not in session.info:
+        session.info["warehouse_registry"] = WarehouseRegistry(
+            session, WarehouseTableToJormMapper()
+        )
+    return session.info["warehouse_registry"]
 
-def create_economy_service(session: Session) -> EconomyService:
+
+def create_economy_service(
+    session: Session, warehouse_registry: WarehouseRegistry | None = None
+) -> EconomyService:
     return EconomyService(
         session,
         create_economy_table_mapper(),
-        create_warehouse_service(session),
+        create_warehouse_service(session, registry=warehouse_registry),
     )
 
 
@@ -179,18 +245,79 @@ def create_transit_economy_service(
     )
 
 
-def create_product_history_service(session: Session) -> ProductHistoryService:
+def create_product_history_service(
+    session: Session,
+    warehouse_registry: WarehouseRegistry | None = None,
+    partitioning: HistoryPartitioning | None = None,
+) -> ProductHistoryService:
     return ProductHistoryService(
         session,
         ProductHistoryUnitTableToJormMapper(LeftoverTableToJormMapper()),
+        warehouse_registry,
+        partitioning,
+    )
+
+
+def create_history_retention_job(
+    session_factory: Callable[[], Session],
+    policy: HistoryRetentionPolicy = HistoryRetentionPolicy(),
+    partitioning: HistoryPartitioning | None = None,
+) -> HistoryRetentionJob:
+    return HistoryRetentionJob(
+        session_factory,
+        lambda session: ProductHistoryCompactor(session, partitioning),
+        policy,
+    )
+
+
+def create_niche_fill_pipeline(
+    session_factory: Callable[[], Session],
+    data_provider_without_key: DataProviderWithoutKey,
+    marketplace_id: int,
+    checkpoint: NicheFillCheckpoint | None = None,
+    progress_callback: Callable[[NicheFillProgress], None] | None = None,
+) -> NicheFillPipeline:
+    return NicheFillPipeline(
+        session_factory,
+        create_category_service,
+        create_niche_service,
+        data_provider_without_key,
+        marketplace_id,
+        checkpoint=checkpoint,
+        progress_callback=progress_callback,
+    )
+
+
+def create_marketplace_fill_job(
+    session_factory: Callable[[], Session],
+    filler_factory: Callable[[Session], StandardDbFiller],
+    data_provider_without_key: DataProviderWithoutKey,
+    marketplace_id: int,
+    job_name: str = "marketplace_fill",
+    progress_callback: Callable[[MarketplaceFillProgress], None] | None = None,
+) -> MarketplaceFillJob:
+    return MarketplaceFillJob(
+        session_factory,
+        filler_factory,
+        create_category_service,
+        create_niche_service,
+        lambda session: create_product_card_service(
+            session, warehouse_registry=create_warehouse_registry(session)
+        ),
+        data_provider_without_key,
+        marketplace_id,
+        job_name=job_name,
+        progress_callback=progress_callback,
     )
 
 
 def create_product_card_service(
-    session: Session, history_service: ProductHistoryService | None = None
+    session: Session,
+    history_service: ProductHistoryService | None = None,
+    warehouse_registry: WarehouseRegistry | None = None,
 ) -> ProductCardService:
     history_service = (
-        create_product_history_service(session)
+        create_product_history_service(session, warehouse_registry)
         if history_service is None
         else history_service
     )
@@ -201,8 +328,12 @@ def create_product_card_service(
     )
 
 
-def create_economy_constants_service(session: Session) -> EconomyConstantsService:
-    return EconomyConstantsService(session, EconomyConstantsTableToJormMapper())
+def create_economy_constants_service(
+    session: Session, cache: TwoLevelCache | None = None
+) -> EconomyConstantsService:
+    return EconomyConstantsService(
+        session, EconomyConstantsTableToJormMapper(), cache
+    )
 
 
 def create_niche_characteristics_service(
@@ -213,3 +344,12 @@ def create_niche_characteristics_service(
 
 def create_green_trade_zone_service(session: Session) -> GreenTradeZoneService:
     return GreenTradeZoneService(session, GreenTradeZoneTableToJormMapper())
+
+
+def create_niche_dashboard_service(session: Session) -> NicheDashboardService:
+    return NicheDashboardService(
+        session,
+        create_niche_table_mapper(),
+        NicheCharacteristicsTableToJormMapper(),
+        GreenTradeZoneTableToJormMapper(),
+    )
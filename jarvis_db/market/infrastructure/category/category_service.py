@@ -1,10 +1,12 @@
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from jorm.market.infrastructure import Category as CategoryEntity
-from sqlalchemy import select, update
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session, noload
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.names import lower_name
+from jarvis_db.core.pagination import iter_keyset_pages
 from jarvis_db.core.query_builder import QueryBuilder
 from jarvis_db.schemas import Category
 
@@ -37,6 +39,41 @@ class CategoryService:
         )
         self.__session.flush()
 
+    def ensure_all(
+        self, category_entities: Iterable[CategoryEntity], marketplace_id: int
+    ) -> dict[str, int]:
+        names = {category.name for category in category_entities}
+        if not names:
+            return {}
+        dialect = self.__session.get_bind().dialect
+        name_to_id = {
+            lower_name(dialect, name): category_id
+            for category_id, name in self.__session.execute(
+                select(Category.id, Category.name)
+                .where(Category.marketplace_id == marketplace_id)
+                .where(
+                    func.lower(Category.name).in_(
+                        {lower_name(dialect, name) for name in names}
+                    )
+                )
+            )
+        }
+        missing_names = {
+            lower_name(dialect, name): name
+            for name in names
+            if lower_name(dialect, name) not in name_to_id
+        }
+        if missing_names:
+            created_ids = self.__session.execute(
+                insert(Category).returning(Category.id, sort_by_parameter_order=True),
+                [
+                    {"name": name, "marketplace_id": marketplace_id}
+                    for name in missing_names.values()
+                ],
+            ).scalars()
+            name_to_id.update(zip(missing_names, created_ids))
+        return {name: name_to_id[lower_name(dialect, name)] for name in names}
+
     def find_by_id(self, category_id: int) -> CategoryEntity | None:
         category = self.__session.execute(
             select(Category)
@@ -51,7 +88,7 @@ class CategoryService:
         category = self.__session.execute(
             select(Category)
             .where(Category.marketplace_id == marketplace_id)
-            .where(Category.name.ilike(name))
+            .where(func.lower(Category.name) == func.lower(name))
             .options(noload(Category.niches))
         ).scalar_one_or_none()
         return (
@@ -92,11 +129,34 @@ class CategoryService:
             category.id: self.__table_mapper.map(category) for category in categories
         }
 
+    def iter_all_in_marketplace_atomic(
+        self, marketplace_id: int, page_size: int = 100
+    ) -> Iterator[tuple[int, CategoryEntity]]:
+        for category_ids in iter_keyset_pages(
+            self.__session,
+            select(Category.id).where(Category.marketplace_id == marketplace_id),
+            Category.id,
+            page_size,
+        ):
+            categories = (
+                self.__session.execute(
+                    self.__category_query_builder.join(select(Category))
+                    .options(*self.__category_query_builder.provide_load_options())
+                    .where(Category.id.in_(category_ids))
+                    .order_by(Category.id)
+                )
+                .scalars()
+                .unique()
+                .all()
+            )
+            for category in categories:
+                yield category.id, self.__table_mapper.map(category)
+
     def exists_with_name(self, name: str, marketplace_id: int) -> bool:
         category_id = self.__session.execute(
             select(Category.id)
             .where(Category.marketplace_id == marketplace_id)
-            .where(Category.name.ilike(name))
+            .where(func.lower(Category.name) == func.lower(name))
         ).scalar_one_or_none()
         return category_id is not None
 
@@ -1,27 +1,33 @@
 from typing import Iterable
 
 from jorm.market.infrastructure import Marketplace as MarketplaceEntity
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session, joinedload, noload
 
+from jarvis_db.core.cache import TwoLevelCache
 from jarvis_db.core.mapper import Mapper
 from jarvis_db.schemas import Marketplace
 
 
 class MarketplaceService:
+    __cache_key = ("marketplaces",)
+
     def __init__(
         self,
         session: Session,
         table_mapper: Mapper[Marketplace, MarketplaceEntity],
+        cache: TwoLevelCache | None = None,
     ):
         self.__session = session
         self.__table_mapper = table_mapper
+        self.__cache = cache
 
     def create(self, marketplace_entity: MarketplaceEntity):
         self.__session.add(
             MarketplaceService.__create_marketplace_record(marketplace_entity)
         )
         self.__session.flush()
+        self.__invalidate_cache()
 
     def create_all(self, marketplace_entities: Iterable[MarketplaceEntity]):
         self.__session.add_all(
@@ -31,6 +37,7 @@ class MarketplaceService:
             )
         )
         self.__session.flush()
+        self.__invalidate_cache()
 
     def find_by_id(self, marketplece_id: int) -> MarketplaceEntity | None:
         marketplace = self.__session.execute(
@@ -41,6 +48,13 @@ class MarketplaceService:
         return self.__table_mapper.map(marketplace) if marketplace is not None else None
 
     def find_all(self) -> dict[int, MarketplaceEntity]:
+        if self.__cache is None:
+            return self.__find_all()
+        return dict(
+            self.__cache.get_or_load(MarketplaceService.__cache_key, self.__find_all)
+        )
+
+    def __find_all(self) -> dict[int, MarketplaceEntity]:
         marketplaces = (
             self.__session.execute(
                 select(Marketplace).options(
@@ -74,7 +88,7 @@ class MarketplaceService:
     def find_by_name(self, name: str) -> tuple[MarketplaceEntity, int] | None:
         marketplace = self.__session.execute(
             select(Marketplace)
-            .where(Marketplace.name.ilike(name))
+            .where(func.lower(Marketplace.name) == func.lower(name))
             .options(noload(Marketplace.categories), noload(Marketplace.warehouses))
         ).scalar_one_or_none()
         return (
@@ -85,7 +99,9 @@ class MarketplaceService:
 
     def exists_with_name(self, name: str) -> bool:
         marketplace_id = self.__session.execute(
-            select(Marketplace.id).where(Marketplace.name.ilike(name))
+            select(Marketplace.id).where(
+                func.lower(Marketplace.name) == func.lower(name)
+            )
         ).scalar_one_or_none()
         return marketplace_id is not None
 
@@ -95,6 +111,13 @@ class MarketplaceService:
             .where(Marketplace.id == marketplace_id)
             .values(name=marketplace.name.lower())
         )
+        self.__invalidate_cache()
+
+    def __invalidate_cache(self):
+        if self.__cache is not None:
+            self.__cache.invalidate_in_transaction(
+                self.__session, MarketplaceService.__cache_key
+            )
 
     @staticmethod
     def __create_marketplace_record(marketplace: MarketplaceEntity) -> Marketplace:
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from typing import Iterable
+
+from jorm.market.infrastructure import HandlerType
+from jorm.market.infrastructure import Niche as NicheEntity
+from jorm.market.items import Product, ProductHistory as ProductHistoryDomain
+from jorm.market.items import ProductHistoryUnit, StorageDict
+from jorm.support.types import SpecifiedLeftover
+from sqlalchemy import Row, Select, select, true
+from sqlalchemy.orm import Session
+
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
+from jarvis_db.schemas import (
+    Category,
+    Leftover,
+    Niche,
+    ProductCard,
+    ProductHistory,
+    ProductToNiche,
+    Warehouse,
+)
+
+
+class NicheFlatLoader:
+    def __init__(self, session: Session):
+        self.__session = session
+
+    def fetch_by_id(
+        self, niche_id: int, history_window: HistoryWindow | None = None
+    ) -> NicheEntity | None:
+        niche = self.__session.execute(
+            select(
+                Niche.name,
+                Niche.marketplace_commission,
+                Niche.partial_client_commission,
+                Niche.client_commission,
+                Niche.return_percent,
+            ).where(Niche.id == niche_id)
+        ).one_or_none()
+        if niche is None:
+            return None
+        niche_product_ids = select(ProductToNiche.product_id).where(
+            ProductToNiche.niche_id == niche_id
+        )
+        products = self.__session.execute(
+            select(
+                ProductCard.id,
+                ProductCard.name,
+                ProductCard.global_id,
+                ProductCard.cost,
+                ProductCard.rating,
+                ProductCard.brand,
+                ProductCard.seller,
+            ).where(ProductCard.id.in_(niche_product_ids))
+        ).all()
+        category_niche_lists = self.__fetch_category_niche_lists(niche_product_ids)
+        histories = self.__fetch_histories(niche_product_ids, history_window)
+        return NicheEntity(
+            name=niche.name,
+            commissions={
+                HandlerType.MARKETPLACE: float(niche.marketplace_commission / 100),
+                HandlerType.PARTIAL_CLIENT: float(
+                    niche.partial_client_commission / 100
+                ),
+                HandlerType.CLIENT: float(niche.client_commission / 100),
+            },
+            returned_percent=float(niche.return_percent / 100),
+            _products=[
+                Product(
+                    name=product.name,
+                    global_id=product.global_id,
+                    cost=product.cost,
+                    history=ProductHistoryDomain(histories.get(product.id, [])),
+                    rating=float(product.rating) / 100,
+                    brand=product.brand,
+                    seller=product.seller,
+                    category_niche_list=category_niche_lists.get(product.id, []),
+                )
+                for product in products
+            ],
+        )
+
+    def __fetch_category_niche_lists(
+        self, product_ids: Select[tuple[int]]
+    ) -> dict[int, list[tuple[str, str]]]:
+        rows = self.__session.execute(
+            select(ProductToNiche.product_id, Category.name, Niche.name)
+            .join(Niche, Niche.id == ProductToNiche.niche_id)
+            .join(Niche.category)
+            .where(ProductToNiche.product_id.in_(product_ids))
+        ).all()
+        category_niche_lists: dict[int, list[tuple[str, str]]] = defaultdict(list)
+        for product_id, category_name, niche_name in rows:
+            category_niche_lists[product_id].append((category_name, niche_name))
+        return category_niche_lists
+
+    def __fetch_histories(
+        self, product_ids: Select[tuple[int]], history_window: HistoryWindow | None
+    ) -> dict[int, list[ProductHistoryUnit]]:
+        history_criteria = (
+            history_window.criteria() if history_window is not None else true()
+        )
+        units = self.__session.execute(
+            select(
+                ProductHistory.id,
+                ProductHistory.product_id,
+                ProductHistory.cost,
+                ProductHistory.date,
+            )
+            .where(ProductHistory.product_id.in_(product_ids))
+            .where(history_criteria)
+        ).all()
+        leftovers = self.__session.execute(
+            select(
+                Leftover.product_history_id,
+                Warehouse.global_id,
+                Leftover.type,
+                Leftover.quantity,
+            )
+            .join(Leftover.warehouse)
+            .join(Leftover.product_history)
+            .where(ProductHistory.product_id.in_(product_ids))
+            .where(history_criteria)
+        ).all()
+        storage_dicts = NicheFlatLoader.__group_leftovers(leftovers)
+        histories: dict[int, list[ProductHistoryUnit]] = defaultdict(list)
+        for history_id, product_id, cost, date in units:
+            histories[product_id].append(
+                ProductHistoryUnit(
+                    cost=cost,
+                    leftover=storage_dicts.get(history_id, StorageDict()),
+                    unit_date=date,
+                )
+            )
+        return histories
+
+    @staticmethod
+    def __group_leftovers(leftovers: Iterable[Row]) -> dict[int, StorageDict]:
+        grouped: dict[int, dict[int, list[SpecifiedLeftover]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        for history_id, warehouse_gid, leftover_type, quantity in leftovers:
+            grouped[history_id][warehouse_gid].append(
+                SpecifiedLeftover(leftover_type, quantity)
+            )
+        return {
+            history_id: StorageDict(
+                {gid: warehouse_leftovers[gid] for gid in sorted(warehouse_leftovers)}
+            )
+            for history_id, warehouse_leftovers in grouped.items()
+        }
@@ -1,12 +1,20 @@
 from dataclasses import dataclass, field
-from typing import Iterable, TypedDict
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Iterator, TypedDict
 
 from jorm.market.infrastructure import HandlerType
 from jorm.market.infrastructure import Niche as NicheEntity
-from sqlalchemy import select, update
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session, noload
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.names import lower_name
+from jarvis_db.core.pagination import iter_keyset
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+    history_window_options,
+)
 from jarvis_db.schemas import Category, Niche
 from sqlalchemy.sql.base import ExecutableOption
 
@@ -19,6 +27,12 @@ class _NicheTypedDict(TypedDict):
     return_percent: int
 
 
+class NicheLoadStrategy(Enum):
+    JOINED = "joined"
+    SELECTIN = "selectin"
+    SUBQUERY = "subquery"
+
+
 @dataclass(frozen=True)
 class NicheLoadOptions:
     atomic_options: list[ExecutableOption] = field(default_factory=list)
@@ -57,6 +71,53 @@ class NicheService:
         )
         self.__session.flush()
 
+    def ensure_all(
+        self, niche_entities: Iterable[tuple[int, NicheEntity]]
+    ) -> dict[tuple[int, str], int]:
+        key_to_niche = {
+            (category_id, niche.name): niche for category_id, niche in niche_entities
+        }
+        if not key_to_niche:
+            return {}
+        dialect = self.__session.get_bind().dialect
+        key_to_id = {
+            (category_id, lower_name(dialect, name)): niche_id
+            for niche_id, category_id, name in self.__session.execute(
+                select(Niche.id, Niche.category_id, Niche.name)
+                .where(
+                    Niche.category_id.in_(
+                        {category_id for category_id, _ in key_to_niche}
+                    )
+                )
+                .where(
+                    func.lower(Niche.name).in_(
+                        {lower_name(dialect, name) for _, name in key_to_niche}
+                    )
+                )
+            )
+        }
+        missing = {
+            (category_id, lower_name(dialect, name)): (category_id, niche)
+            for (category_id, name), niche in key_to_niche.items()
+            if (category_id, lower_name(dialect, name)) not in key_to_id
+        }
+        if missing:
+            created_ids = self.__session.execute(
+                insert(Niche).returning(Niche.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "category_id": category_id,
+                        **NicheService.__map_niche_entity_to_dict(niche),
+                    }
+                    for category_id, niche in missing.values()
+                ],
+            ).scalars()
+            key_to_id.update(zip(missing, created_ids))
+        return {
+            (category_id, name): key_to_id[(category_id, lower_name(dialect, name))]
+            for category_id, name in key_to_niche
+        }
+
     def find_by_id(self, niche_id: int) -> NicheEntity | None:
         niche = self.__session.execute(
             select(Niche).where(Niche.id == niche_id).options(noload(Niche.products))
@@ -75,12 +136,17 @@ class NicheService:
         )
         return self.__table_mapper.map(niche) if niche is not None else None
 
-    def fetch_by_id_atomic(self, niche_id: int) -> NicheEntity | None:
+    def fetch_by_id_atomic(
+        self, niche_id: int, history_window: HistoryWindow | None = None
+    ) -> NicheEntity | None:
         niche = (
             self.__session.execute(
                 select(Niche)
                 .where(Niche.id == niche_id)
-                .options(*self.__niche_load_options.atomic_options)
+                .options(
+                    *self.__niche_load_options.atomic_options,
+                    *history_window_options(history_window),
+                )
                 .distinct(Niche.id)
             )
             .unique()
@@ -94,20 +160,26 @@ class NicheService:
         niche = self.__session.execute(
             select(Niche)
             .where(Niche.category_id == category_id)
-            .where(Niche.name.ilike(name))
+            .where(func.lower(Niche.name) == func.lower(name))
             .options(noload(Niche.products))
         ).scalar_one_or_none()
         return (self.__table_mapper.map(niche), niche.id) if niche is not None else None
 
     def find_by_name_atomic(
-        self, name: str, category_id: int
+        self,
+        name: str,
+        category_id: int,
+        history_window: HistoryWindow | None = None,
     ) -> tuple[NicheEntity, int] | None:
         niche = (
             self.__session.execute(
                 select(Niche)
                 .where(Niche.category_id == category_id)
-                .where(Niche.name.ilike(name))
-                .options(*self.__niche_load_options.atomic_options)
+                .where(func.lower(Niche.name) == func.lower(name))
+                .options(
+                    *self.__niche_load_options.atomic_options,
+                    *history_window_options(history_window),
+                )
                 .distinct(Niche.id)
             )
             .unique()
@@ -127,12 +199,17 @@ class NicheService:
         )
         return {niche.id: self.__table_mapper.map(niche) for niche in niches}
 
-    def fetch_all_in_category_atomic(self, category_id: int) -> dict[int, NicheEntity]:
+    def fetch_all_in_category_atomic(
+        self, category_id: int, history_window: HistoryWindow | None = None
+    ) -> dict[int, NicheEntity]:
         niches = (
             self.__session.execute(
                 select(Niche)
                 .where(Niche.category_id == category_id)
-                .options(*self.__niche_load_options.atomic_options)
+                .options(
+                    *self.__niche_load_options.atomic_options,
+                    *history_window_options(history_window),
+                )
                 .distinct(Niche.id)
             )
             .unique()
@@ -155,11 +232,70 @@ class NicheService:
         )
         return {niche.id: self.__table_mapper.map(niche) for niche in niches}
 
+    def find_names_by_category(self, marketplace_id: int) -> dict[int, set[str]]:
+        names: dict[int, set[str]] = {}
+        for category_id, name in self.__session.execute(
+            select(Niche.category_id, Niche.name)
+            .join(Niche.category)
+            .where(Category.marketplace_id == marketplace_id)
+        ):
+            names.setdefault(category_id, set()).add(name)
+        return names
+
+    def find_names_in_marketplace(
+        self, marketplace_id: int, niche_id_range: tuple[int, int] | None = None
+    ) -> dict[int, tuple[str, str]]:
+        statement = (
+            select(Niche.id, Category.name, Niche.name)
+            .join(Niche.category)
+            .where(Category.marketplace_id == marketplace_id)
+            .order_by(Niche.id)
+        )
+        if niche_id_range is not None:
+            first_id, end_id = niche_id_range
+            statement = statement.where(Niche.id >= first_id).where(Niche.id < end_id)
+        return {
+            niche_id: (category_name, niche_name)
+            for niche_id, category_name, niche_name in self.__session.execute(statement)
+        }
+
+    def split_id_ranges(self, marketplace_id: int, parts: int) -> list[tuple[int, int]]:
+        niche_ids = (
+            self.__session.execute(
+                select(Niche.id)
+                .join(Niche.category)
+                .where(Category.marketplace_id == marketplace_id)
+                .order_by(Niche.id)
+            )
+            .scalars()
+            .all()
+        )
+        if not niche_ids:
+            return []
+        part_size = -(-len(niche_ids) // parts)
+        starts = niche_ids[::part_size]
+        return list(zip(starts, [*starts[1:], niche_ids[-1] + 1]))
+
+    def iter_all_in_marketplace(
+        self, marketplace_id: int, page_size: int = 1000, yield_per: int | None = None
+    ) -> Iterator[tuple[int, NicheEntity]]:
+        for niche in iter_keyset(
+            self.__session,
+            select(Niche)
+            .join(Niche.category)
+            .where(Category.marketplace_id == marketplace_id)
+            .options(noload(Niche.products)),
+            Niche.id,
+            page_size,
+            yield_per,
+        ):
+            yield niche.id, self.__table_mapper.map(niche)
+
     def exists_with_name(self, name: str, category_id: int) -> bool:
         niche_id = self.__session.execute(
             select(Niche.id)
             .where(Niche.category_id == category_id)
-            .where(Niche.name.ilike(name))
+            .where(func.lower(Niche.name) == func.lower(name))
         ).scalar_one_or_none()
         return niche_id is not None
 
@@ -182,7 +318,18 @@ class NicheService:
         self.__session.execute(
             update(Niche)
             .where(Niche.id == niche_id)
-            .values(**NicheService.__map_niche_entity_to_dict(niche))
+            .values(
+                **NicheService.__map_niche_entity_to_dict(niche),
+                update_date=datetime.utcnow(),
+            )
+        )
+        self.__session.flush()
+
+    def mark_updated(self, niche_id: int):
+        self.__session.execute(
+            update(Niche)
+            .where(Niche.id == niche_id)
+            .values(update_date=datetime.utcnow())
         )
         self.__session.flush()
 
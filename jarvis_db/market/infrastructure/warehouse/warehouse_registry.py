@@ -0,0 +1,93 @@
+from typing import Iterable
+
+from jorm.market.infrastructure import Warehouse as WarehouseEntity
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+
+from jarvis_db.core import Mapper
+from jarvis_db.schemas import Warehouse
+
+
+class WarehouseRegistry:
+    def __init__(
+        self,
+        session: Session,
+        table_mapper: Mapper[Warehouse, WarehouseEntity],
+    ):
+        self.__session = session
+        self.__table_mapper = table_mapper
+        self.__marketplaces: dict[int, dict[int, tuple[int, WarehouseEntity]]] = {}
+        self.__warehouses: dict[int, WarehouseEntity] = {}
+        event.listen(session, "after_rollback", lambda _: self.clear())
+        event.listen(session, "after_soft_rollback", lambda *_: self.clear())
+
+    def find_id(self, marketplace_id: int, global_id: int) -> int | None:
+        warehouse = self.__load_marketplace(marketplace_id).get(global_id)
+        return warehouse[0] if warehouse is not None else None
+
+    def find_ids(self, marketplace_id: int) -> dict[int, int]:
+        return {
+            global_id: warehouse_id
+            for global_id, (warehouse_id, _) in self.__load_marketplace(
+                marketplace_id
+            ).items()
+        }
+
+    def find_by_global_id(
+        self, marketplace_id: int, global_id: int
+    ) -> tuple[int, WarehouseEntity] | None:
+        return self.__load_marketplace(marketplace_id).get(global_id)
+
+    def find_by_id(self, warehouse_id: int) -> WarehouseEntity | None:
+        if warehouse_id not in self.__warehouses:
+            marketplace_id = self.__session.execute(
+                select(Warehouse.marketplace_id).where(Warehouse.id == warehouse_id)
+            ).scalar_one_or_none()
+            if marketplace_id is None:
+                return None
+            self.__load_marketplace(marketplace_id)
+        return self.__warehouses.get(warehouse_id)
+
+    def filter_existing_global_ids(
+        self, marketplace_id: int, global_ids: Iterable[int]
+    ) -> list[int]:
+        warehouses = self.__load_marketplace(marketplace_id)
+        return list(set(global_ids) - warehouses.keys())
+
+    def add(
+        self, marketplace_id: int, warehouse_id: int, warehouse: WarehouseEntity
+    ) -> None:
+        if marketplace_id in self.__marketplaces:
+            self.__marketplaces[marketplace_id][warehouse.global_id] = (
+                warehouse_id,
+                warehouse,
+            )
+            self.__warehouses[warehouse_id] = warehouse
+
+    def clear(self) -> None:
+        self.__marketplaces.clear()
+        self.__warehouses.clear()
+
+    def __load_marketplace(
+        self, marketplace_id: int
+    ) -> dict[int, tuple[int, WarehouseEntity]]:
+        if marketplace_id not in self.__marketplaces:
+            warehouses = (
+                self.__session.execute(
+                    select(Warehouse)
+                    .where(Warehouse.marketplace_id == marketplace_id)
+                    .options(joinedload(Warehouse.address))
+                )
+                .scalars()
+                .all()
+            )
+            entities = {
+                warehouse.id: self.__table_mapper.map(warehouse)
+                for warehouse in warehouses
+            }
+            self.__marketplaces[marketplace_id] = {
+                warehouse.global_id: (warehouse.id, entities[warehouse.id])
+                for warehouse in warehouses
+            }
+            self.__warehouses.update(entities)
+        return self.__marketplaces[marketplace_id]
@@ -2,10 +2,15 @@ from typing import Iterable
 
 from jorm.market.infrastructure import HandlerType
 from jorm.market.infrastructure import Warehouse as WarehouseEntity
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select
 from sqlalchemy.orm import Session, joinedload
 
 from jarvis_db.core import Mapper
+from jarvis_db.core.cache import TwoLevelCache
+from jarvis_db.core.upsert import upsert
+from jarvis_db.market.infrastructure.warehouse.warehouse_registry import (
+    WarehouseRegistry,
+)
 from jarvis_db.schemas import Address, Warehouse
 
 
@@ -20,28 +25,106 @@ class WarehouseService:
         self,
         session: Session,
         table_mapper: Mapper[Warehouse, WarehouseEntity],
+        cache: TwoLevelCache | None = None,
+        registry: WarehouseRegistry | None = None,
     ):
         self.__session = session
         self.__table_mapper = table_mapper
+        self.__cache = cache
+        self.__registry = registry
 
     def create_warehouse(self, warehouse_entity: WarehouseEntity, marketplace_id: int):
-        self.__session.add(
-            WarehouseService.__create_warehouse_entity(warehouse_entity, marketplace_id)
-        )
-        self.__session.flush()
+        self.create_all((warehouse_entity,), marketplace_id)
 
     def create_all(
         self, warehouse_entities: Iterable[WarehouseEntity], marketplace_id: int
     ):
-        self.__session.add_all(
-            (
-                WarehouseService.__create_warehouse_entity(warehouse, marketplace_id)
-                for warehouse in warehouse_entities
+        warehouses = [
+            WarehouseService.__create_warehouse_entity(warehouse, marketplace_id)
+            for warehouse in warehouse_entities
+        ]
+        self.__session.add_all(warehouses)
+        self.__session.flush()
+        self.__invalidate_cache(marketplace_id)
+        if self.__registry is not None:
+            for warehouse in warehouses:
+                self.__registry.add(
+                    marketplace_id, warehouse.id, self.__table_mapper.map(warehouse)
+                )
+
+    def ensure_all(
+        self, warehouse_entities: Iterable[WarehouseEntity], marketplace_id: int
+    ) -> dict[int, int]:
+        global_id_to_entity = {
+            warehouse.global_id: warehouse for warehouse in warehouse_entities
+        }
+        if not global_id_to_entity:
+            return {}
+        global_id_to_id = self.__find_ids_by_global_ids(
+            marketplace_id, global_id_to_entity.keys()
+        )
+        missing = [
+            warehouse
+            for global_id, warehouse in global_id_to_entity.items()
+            if global_id not in global_id_to_id
+        ]
+        if not missing:
+            return global_id_to_id
+        address_ids = list(
+            self.__session.execute(
+                insert(Address).returning(Address.id, sort_by_parameter_order=True),
+                [
+                    WarehouseService.__create_address_values(warehouse)
+                    for warehouse in missing
+                ],
+            ).scalars()
+        )
+        created: dict[int, int] = dict(
+            upsert(
+                self.__session,
+                Warehouse,
+                [
+                    WarehouseService.__create_warehouse_values(
+                        warehouse, marketplace_id, address_id
+                    )
+                    for warehouse, address_id in zip(missing, address_ids, strict=True)
+                ],
+                index_elements=[Warehouse.marketplace_id, Warehouse.global_id],
+                returning=[Warehouse.global_id, Warehouse.id],
             )
         )
-        self.__session.flush()
+        global_id_to_id.update(created)
+        conflicted_address_ids = [
+            address_id
+            for warehouse, address_id in zip(missing, address_ids, strict=True)
+            if warehouse.global_id not in created
+        ]
+        if conflicted_address_ids:
+            self.__session.execute(
+                delete(Address).where(Address.id.in_(conflicted_address_ids))
+            )
+            global_id_to_id.update(
+                self.__find_ids_by_global_ids(
+                    marketplace_id,
+                    (
+                        warehouse.global_id
+                        for warehouse in missing
+                        if warehouse.global_id not in created
+                    ),
+                    use_registry=False,
+                )
+            )
+        self.__invalidate_cache(marketplace_id)
+        if self.__registry is not None:
+            for global_id, warehouse_id in created.items():
+                self.__registry.add(
+                    marketplace_id, warehouse_id, global_id_to_entity[global_id]
+                )
+        return global_id_to_id
 
     def find_by_id(self, warehouse_id: int) -> WarehouseEntity | None:
+        if self.__registry is not None:
+            return self.__registry.find_by_id(warehouse_id)
         warehouse = self.__session.execute(
             select(Warehouse)
             .where(Warehouse.id == warehouse_id)
@@ -55,7 +138,7 @@ class WarehouseService:
         warehouse = self.__session.execute(
             select(Warehouse)
             .where(Warehouse.marketplace_id == marketplace_id)
-            .where(Warehouse.name.ilike(name))
+            .where(func.lower(Warehouse.name) == func.lower(name))
             .options(joinedload(Warehouse.address))
         ).scalar_one_or_none()
         return (
@@ -67,6 +150,8 @@ class WarehouseService:
     def find_by_global_id(
         self, marketplace_id: int, global_id: int
     ) -> tuple[int, WarehouseEntity] | None:
+        if self.__registry is not None:
+            return self.__registry.find_by_global_id(marketplace_id, global_id)
         warehouse = self.__session.execute(
             select(Warehouse)
             .where(Warehouse.marketplace_id == marketplace_id)
@@ -80,6 +165,16 @@ class WarehouseService:
         )
 
     def find_all_warehouses(self, marketplace_id: int) -> dict[int, WarehouseEntity]:
+        if self.__cache is None:
+            return self.__find_all_warehouses(marketplace_id)
+        return dict(
+            self.__cache.get_or_load(
+                WarehouseService.__cache_key(marketplace_id),
+                lambda: self.__find_all_warehouses(marketplace_id),
+            )
+        )
+
+    def __find_all_warehouses(self, marketplace_id: int) -> dict[int, WarehouseEntity]:
         warehouses = (
             self.__session.execute(
                 select(Warehouse)
@@ -98,7 +193,7 @@ class WarehouseService:
             self.__session.execute(
                 select(Warehouse)
                 .where(Warehouse.marketplace_id == marketplace_id)
-                .where(Warehouse.name.ilike(name))
+                .where(func.lower(Warehouse.name) == func.lower(name))
             ).scalar_one_or_none()
             is not None
         )
@@ -125,6 +220,61 @@ class WarehouseService:
         )
         return list(set(ids) - set(existing_ids))
 
+    def __find_ids_by_global_ids(
+        self, marketplace_id: int, global_ids: Iterable[int], use_registry: bool = True
+    ) -> dict[int, int]:
+        global_ids = set(global_ids)
+        if use_registry and self.__registry is not None:
+            return {
+                global_id: warehouse_id
+                for global_id, warehouse_id in self.__registry.find_ids(
+                    marketplace_id
+                ).items()
+                if global_id in global_ids
+            }
+        return dict(
+            self.__session.execute(
+                select(Warehouse.global_id, Warehouse.id)
+                .where(Warehouse.marketplace_id == marketplace_id)
+                .where(Warehouse.global_id.in_(global_ids))
+            ).all()
+        )
+
+    def __invalidate_cache(self, marketplace_id: int):
+        if self.__cache is not None:
+            self.__cache.invalidate_in_transaction(
+                self.__session, WarehouseService.__cache_key(marketplace_id)
+            )
+
+    @staticmethod
+    def __cache_key(marketplace_id: int) -> tuple[str, int]:
+        return "warehouses", marketplace_id
+
+    @staticmethod
+    def __create_address_values(warehouse: WarehouseEntity) -> dict:
+        return {
+            "country": "",
+            "region": warehouse.address.region,
+            "street": warehouse.address.street,
+            "number": "",
+            "corpus": "",
+        }
+
+    @staticmethod
+    def __create_warehouse_values(
+        warehouse: WarehouseEntity, marketplace_id: int, address_id: int
+    ) -> dict:
+        return {
+            "marketplace_id": marketplace_id,
+            "global_id": warehouse.global_id,
+            "name": warehouse.name,
+            "type": WarehouseService.__handler_type_to_int.get(
+                warehouse.handler_type, 0
+            ),
+            "main_coefficient": int(warehouse.main_coefficient * 100),
+            "address_id": address_id,
+        }
+
     @staticmethod
     def __create_warehouse_entity(
         warehouse: WarehouseEntity, marketplace_id: int
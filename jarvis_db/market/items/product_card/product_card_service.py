@@ -1,10 +1,29 @@
-from typing import Iterable, TypedDict
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, TypedDict
 
-from jorm.market.items import Product
-from sqlalchemy import delete, select, update
-from sqlalchemy.orm import Session, joinedload, noload
+from jorm.market.items import Product, ProductHistory as ProductHistoryDomain
+from sqlalchemy import (
+    Connection,
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.pagination import iter_keyset
+from jarvis_db.core.upsert import upsert
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+    history_window_options,
+)
 from jarvis_db.schemas import (
     Category,
     Leftover,
@@ -12,6 +31,8 @@ from jarvis_db.schemas import (
     ProductCard,
     ProductHistory,
     ProductToNiche,
+    StorageInfo,
+    UserToProduct,
 )
 from jarvis_db.market.items.product_card_history.product_history_service import (
     ProductHistoryService,
@@ -34,6 +55,12 @@ class ProductCardService:
         .joinedload(Niche.category)
         .load_only(Category.name),
     ]
+    __iter_options = [
+        noload(ProductCard.histories),
+        selectinload(ProductCard.niches)
+        .joinedload(Niche.category)
+        .load_only(Category.name),
+    ]
 
     def __init__(
         self,
@@ -46,58 +73,42 @@ class ProductCardService:
         self.__history_service = history_service
 
     def create_product(self, product: Product, niche_ids: Iterable[int]) -> int:
-        db_product = ProductCard(
-            **ProductCardService.__map_entity_to_typed_dict(product)
-        )
         with self.__session.begin_nested():
-            self.__session.add(db_product)
-            if niche_ids:
-                self.__session.flush()
-                self.__session.add_all(
-                    (
-                        ProductToNiche(product_id=db_product.id, niche_id=niche_id)
-                        for niche_id in niche_ids
-                    )
-                )
-            self.__history_service.create(product.history, db_product.id)
-            self.__session.flush()
-            return db_product.id
-
-    def create_products(self, products: Iterable[Product], niche_ids: Iterable[int]):
-        db_products = [
-            ProductCard(**ProductCardService.__map_entity_to_typed_dict(product))
-            for product in products
-        ]
+            return self.upsert_products((product,), niche_ids)[product.global_id]
+
+    def create_products(
+        self,
+        products: Iterable[Product],
+        niche_ids: Iterable[int],
+        batch_size: int = 1000,
+    ):
         with self.__session.begin_nested():
-            self.__session.add_all(db_products)
-            if niche_ids:
-                self.__session.flush()
-                self.__session.add_all(
-                    (
-                        ProductToNiche(product_id=product.id, niche_id=niche_id)
-                        for product in db_products
-                        for niche_id in niche_ids
-                    )
-                )
-            self.__session.flush()
-            for db_product, product in zip(db_products, products, strict=True):
-                self.__history_service.create(product.history, db_product.id)
-            self.__session.flush()
+            self.upsert_products(products, niche_ids, batch_size)
 
     def upsert_product(self, product: Product, niche_ids: Iterable[int]):
-        found_product = self.__session.execute(
-            select(ProductCard).where(ProductCard.global_id == product.global_id)
-        ).scalar_one_or_none()
-        if found_product is None:
-            self.create_product(product, niche_ids)
-        else:
-            self.__session.add_all(
-                (
-                    ProductToNiche(product_id=found_product.id, niche_id=niche_id)
-                    for niche_id in niche_ids
+        self.upsert_products((product,), niche_ids)
+
+    def upsert_products(
+        self,
+        products: Iterable[Product],
+        niche_ids: Iterable[int],
+        batch_size: int = 1000,
+        warehouse_ids: dict[int, int] | None = None,
+    ) -> dict[int, int]:
+        niche_ids = list(niche_ids)
+        marketplace_id = self.__find_marketplace_id(niche_ids)
+        if niche_ids and marketplace_id is None:
+            raise Exception("Product cards can only be upserted into existing niches")
+        products_iterator = iter(products)
+        product_ids: dict[int, int] = {}
+        while batch := list(islice(products_iterator, batch_size)):
+            product_ids.update(
+                self.__upsert_products_batch(
+                    batch, niche_ids, marketplace_id, warehouse_ids
                 )
             )
-            self.__session.flush()
+        self.__session.flush()
+        return product_ids
 
     def find_by_id(self, product_id: int) -> Product | None:
         product = (
@@ -111,7 +122,9 @@ class ProductCardService:
         )
         return self.__table_mapper.map(product) if product is not None else None
 
-    def find_by_id_atomic(self, product_id: int) -> Product | None:
+    def find_by_id_atomic(
+        self, product_id: int, history_window: HistoryWindow | None = None
+    ) -> Product | None:
         product = (
             self.__session.execute(
                 select(ProductCard)
@@ -124,6 +137,7 @@ class ProductCardService:
                     joinedload(ProductCard.histories)
                     .joinedload(ProductHistory.leftovers)
                     .joinedload(Leftover.warehouse, innerjoin=True),
+                    *history_window_options(history_window),
                 )
             )
             .unique()
@@ -163,6 +177,14 @@ class ProductCardService:
             .scalar_one_or_none()
         )
 
+    def find_ids_in_niche(self, niche_id: int) -> dict[int, int]:
+        rows = self.__session.execute(
+            select(ProductCard.global_id, ProductCard.id)
+            .join(ProductToNiche, ProductCard.id == ProductToNiche.product_id)
+            .where(ProductToNiche.niche_id == niche_id)
+        ).all()
+        return {global_id: product_id for global_id, product_id in rows}
+
     def find_all_in_niche(self, niche_id: int) -> dict[int, Product]:
         niche_products = (
             self.__session.execute(
@@ -179,6 +201,21 @@ class ProductCardService:
             product.id: self.__table_mapper.map(product) for product in niche_products
         }
 
+    def iter_all_in_niche(
+        self, niche_id: int, page_size: int = 1000, yield_per: int | None = None
+    ) -> Iterator[tuple[int, Product]]:
+        for product in iter_keyset(
+            self.__session,
+            select(ProductCard)
+            .join(ProductToNiche, ProductCard.id == ProductToNiche.product_id)
+            .where(ProductToNiche.niche_id == niche_id)
+            .options(*ProductCardService.__iter_options),
+            ProductCard.id,
+            page_size,
+            yield_per,
+        ):
+            yield product.id, self.__table_mapper.map(product)
+
     def update(self, product_id: int, product: Product):
         self.__session.execute(
             update(ProductCard)
@@ -187,6 +224,23 @@ class ProductCardService:
         )
         self.__session.flush()
 
+    def update_all(
+        self, products: Iterable[tuple[int, Product]], batch_size: int = 1000
+    ):
+        products_iterator = iter(products)
+        while batch := list(islice(products_iterator, batch_size)):
+            self.__session.execute(
+                update(ProductCard),
+                [
+                    {
+                        "id": product_id,
+                        **ProductCardService.__map_entity_to_typed_dict(product),
+                    }
+                    for product_id, product in batch
+                ],
+            )
+        self.__session.flush()
+
     def add_niche_to_product(self, product_id: int, niche_id: int) -> None:
         self.__session.add(ProductToNiche(product_id=product_id, niche_id=niche_id))
         self.__session.flush()
@@ -216,6 +270,220 @@ class ProductCardService:
         )
         return list(set(ids) - set(existing_ids))
 
+    def migrate_marketplace_scope(self) -> int:
+        connection = self.__session.connection()
+        inspector = inspect(connection)
+        if "marketplace_id" not in {
+            column["name"]
+            for column in inspector.get_columns(ProductCard.__tablename__)
+        }:
+            connection.execute(
+                text(
+                    f"ALTER TABLE {ProductCard.__tablename__} "
+                    "ADD COLUMN marketplace_id INTEGER "
+                    "REFERENCES marketplaces (id) ON DELETE CASCADE"
+                )
+            )
+        self.__drop_unique_user_product_links(connection)
+        self.__session.execute(
+            update(ProductCard)
+            .where(ProductCard.marketplace_id.is_(None))
+            .values(
+                marketplace_id=select(func.min(Category.marketplace_id))
+                .join(Category.niches)
+                .join(ProductToNiche, ProductToNiche.niche_id == Niche.id)
+                .where(ProductToNiche.product_id == ProductCard.id)
+                .scalar_subquery()
+            )
+        )
+        merged = self.__merge_duplicate_cards()
+        for index in (
+            *ProductCard.__table__.indexes,
+            *UserToProduct.__table__.indexes,
+        ):
+            index.create(connection, checkfirst=True)
+        self.__session.flush()
+        return merged
+
+    def __drop_unique_user_product_links(self, connection: Connection) -> None:
+        table_name = UserToProduct.__tablename__
+        unique_constraints = [
+            constraint
+            for constraint in inspect(connection).get_unique_constraints(table_name)
+            if constraint["column_names"] == ["product_id"]
+        ]
+        if not unique_constraints:
+            return
+        if connection.dialect.name != "sqlite":
+            for constraint in unique_constraints:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {table_name} "
+                        f"DROP CONSTRAINT {constraint['name']}"
+                    )
+                )
+            return
+        legacy_name = f"{table_name}_legacy"
+        connection.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+        UserToProduct.__table__.create(connection)
+        connection.execute(
+            text(
+                f"INSERT INTO {table_name} (user_id, product_id) "
+                f"SELECT user_id, product_id FROM {legacy_name}"
+            )
+        )
+        connection.execute(text(f"DROP TABLE {legacy_name}"))
+
+    def __merge_duplicate_cards(self) -> int:
+        keepers = (
+            select(
+                ProductCard.marketplace_id,
+                ProductCard.global_id,
+                func.min(ProductCard.id).label("keeper_id"),
+            )
+            .group_by(ProductCard.marketplace_id, ProductCard.global_id)
+            .having(func.count() > 1)
+            .subquery()
+        )
+        keeper_ids = {
+            product_id: keeper_id
+            for product_id, keeper_id in self.__session.execute(
+                select(ProductCard.id, keepers.c.keeper_id)
+                .join(
+                    keepers,
+                    and_(
+                        ProductCard.global_id == keepers.c.global_id,
+                        ProductCard.marketplace_id.is_not_distinct_from(
+                            keepers.c.marketplace_id
+                        ),
+                    ),
+                )
+                .where(ProductCard.id != keepers.c.keeper_id)
+            )
+        }
+        if not keeper_ids:
+            return 0
+        for link_table, column_name in (
+            (ProductToNiche.__table__, "niche_id"),
+            (UserToProduct.__table__, "user_id"),
+        ):
+            affected_ids = [*keeper_ids, *set(keeper_ids.values())]
+            links = {
+                (keeper_ids.get(product_id, product_id), linked_id)
+                for product_id, linked_id in self.__session.execute(
+                    select(link_table.c.product_id, link_table.c[column_name]).where(
+                        link_table.c.product_id.in_(affected_ids)
+                    )
+                )
+            }
+            self.__session.execute(
+                delete(link_table).where(link_table.c.product_id.in_(affected_ids))
+            )
+            if links:
+                self.__session.execute(
+                    insert(link_table),
+                    [
+                        {"product_id": product_id, column_name: linked_id}
+                        for product_id, linked_id in links
+                    ],
+                )
+        for table, column in (
+            (ProductHistory.__table__, ProductHistory.__table__.c.product_id),
+            (StorageInfo.__table__, StorageInfo.__table__.c.product_card_id),
+        ):
+            self.__session.execute(
+                update(table)
+                .where(column == bindparam("duplicate_id"))
+                .values({column.name: bindparam("keeper_id")}),
+                [
+                    {"duplicate_id": duplicate_id, "keeper_id": keeper_id}
+                    for duplicate_id, keeper_id in keeper_ids.items()
+                ],
+            )
+        self.__session.execute(
+            delete(ProductCard).where(ProductCard.id.in_(keeper_ids))
+        )
+        return len(keeper_ids)
+
+    def __find_marketplace_id(self, niche_ids: list[int]) -> int | None:
+        if not niche_ids:
+            return None
+        marketplace_ids = (
+            self.__session.execute(
+                select(Category.marketplace_id)
+                .join(Category.niches)
+                .where(Niche.id.in_(niche_ids))
+                .distinct()
+            )
+            .scalars()
+            .all()
+        )
+        if len(marketplace_ids) > 1:
+            raise Exception("Niches of a product card must share one marketplace")
+        return marketplace_ids[0] if marketplace_ids else None
+
+    def __upsert_products_batch(
+        self,
+        products: list[Product],
+        niche_ids: list[int],
+        marketplace_id: int | None,
+        warehouse_ids: dict[int, int] | None,
+    ) -> dict[int, int]:
+        global_id_to_product = {product.global_id: product for product in products}
+        rows = upsert(
+            self.__session,
+            ProductCard,
+            [
+                {
+                    "marketplace_id": marketplace_id,
+                    **ProductCardService.__map_entity_to_typed_dict(product),
+                }
+                for product in global_id_to_product.values()
+            ],
+            index_elements=(
+                [ProductCard.marketplace_id, ProductCard.global_id]
+                if marketplace_id is not None
+                else [ProductCard.global_id]
+            ),
+            update_columns=("name", "cost", "rating", "brand", "seller"),
+            index_where=(
+                ProductCard.marketplace_id.is_(None) if marketplace_id is None else None
+            ),
+            returning=[ProductCard.global_id, ProductCard.id],
+        )
+        product_ids = {global_id: product_id for global_id, product_id in rows}
+        if niche_ids:
+            upsert(
+                self.__session,
+                ProductToNiche,
+                [
+                    {"product_id": product_id, "niche_id": niche_id}
+                    for product_id in product_ids.values()
+                    for niche_id in niche_ids
+                ],
+                index_elements=[ProductToNiche.product_id, ProductToNiche.niche_id],
+            )
+        existing_dates: dict[int, set[datetime]] = {}
+        for product_id, date in self.__session.execute(
+            select(ProductHistory.product_id, ProductHistory.date).where(
+                ProductHistory.product_id.in_(product_ids.values())
+            )
+        ):
+            existing_dates.setdefault(product_id, set()).add(date)
+        histories = (
+            (
+                product_id,
+                ProductHistoryDomain(
+                    unit
+                    for unit in global_id_to_product[global_id].history.get_history()
+                    if unit.unit_date not in existing_dates.get(product_id, ())
+                ),
+            )
+            for global_id, product_id in product_ids.items()
+        )
+        self.__history_service.create_all(histories, warehouse_ids)
+        return product_ids
+
     @staticmethod
     def __map_entity_to_typed_dict(product: Product) -> _ProductTypedDict:
         return _ProductTypedDict(
@@ -0,0 +1,200 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    event,
+    inspect,
+    text,
+)
+from sqlalchemy.orm import Session
+
+from jarvis_db.db_config import Base
+from jarvis_db.market.items.product_card_history.history_window import HistoryWindow
+from jarvis_db.schemas import Leftover, ProductCard, ProductHistory, Warehouse
+
+LEFTOVER_DATE_COLUMN = "product_history_date"
+
+
+def period_start(date: datetime) -> datetime:
+    return datetime(date.year, date.month, 1)
+
+
+def next_period(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def iter_periods(since: datetime, until: datetime) -> Iterator[datetime]:
+    start = period_start(since)
+    while start < until:
+        yield start
+        start = next_period(start)
+
+
+def partition_name(table_name: str, start: datetime) -> str:
+    return f"{table_name}_p{start:%Y%m}"
+
+
+def leftover_date_values(leftovers: Table, date: datetime) -> dict[str, datetime]:
+    if LEFTOVER_DATE_COLUMN in leftovers.c:
+        return {LEFTOVER_DATE_COLUMN: date}
+    return {}
+
+
+class HistoryPartitioning(ABC):
+    @abstractmethod
+    def ensure_partitions(
+        self, session: Session, since: datetime, until: datetime
+    ) -> list[str]:
+        pass
+
+    @abstractmethod
+    def insert_tables(
+        self, session: Session, dates: Iterable[datetime]
+    ) -> tuple[Table, Table]:
+        pass
+
+    @abstractmethod
+    def find_history_tables(
+        self, session: Session, history_window: HistoryWindow | None
+    ) -> list[tuple[Table, Table]]:
+        pass
+
+
+class RangeHistoryPartitioning(HistoryPartitioning):
+    def __init__(self):
+        metadata = MetaData()
+        self.__histories = Table(
+            ProductHistory.__tablename__,
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("cost", Integer, nullable=False),
+            Column("date", DateTime(), primary_key=True, index=True),
+            Column(
+                "product_id",
+                Integer,
+                ForeignKey(ProductCard.__table__.c.id, ondelete="CASCADE"),
+                nullable=False,
+            ),
+            Index("ix_product_histories_product_id_date", "product_id", "date"),
+            postgresql_partition_by="RANGE (date)",
+        )
+        self.__leftovers = Table(
+            Leftover.__tablename__,
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("type", String(100), nullable=False),
+            Column("quantity", Integer, nullable=False),
+            Column(
+                "warehouse_id",
+                Integer,
+                ForeignKey(Warehouse.__table__.c.id, ondelete="CASCADE"),
+                nullable=False,
+                index=True,
+            ),
+            Column("product_history_id", Integer, nullable=False, index=True),
+            Column(LEFTOVER_DATE_COLUMN, DateTime(), primary_key=True),
+            ForeignKeyConstraint(
+                ["product_history_id", LEFTOVER_DATE_COLUMN],
+                [self.__histories.c.id, self.__histories.c.date],
+                ondelete="CASCADE",
+            ),
+            postgresql_partition_by=f"RANGE ({LEFTOVER_DATE_COLUMN})",
+        )
+        self.__periods_key = ("history_partitions", id(self))
+        self.__listening_key = ("history_partitions_listening", id(self))
+
+    def create_tables(
+        self,
+        connection: Connection,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> None:
+        if connection.dialect.name != "postgresql":
+            Base.metadata.create_all(connection)
+            return
+        history_tables = (ProductHistory.__table__, Leftover.__table__)
+        Base.metadata.create_all(
+            connection,
+            tables=[
+                table
+                for table in Base.metadata.sorted_tables
+                if table not in history_tables
+            ],
+        )
+        self.__histories.create(connection, checkfirst=True)
+        self.__leftovers.create(connection, checkfirst=True)
+        if since is not None and until is not None:
+            self.__create_partitions(connection, iter_periods(since, until))
+
+    def ensure_partitions(
+        self, session: Session, since: datetime, until: datetime
+    ) -> list[str]:
+        connection = session.connection()
+        if connection.dialect.name != "postgresql":
+            return []
+        existing_periods = self.__find_existing_periods(session)
+        periods = list(iter_periods(since, until))
+        self.__create_partitions(
+            connection, (start for start in periods if start not in existing_periods)
+        )
+        existing_periods.update(periods)
+        return [partition_name(self.__histories.name, start) for start in periods]
+
+    def insert_tables(
+        self, session: Session, dates: Iterable[datetime]
+    ) -> tuple[Table, Table]:
+        if session.connection().dialect.name != "postgresql":
+            return ProductHistory.__table__, Leftover.__table__
+        dates = list(dates)
+        if dates:
+            self.ensure_partitions(session, min(dates), next_period(max(dates)))
+        return self.__histories, self.__leftovers
+
+    def find_history_tables(
+        self, session: Session, history_window: HistoryWindow | None
+    ) -> list[tuple[Table, Table]]:
+        return [(ProductHistory.__table__, Leftover.__table__)]
+
+    def __create_partitions(
+        self, connection: Connection, periods: Iterable[datetime]
+    ) -> None:
+        for start in periods:
+            for table in (self.__histories, self.__leftovers):
+                connection.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS "
+                        f"{partition_name(table.name, start)} "
+                        f"PARTITION OF {table.name} "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') "
+                        f"TO ('{next_period(start):%Y-%m-%d}')"
+                    )
+                )
+
+    def __find_existing_periods(self, session: Session) -> set[datetime]:
+        if self.__listening_key not in session.info:
+            session.info[self.__listening_key] = True
+            for event_name in ("after_commit", "after_soft_rollback"):
+                event.listen(
+                    session,
+                    event_name,
+                    lambda *_: session.info.pop(self.__periods_key, None),
+                )
+        if self.__periods_key not in session.info:
+            prefix = f"{self.__histories.name}_p"
+            session.info[self.__periods_key] = {
+                datetime.strptime(name.removeprefix(prefix), "%Y%m")
+                for name in inspect(session.connection()).get_table_names()
+                if name.startswith(prefix)
+            }
+        return session.info[self.__periods_key]
@@ -0,0 +1,209 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from jarvis_db.market.items.product_card_history.history_partitioning import (
+    HistoryPartitioning,
+    leftover_date_values,
+)
+from jarvis_db.schemas import Leftover, ProductHistory
+
+_T = TypeVar("_T")
+
+
+class RetentionBucket(Enum):
+    DAY = "day"
+    WEEK = "week"
+
+    def start_of(self, date: datetime) -> datetime:
+        day = datetime(date.year, date.month, date.day)
+        if self is RetentionBucket.WEEK:
+            return day - timedelta(days=day.weekday())
+        return day
+
+
+@dataclass(frozen=True)
+class HistoryRetentionPolicy:
+    keep_raw_for: timedelta = timedelta(days=90)
+    bucket: RetentionBucket = RetentionBucket.DAY
+    products_per_batch: int = 500
+
+    def cutoff(self, now: datetime) -> datetime:
+        return self.bucket.start_of(now - self.keep_raw_for)
+
+
+@dataclass(frozen=True)
+class HistoryRetentionReport:
+    products: int = 0
+    histories_removed: int = 0
+    leftovers_removed: int = 0
+    histories_created: int = 0
+    leftovers_created: int = 0
+
+    def __add__(self, other: "HistoryRetentionReport") -> "HistoryRetentionReport":
+        return HistoryRetentionReport(
+            products=self.products + other.products,
+            histories_removed=self.histories_removed + other.histories_removed,
+            leftovers_removed=self.leftovers_removed + other.leftovers_removed,
+            histories_created=self.histories_created + other.histories_created,
+            leftovers_created=self.leftovers_created + other.leftovers_created,
+        )
+
+
+class ProductHistoryCompactor:
+    __chunk_size = 500
+
+    def __init__(
+        self, session: Session, partitioning: HistoryPartitioning | None = None
+    ):
+        self.__session = session
+        self.__partitioning = partitioning
+
+    def find_product_ids(
+        self, cutoff: datetime, after_product_id: int, limit: int
+    ) -> list[int]:
+        return list(
+            self.__session.execute(
+                select(ProductHistory.product_id)
+                .where(ProductHistory.date < cutoff)
+                .where(ProductHistory.product_id > after_product_id)
+                .distinct()
+                .order_by(ProductHistory.product_id)
+                .limit(limit)
+            ).scalars()
+        )
+
+    def compact(
+        self, product_ids: Iterable[int], cutoff: datetime, bucket: RetentionBucket
+    ) -> HistoryRetentionReport:
+        product_ids = list(product_ids)
+        buckets: dict[tuple[int, datetime], list[tuple[int, int]]] = defaultdict(list)
+        for history_id, product_id, cost, date in self.__session.execute(
+            select(
+                ProductHistory.id,
+                ProductHistory.product_id,
+                ProductHistory.cost,
+                ProductHistory.date,
+            )
+            .where(ProductHistory.product_id.in_(product_ids))
+            .where(ProductHistory.date < cutoff)
+        ):
+            buckets[(product_id, bucket.start_of(date))].append((history_id, cost))
+        buckets = {key: units for key, units in buckets.items() if len(units) > 1}
+        if not buckets:
+            return HistoryRetentionReport(products=len(product_ids))
+        history_to_bucket = {
+            history_id: key for key, units in buckets.items() for history_id, _ in units
+        }
+        bucket_leftovers = self.__sum_leftovers(history_to_bucket)
+        keys = list(buckets)
+        histories, leftovers = (
+            (ProductHistory.__table__, Leftover.__table__)
+            if self.__partitioning is None
+            else self.__partitioning.insert_tables(
+                self.__session, (bucket_start for _, bucket_start in keys)
+            )
+        )
+        created_ids = self.__session.execute(
+            insert(histories).returning(histories.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "product_id": product_id,
+                    "date": bucket_start,
+                    "cost": round(
+                        sum(cost for _, cost in buckets[(product_id, bucket_start)])
+                        / len(buckets[(product_id, bucket_start)])
+                    ),
+                }
+                for product_id, bucket_start in keys
+            ],
+        ).scalars()
+        leftovers_to_create = [
+            {
+                "product_history_id": created_id,
+                "warehouse_id": warehouse_id,
+                "type": leftover_type,
+                "quantity": quantity,
+                **leftover_date_values(leftovers, key[1]),
+            }
+            for key, created_id in zip(keys, created_ids)
+            for (warehouse_id, leftover_type), quantity in bucket_leftovers[key].items()
+        ]
+        if leftovers_to_create:
+            self.__session.execute(insert(leftovers), leftovers_to_create)
+        leftovers_removed = 0
+        histories_removed = 0
+        for chunk in _chunked(history_to_bucket, self.__chunk_size):
+            leftovers_removed += self.__session.execute(
+                delete(Leftover).where(Leftover.product_history_id.in_(chunk))
+            ).rowcount
+            histories_removed += self.__session.execute(
+                delete(ProductHistory).where(ProductHistory.id.in_(chunk))
+            ).rowcount
+        self.__session.flush()
+        return HistoryRetentionReport(
+            products=len(product_ids),
+            histories_removed=histories_removed,
+            leftovers_removed=leftovers_removed,
+            histories_created=len(keys),
+            leftovers_created=len(leftovers_to_create),
+        )
+
+    def __sum_leftovers(
+        self, history_to_bucket: dict[int, tuple[int, datetime]]
+    ) -> dict[tuple[int, datetime], dict[tuple[int, str], int]]:
+        bucket_leftovers: dict[tuple[int, datetime], dict[tuple[int, str], int]] = (
+            defaultdict(lambda: defaultdict(int))
+        )
+        for chunk in _chunked(history_to_bucket, self.__chunk_size):
+            rows = self.__session.execute(
+                select(
+                    Leftover.product_history_id,
+                    Leftover.warehouse_id,
+                    Leftover.type,
+                    Leftover.quantity,
+                ).where(Leftover.product_history_id.in_(chunk))
+            )
+            for history_id, warehouse_id, leftover_type, quantity in rows:
+                key = (warehouse_id, leftover_type)
+                bucket_leftovers[history_to_bucket[history_id]][key] += quantity
+        return bucket_leftovers
+
+
+class HistoryRetentionJob:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        compactor_factory: Callable[[Session], ProductHistoryCompactor],
+        policy: HistoryRetentionPolicy,
+    ):
+        self.__session_factory = session_factory
+        self.__compactor_factory = compactor_factory
+        self.__policy = policy
+
+    def run(self, now: datetime | None = None) -> HistoryRetentionReport:
+        cutoff = self.__policy.cutoff(datetime.utcnow() if now is None else now)
+        report = HistoryRetentionReport()
+        last_product_id = 0
+        while True:
+            with self.__session_factory() as session, session.begin():
+                compactor = self.__compactor_factory(session)
+                product_ids = compactor.find_product_ids(
+                    cutoff, last_product_id, self.__policy.products_per_batch
+                )
+                if not product_ids:
+                    return report
+                report += compactor.compact(product_ids, cutoff, self.__policy.bucket)
+            last_product_id = product_ids[-1]
+
+
+def _chunked(values: Iterable[_T], size: int) -> Iterator[list[_T]]:
+    iterator = iter(values)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import ColumnElement, and_, select, true
+from sqlalchemy.orm import aliased, with_loader_criteria
+from sqlalchemy.sql.base import ExecutableOption
+
+from jarvis_db.schemas import ProductHistory
+
+
+@dataclass(frozen=True)
+class HistoryWindow:
+    since: datetime | None = None
+    until: datetime | None = None
+    last_units: int | None = None
+
+    @staticmethod
+    def last_days(days: int) -> "HistoryWindow":
+        return HistoryWindow(since=datetime.utcnow() - timedelta(days=days))
+
+    def criteria(self) -> ColumnElement[bool]:
+        conditions = self.__date_conditions(ProductHistory.date)
+        if self.last_units is not None:
+            recent = aliased(ProductHistory, name="recent_product_histories")
+            conditions.append(
+                ProductHistory.id.in_(
+                    select(recent.id)
+                    .where(recent.product_id == ProductHistory.product_id)
+                    .where(*self.__date_conditions(recent.date))
+                    .order_by(recent.date.desc(), recent.id.desc())
+                    .limit(self.last_units)
+                )
+            )
+        return and_(true(), *conditions)
+
+    def date_criteria(
+        self, date_column: ColumnElement[datetime]
+    ) -> ColumnElement[bool]:
+        return and_(true(), *self.__date_conditions(date_column))
+
+    def __date_conditions(
+        self, date_column: ColumnElement[datetime]
+    ) -> list[ColumnElement[bool]]:
+        conditions: list[ColumnElement[bool]] = []
+        if self.since is not None:
+            conditions.append(date_column >= self.since)
+        if self.until is not None:
+            conditions.append(date_column < self.until)
+        return conditions
+
+
+def history_window_options(
+    history_window: HistoryWindow | None,
+) -> list[ExecutableOption]:
+    if history_window is None:
+        return []
+    return [
+        with_loader_criteria(
+            ProductHistory, history_window.criteria(), include_aliases=True
+        )
+    ]
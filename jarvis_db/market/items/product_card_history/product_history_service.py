@@ -1,8 +1,23 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
 from jorm.market.items import ProductHistory as ProductHistoryDomain, ProductHistoryUnit
-from sqlalchemy import select
+from jorm.support.types import SpecifiedLeftover, StorageDict
+from sqlalchemy import Table, insert, literal, select, true, union_all
 from sqlalchemy.orm import Session, joinedload
 
 from jarvis_db.core import Mapper
+from jarvis_db.market.infrastructure.warehouse.warehouse_registry import (
+    WarehouseRegistry,
+)
+from jarvis_db.market.items.product_card_history.history_partitioning import (
+    HistoryPartitioning,
+    leftover_date_values,
+)
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
 from jarvis_db.schemas import (
     Category,
     Leftover,
@@ -19,52 +34,188 @@ class ProductHistoryService:
         self,
         session: Session,
         table_mapper: Mapper[ProductHistory, ProductHistoryUnit],
+        warehouse_registry: WarehouseRegistry | None = None,
+        partitioning: HistoryPartitioning | None = None,
     ):
         self.__session = session
         self.__table_mapper = table_mapper
+        self.__partitioning = partitioning
+        self.__warehouse_registry = warehouse_registry
 
     def create(self, product_history: ProductHistoryDomain, product_id: int):
-        self.__session.add_all(
-            (
-                ProductHistory(
-                    cost=history.cost,
-                    date=history.unit_date,
-                    product_id=product_id,
-                    leftovers=[
-                        Leftover(
-                            type=leftover.specify,
-                            quantity=leftover.leftover,
-                            warehouse_id=(
-                                select(Warehouse.id)
-                                .join(Warehouse.marketplace)
-                                .join(Marketplace.categories)
-                                .join(Category.niches)
-                                .join(Niche.products)
-                                .where(ProductCard.id == product_id)
-                                .where(Warehouse.global_id == gid)
-                                .scalar_subquery()
-                            ),
-                        )
-                        for gid, leftovers in history.leftover.items()
-                        for leftover in leftovers
-                    ],
-                )
-                for history in product_history.get_history()
-            )
-        )
+        self.create_all(((product_id, product_history),))
 
-    def find_product_history(self, product_id: int) -> ProductHistoryDomain:
-        units = (
+    def create_all(
+        self,
+        product_histories: Iterable[tuple[int, ProductHistoryDomain]],
+        warehouse_ids: dict[int, int] | None = None,
+    ) -> None:
+        units = [
+            (product_id, unit)
+            for product_id, product_history in product_histories
+            for unit in product_history.get_history()
+        ]
+        if not units:
+            return
+        if warehouse_ids is None:
+            warehouse_ids = self.__find_warehouse_ids(
+                {product_id for product_id, _ in units}
+            )
+        histories, leftovers = self.__insert_tables(unit.unit_date for _, unit in units)
+        history_ids = (
             self.__session.execute(
-                select(ProductHistory)
-                .options(
-                    joinedload(ProductHistory.leftovers).joinedload(Leftover.warehouse)
-                )
-                .where(ProductHistory.product_id == product_id)
-                .distinct()
+                insert(histories).returning(
+                    histories.c.id, sort_by_parameter_order=True
+                ),
+                [
+                    {
+                        "cost": unit.cost,
+                        "date": unit.unit_date,
+                        "product_id": product_id,
+                    }
+                    for product_id, unit in units
+                ],
             )
             .scalars()
-            .unique()
             .all()
         )
+        leftover_rows = [
+            {
+                "type": leftover.specify,
+                "quantity": leftover.leftover,
+                "warehouse_id": ProductHistoryService.__get_warehouse_id(
+                    warehouse_ids, gid
+                ),
+                "product_history_id": history_id,
+                **leftover_date_values(leftovers, unit.unit_date),
+            }
+            for history_id, (_, unit) in zip(history_ids, units, strict=True)
+            for gid, unit_leftovers in unit.leftover.items()
+            for leftover in unit_leftovers
+        ]
+        if leftover_rows:
+            self.__session.execute(insert(leftovers), leftover_rows)
+
+    def find_product_history(
+        self, product_id: int, history_window: HistoryWindow | None = None
+    ) -> ProductHistoryDomain:
+        if self.__partitioning is not None:
+            return self.__find_partitioned_history(
+                self.__partitioning, product_id, history_window
+            )
+        statement = (
+            select(ProductHistory)
+            .options(
+                joinedload(ProductHistory.leftovers).joinedload(Leftover.warehouse)
+            )
+            .where(ProductHistory.product_id == product_id)
+            .distinct()
+        )
+        if history_window is not None:
+            statement = statement.where(history_window.criteria())
+        units = self.__session.execute(statement).scalars().unique().all()
         return ProductHistoryDomain((self.__table_mapper.map(unit) for unit in units))
+
+    def __find_partitioned_history(
+        self,
+        partitioning: HistoryPartitioning,
+        product_id: int,
+        history_window: HistoryWindow | None,
+    ) -> ProductHistoryDomain:
+        sources = partitioning.find_history_tables(self.__session, history_window)
+        units_query = union_all(
+            *(
+                select(
+                    literal(index).label("source"),
+                    histories.c.id,
+                    histories.c.cost,
+                    histories.c.date,
+                )
+                .where(histories.c.product_id == product_id)
+                .where(
+                    history_window.date_criteria(histories.c.date)
+                    if history_window is not None
+                    else true()
+                )
+                for index, (histories, _) in enumerate(sources)
+            )
+        ).subquery()
+        statement = select(units_query).order_by(units_query.c.date.desc())
+        if history_window is not None and history_window.last_units is not None:
+            statement = statement.limit(history_window.last_units)
+        units = self.__session.execute(statement).all()
+        history_ids: dict[int, list[int]] = defaultdict(list)
+        for source, history_id, _, _ in units:
+            history_ids[source].append(history_id)
+        leftovers: dict[tuple[int, int], dict[int, list[SpecifiedLeftover]]] = (
+            defaultdict(lambda: defaultdict(list))
+        )
+        for source, ids in history_ids.items():
+            _, source_leftovers = sources[source]
+            rows = self.__session.execute(
+                select(
+                    source_leftovers.c.product_history_id,
+                    Warehouse.global_id,
+                    source_leftovers.c.type,
+                    source_leftovers.c.quantity,
+                )
+                .join(Warehouse, Warehouse.id == source_leftovers.c.warehouse_id)
+                .where(source_leftovers.c.product_history_id.in_(ids))
+            )
+            for history_id, global_id, leftover_type, quantity in rows:
+                leftovers[(source, history_id)][global_id].append(
+                    SpecifiedLeftover(leftover_type, quantity)
+                )
+        return ProductHistoryDomain(
+            ProductHistoryUnit(
+                cost=cost,
+                leftover=StorageDict(
+                    {
+                        global_id: unit_leftovers
+                        for global_id, unit_leftovers in sorted(
+                            leftovers[(source, history_id)].items()
+                        )
+                    }
+                ),
+                unit_date=date,
+            )
+            for source, history_id, cost, date in reversed(units)
+        )
+
+    def __insert_tables(self, dates: Iterable[datetime]) -> tuple[Table, Table]:
+        if self.__partitioning is None:
+            return ProductHistory.__table__, Leftover.__table__
+        return self.__partitioning.insert_tables(self.__session, dates)
+
+    def __find_warehouse_ids(self, product_ids: Iterable[int]) -> dict[int, int]:
+        if self.__warehouse_registry is not None:
+            marketplace_ids = self.__session.execute(
+                select(Category.marketplace_id)
+                .join(Category.niches)
+                .join(Niche.products)
+                .where(ProductCard.id.in_(product_ids))
+                .distinct()
+            ).scalars()
+            return {
+                global_id: warehouse_id
+                for marketplace_id in marketplace_ids
+                for global_id, warehouse_id in self.__warehouse_registry.find_ids(
+                    marketplace_id
+                ).items()
+            }
+        rows = self.__session.execute(
+            select(Warehouse.global_id, Warehouse.id)
+            .join(Warehouse.marketplace)
+            .join(Marketplace.categories)
+            .join(Category.niches)
+            .join(Niche.products)
+            .where(ProductCard.id.in_(product_ids))
+            .distinct()
+        ).all()
+        return {global_id: warehouse_id for global_id, warehouse_id in rows}
+
+    @staticmethod
+    def __get_warehouse_id(warehouse_ids: dict[int, int], global_id: int) -> int:
+        if global_id not in warehouse_ids:
+            raise Exception(f"No warehouse with global id '{global_id}' was found")
+        return warehouse_ids[global_id]
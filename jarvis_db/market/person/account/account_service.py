@@ -1,8 +1,11 @@
+from typing import Iterator
+
 from jorm.market.person import Account as AccountEntity
 from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.pagination import iter_keyset
 from jarvis_db.market.person.account.account_input_formatter import AccountInputFormatter
 from jarvis_db.schemas import Account
 
@@ -78,3 +81,11 @@ class AccountService:
     def find_all(self) -> dict[int, AccountEntity]:
         accounts = self.__session.execute(select(Account)).scalars().all()
         return {account.id: self.__table_mapper.map(account) for account in accounts}
+
+    def iter_all(
+        self, page_size: int = 1000, yield_per: int | None = None
+    ) -> Iterator[tuple[int, AccountEntity]]:
+        for account in iter_keyset(
+            self.__session, select(Account), Account.id, page_size, yield_per
+        ):
+            yield account.id, self.__table_mapper.map(account)
@@ -1,9 +1,16 @@
+from typing import Iterable
+
 from jorm.market.infrastructure import Product
 from jorm.market.person import Warehouse as WarehouseDomain
 from sqlalchemy import delete, select
 from sqlalchemy.orm import Session, noload, joinedload
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.upsert import upsert
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+    history_window_options,
+)
 from jarvis_db.schemas import (
     Category,
     Leftover,
@@ -31,6 +38,18 @@ class UserItemsService:
         self.__session.add(UserToProduct(user_id=user_id, product_id=product_id))
         self.__session.flush()
 
+    def append_products(self, user_id: int, product_ids: Iterable[int]):
+        values = [
+            {"user_id": user_id, "product_id": product_id} for product_id in product_ids
+        ]
+        upsert(
+            self.__session,
+            UserToProduct,
+            values,
+            index_elements=[UserToProduct.user_id, UserToProduct.product_id],
+        )
+        self.__session.flush()
+
     def remove_product(self, user_id: int, product_id: int):
         self.__session.execute(
             delete(UserToProduct)
@@ -63,7 +82,10 @@ class UserItemsService:
         return {product.id: self.__product_mapper.map(product) for product in products}
 
     def fetch_user_products_atomic(
-        self, user_id: int, marketplace_id: int
+        self,
+        user_id: int,
+        marketplace_id: int,
+        history_window: HistoryWindow | None = None,
     ) -> dict[int, Product]:
         products = (
             self.__session.execute(
@@ -79,6 +101,7 @@ class UserItemsService:
                     joinedload(ProductCard.histories)
                     .joinedload(ProductHistory.leftovers)
                     .joinedload(Leftover.warehouse),
+                    *history_window_options(history_window),
                 )
             )
             .unique()
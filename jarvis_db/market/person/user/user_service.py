@@ -1,8 +1,11 @@
+from typing import Iterator
+
 from jorm.market.person import User as UserEntity
 from sqlalchemy import delete, select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.pagination import iter_keyset
 from jarvis_db.schemas import Account, MarketplaceApiKey, User
 
 
@@ -11,6 +14,10 @@ class UserService:
         joinedload(User.account),
         joinedload(User.marketplace_api_keys),
     ]
+    __user_iter_options = [
+        joinedload(User.account),
+        selectinload(User.marketplace_api_keys),
+    ]
 
     def __init__(self, session: Session, table_mapper: Mapper[User, UserEntity]):
         self.__session = session
@@ -68,6 +75,18 @@ class UserService:
         )
         return {user.id: self.__table_mapper.map(user) for user in users}
 
+    def iter_all(
+        self, page_size: int = 1000, yield_per: int | None = None
+    ) -> Iterator[tuple[int, UserEntity]]:
+        for user in iter_keyset(
+            self.__session,
+            select(User).options(*UserService.__user_iter_options),
+            User.id,
+            page_size,
+            yield_per,
+        ):
+            yield user.id, self.__table_mapper.map(user)
+
     def append_api_key(self, user_id: int, api_key: str, marketplace_id: int):
         self.__session.add(
             MarketplaceApiKey(
@@ -1,8 +1,10 @@
 from typing import TypedDict
 from jorm.support.types import EconomyConstants as EconomyConstantsEntity
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from jarvis_db.core.cache import TwoLevelCache
 from jarvis_db.core.mapper import Mapper
+from jarvis_db.core.upsert import upsert
 
 from jarvis_db.schemas import EconomyConstants
 
@@ -27,41 +29,41 @@ class EconomyConstantsService:
         self,
         session: Session,
         table_mapper: Mapper[EconomyConstants, EconomyConstantsEntity],
+        cache: TwoLevelCache | None = None,
     ) -> None:
         self.__session = session
         self.__table_mapper = table_mapper
+        self.__cache = cache
 
     def upsert_constants(
         self, marketplace_id: int, constants: EconomyConstantsEntity
     ) -> None:
-        existing_constants = self.__session.execute(
-            select(EconomyConstants).where(
-                EconomyConstants.marketplace_id == marketplace_id
-            )
-        ).scalar_one_or_none()
-        if existing_constants is None:
-            self.__session.add(
-                EconomyConstants(
-                    marketplace_id=marketplace_id,
-                    **EconomyConstantsService.__map_constants_entity_to_typed_dict(
-                        constants
-                    )
-                )
-            )
-        else:
-            self.__session.execute(
-                update(EconomyConstants)
-                .where(EconomyConstants.marketplace_id == marketplace_id)
-                .values(
-                    **EconomyConstantsService.__map_constants_entity_to_typed_dict(
-                        constants
-                    )
-                )
-            )
+        values = EconomyConstantsService.__map_constants_entity_to_typed_dict(constants)
+        upsert(
+            self.__session,
+            EconomyConstants,
+            [{"marketplace_id": marketplace_id, **values}],
+            index_elements=[EconomyConstants.marketplace_id],
+            update_columns=values.keys(),
+        )
         self.__session.flush()
+        if self.__cache is not None:
+            self.__cache.invalidate_in_transaction(
+                self.__session, EconomyConstantsService.__cache_key(marketplace_id)
+            )
 
     def find_by_marketplace_id(
         self, marketplace_id: int
+    ) -> EconomyConstantsEntity | None:
+        if self.__cache is None:
+            return self.__find_by_marketplace_id(marketplace_id)
+        return self.__cache.get_or_load(
+            EconomyConstantsService.__cache_key(marketplace_id),
+            lambda: self.__find_by_marketplace_id(marketplace_id),
+        )
+
+    def __find_by_marketplace_id(
+        self, marketplace_id: int
     ) -> EconomyConstantsEntity | None:
         constants = self.__session.execute(
             select(EconomyConstants).where(
@@ -70,6 +72,10 @@ class EconomyConstantsService:
         ).scalar_one_or_none()
         return self.__table_mapper.map(constants) if constants is not None else None
 
+    @staticmethod
+    def __cache_key(marketplace_id: int) -> tuple[str, int]:
+        return "economy_constants", marketplace_id
+
     @staticmethod
     def __map_constants_entity_to_typed_dict(
         constants: EconomyConstantsEntity,
@@ -7,10 +7,13 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Table,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -45,7 +48,7 @@ class UserToProduct(Base):
     product_id: Mapped[int] = mapped_column(
         ForeignKey("product_cards.id", ondelete="CASCADE"),
         primary_key=True,
-        unique=True,
+        index=True,
     )
 
 
@@ -256,6 +259,8 @@ class Marketplace(Base):
         passive_deletes=True,
     )
 
+    __table_args__ = (Index("ix_marketplaces_lower_name", func.lower(name)),)
+
     def __repr__(self) -> str:
         return f"Marketplace(id={self.id!r}, name={self.name!r})"
 
@@ -317,7 +322,10 @@ class Category(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     marketplace_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey(Marketplace.id, ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey(Marketplace.id, ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     marketplace: Mapped[Marketplace] = relationship(
         Marketplace, back_populates="categories"
@@ -329,7 +337,14 @@ class Category(Base):
         passive_deletes=True,
     )
 
-    __table_args__ = (UniqueConstraint(name, marketplace_id),)
+    __table_args__ = (
+        UniqueConstraint(name, marketplace_id),
+        Index(
+            "ix_categories_marketplace_id_lower_name",
+            marketplace_id,
+            func.lower(name),
+        ),
+    )
 
     def __repr__(self) -> str:
         return f"Category(id={self.id}, name={self.name!r})"
@@ -344,13 +359,17 @@ class ProductToNiche(Base):
         Integer, ForeignKey("niches.id", ondelete="CASCADE"), primary_key=True
     )
 
+    __table_args__ = (
+        Index("ix_products_to_niches_niche_id_product_id", niche_id, product_id),
+    )
+
 
 class Niche(Base):
     __tablename__ = "niches"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
     category_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey(Category.id, ondelete="CASCADE")
+        Integer, ForeignKey(Category.id, ondelete="CASCADE"), index=True
     )
     category: Mapped[Category] = relationship("Category", back_populates="niches")
     marketplace_commission: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -364,7 +383,10 @@ class Niche(Base):
         secondary=ProductToNiche.__table__, back_populates="niches"
     )
 
-    __table_args__ = (UniqueConstraint(name, category_id),)
+    __table_args__ = (
+        UniqueConstraint(name, category_id),
+        Index("ix_niches_category_id_lower_name", category_id, func.lower(name)),
+    )
 
     def __repr__(self) -> str:
         return (
@@ -383,7 +405,10 @@ class ProductCard(Base):
     __tablename__ = "product_cards"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
-    global_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    global_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    marketplace_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey(Marketplace.id, ondelete="CASCADE"), nullable=True
+    )
     cost: Mapped[int] = mapped_column(Integer, nullable=False)
     rating: Mapped[int] = mapped_column(Integer, nullable=False)
     brand: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -404,6 +429,22 @@ class ProductCard(Base):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        Index(
+            "uq_product_cards_marketplace_id_global_id",
+            marketplace_id,
+            global_id,
+            unique=True,
+        ),
+        Index(
+            "uq_product_cards_global_id_without_marketplace",
+            global_id,
+            unique=True,
+            sqlite_where=marketplace_id.is_(None),
+            postgresql_where=marketplace_id.is_(None),
+        ),
+    )
+
     def __repr__(self) -> str:
         return (
             f"ProductCard(id={self.id!r}, name={self.name!r}, "
@@ -444,7 +485,14 @@ class Warehouse(Base):
     )
     main_coefficient: Mapped[int] = mapped_column(Integer, nullable=False)
 
-    __table_args__ = (UniqueConstraint(marketplace_id, global_id),)
+    __table_args__ = (
+        UniqueConstraint(marketplace_id, global_id),
+        Index(
+            "ix_warehouses_marketplace_id_lower_name",
+            marketplace_id,
+            func.lower(name),
+        ),
+    )
 
     def __repr__(self) -> str:
         return (
@@ -462,7 +510,7 @@ class ProductHistory(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     cost: Mapped[int] = mapped_column(Integer(), nullable=False)
     date: Mapped[datetime] = mapped_column(
-        DateTime(), nullable=False, default=datetime.utcnow
+        DateTime(), nullable=False, default=datetime.utcnow, index=True
     )
     leftovers: Mapped[list["Leftover"]] = relationship(
         "Leftover",
@@ -475,6 +523,8 @@ class ProductHistory(Base):
     )
     product: Mapped[ProductCard] = relationship(ProductCard, back_populates="histories")
 
+    __table_args__ = (Index("ix_product_histories_product_id_date", product_id, date),)
+
     def __repr__(self) -> str:
         return (
             f"ProductCostHistory(id={self.id!r}, "
@@ -489,11 +539,17 @@ class Leftover(Base):
     type: Mapped[str] = mapped_column(String(100), nullable=False)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     warehouse_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey(Warehouse.id, ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey(Warehouse.id, ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     warehouse: Mapped[Warehouse] = relationship(Warehouse, back_populates="leftovers")
     product_history_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey(ProductHistory.id, ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey(ProductHistory.id, ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     product_history: Mapped[ProductHistory] = relationship(
         ProductHistory, back_populates="leftovers"
@@ -509,7 +565,7 @@ class StorageInfo(Base):
     __tablename__ = "storage_info"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     product_card_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey(ProductCard.id, ondelete="CASCADE")
+        Integer, ForeignKey(ProductCard.id, ondelete="CASCADE"), index=True
     )
     product_card: Mapped[ProductCard] = relationship(
         ProductCard, back_populates="storage_info"
@@ -618,7 +674,9 @@ class UserToEconomy(Base):
     date: Mapped[datetime] = mapped_column(
         DateTime(), default=datetime.utcnow, nullable=False
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey(User.id), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey(User.id), nullable=False, index=True
+    )
     user: Mapped[User] = relationship(User)
     economy_request_id: Mapped[int] = mapped_column(
         ForeignKey(EconomyRequest.id), nullable=False, unique=True
@@ -657,7 +715,9 @@ class UserToTransitEconomy(Base):
     date: Mapped[datetime] = mapped_column(
         DateTime(), default=datetime.utcnow, nullable=False
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey(User.id), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey(User.id), nullable=False, index=True
+    )
     user: Mapped[User] = relationship(User)
     transit_request_id: Mapped[int] = mapped_column(
         ForeignKey(TransitEconomyRequest.id),
@@ -735,4 +795,22 @@ class GreenTradeZoneCalculationResult(Base):
     best_segment_product_with_trades_count_index: Mapped[int] = mapped_column(
         Integer, nullable=False
     )
-    segment_data: Mapped[dict] = mapped_column(JSON, nullable=False)
+    segment_data: Mapped[dict | None] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )
+    segment_data_binary: Mapped[bytes | None] = mapped_column(
+        LargeBinary, nullable=True
+    )
+
+
+class FillCheckpoint(Base):
+    __tablename__ = "fill_checkpoints"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    unit_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    unit_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    completed_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=False, default=datetime.utcnow
+    )
+
+    __table_args__ = (UniqueConstraint(job_name, unit_type, unit_id),)
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from jarvis_db.db_config import (
+    Base,
+    DbSettings,
+    create_async_db_engine,
+    create_async_session_factory,
+)
+from jarvis_db.factories.collectors import (
+    create_async_jorm_collector,
+    create_jorm_collector,
+)
+from jarvis_db.schemas import Category, Niche
+from tests.fixtures import AlchemySeeder
+
+
+@unittest.skipIf(
+    find_spec("aiosqlite") is None or find_spec("greenlet") is None,
+    'the "async" extra (aiosqlite, greenlet) is not installed',
+)
+class AsyncJormCollectorImplTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__engine = create_async_db_engine(
+            DbSettings(
+                url=f"sqlite+aiosqlite:///{os.path.join(self.__directory.name, 'test.db')}",
+                sqlite_foreign_keys=True,
+            )
+        )
+        self.__session = create_async_session_factory(self.__engine)
+        async with self.__engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        def seed(session: Session):
+            seeder = AlchemySeeder(session)
+            seeder.seed_marketplaces(1)
+            seeder.seed_categories(3)
+            seeder.seed_niches(9)
+            seeder.seed_products(30)
+            seeder.seed_product_histories(60)
+            seeder.seed_leftovers(120)
+
+        async with self.__session() as session, session.begin():
+            await session.run_sync(seed)
+
+    async def asyncTearDown(self):
+        await self.__engine.dispose()
+        self.__directory.cleanup()
+
+    async def test_concurrent_reads(self):
+        def collect_expected(session: Session):
+            collector = create_jorm_collector(session)
+            category_ids = session.execute(select(Category.id)).scalars().all()
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            return (
+                {
+                    category_id: collector.get_all_niches(category_id)
+                    for category_id in category_ids
+                },
+                {
+                    niche_id: collector.get_niche_by_id(niche_id)
+                    for niche_id in niche_ids
+                },
+            )
+
+        async with self.__session() as session:
+            expected_niches, expected_atomic_niches = await session.run_sync(
+                collect_expected
+            )
+
+        async def get_all_niches(category_id: int):
+            async with self.__session() as session:
+                collector = create_async_jorm_collector(session)
+                return await collector.get_all_niches(category_id)
+
+        async def get_niche_by_id(niche_id: int):
+            async with self.__session() as session:
+                collector = create_async_jorm_collector(session)
+                return await collector.get_niche_by_id(niche_id)
+
+        actual_niches = await asyncio.gather(
+            *(get_all_niches(category_id) for category_id in expected_niches)
+        )
+        actual_atomic_niches = await asyncio.gather(
+            *(get_niche_by_id(niche_id) for niche_id in expected_atomic_niches)
+        )
+        self.assertListEqual(list(expected_niches.values()), actual_niches)
+        self.assertListEqual(
+            list(expected_atomic_niches.values()), actual_atomic_niches
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
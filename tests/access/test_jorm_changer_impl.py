@@ -10,14 +10,20 @@ from jorm.market.infrastructure import (
     Product,
     Warehouse,
 )
+from jorm.market.items import ProductHistory, ProductHistoryUnit
 from jorm.market.service import (
     RequestInfo,
     SimpleEconomyRequest,
     SimpleEconomyResult,
     SimpleEconomySaveObject,
 )
+from jorm.support.types import StorageDict
 
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetcher
 from jarvis_db.access.jorm_changer import JormChangerImpl
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
 
 
 class JormChangerTest(unittest.TestCase):
@@ -35,7 +41,12 @@ class JormChangerTest(unittest.TestCase):
         self.__standard_filler_mock = Mock()
         self.__niche_characteristics_service_mock = Mock()
         self.__green_trade_zone_service_mock = Mock()
-        self.__changer = JormChangerImpl(
+        self.__changer = self.__create_changer()
+
+    def __create_changer(
+        self, history_window: HistoryWindow | None = None
+    ) -> JormChangerImpl:
+        return JormChangerImpl(
             economy_constants_service=self.__economy_constants_service_mock,
             category_service=self.__category_service_mock,
             niche_service=self.__niche_service_mock,
@@ -49,6 +60,7 @@ class JormChangerTest(unittest.TestCase):
             standard_filler=self.__standard_filler_mock,
             niche_characteristics_service=self.__niche_characteristics_service_mock,
             green_trade_zone_service=self.__green_trade_zone_service_mock,
+            history_window=history_window,
         )
 
     def test_save_unit_economy_request(self):
@@ -155,9 +167,338 @@ class JormChangerTest(unittest.TestCase):
         # region assert
         niche_find_by_id_mock.assert_called_once_with(niche_id)
         category_find_by_id_mock.assert_called_once_with(category_id)
-        niche_find_by_name_atomic_mock.assert_called_once_with(niche.name, category_id)
+        niche_find_by_name_atomic_mock.assert_called_once_with(
+            niche.name, category_id, None
+        )
         # endregion
 
+    def test_update_niche_refreshes_existing_products(self):
+        niche_id = 2000
+        category_id = 900
+        marketplace_id = 3
+        niche = Niche(
+            "test_niche_name",
+            {
+                HandlerType.CLIENT: 0.1,
+                HandlerType.MARKETPLACE: 0.2,
+                HandlerType.PARTIAL_CLIENT: 0.3,
+            },
+            0.4,
+        )
+        self.__niche_service_mock.find_by_id = Mock(return_value=niche)
+        self.__category_service_mock.find_by_id = Mock(
+            return_value=Category("test_category_name", {niche.name: niche})
+        )
+        existing_products = [
+            Product(f"old_name_{i}", 100, 200 + i, 1.0, "brand", "seller", [])
+            for i in range(5)
+        ]
+        new_products = [
+            Product(f"new_name_{i}", 150, 200 + i, 2.0, "brand", "seller", [])
+            for i in range(5)
+        ]
+        self.__niche_service_mock.find_by_name_atomic = Mock(
+            return_value=(
+                Niche(
+                    niche.name,
+                    niche.commissions,
+                    niche.returned_percent,
+                    existing_products,
+                ),
+                niche_id,
+            )
+        )
+        self.__data_provider_without_key_mock.get_products_globals_ids = Mock(
+            return_value={product.global_id for product in new_products}
+        )
+        self.__data_provider_without_key_mock.get_products = Mock(
+            return_value=new_products
+        )
+        global_id_to_product_id = {
+            product.global_id: 10 + i for i, product in enumerate(existing_products)
+        }
+        find_ids_in_niche_mock = Mock(return_value=global_id_to_product_id)
+        self.__product_card_service_mock.find_ids_in_niche = find_ids_in_niche_mock
+        update_all_mock = Mock()
+        self.__product_card_service_mock.update_all = update_all_mock
+        create_all_mock = Mock()
+        self.__product_history_service_mock.create_all = create_all_mock
+        self.__changer.update_niche(niche_id, category_id, marketplace_id)
+        find_ids_in_niche_mock.assert_called_once_with(niche_id)
+        update_all_mock.assert_called_once()
+        updated = update_all_mock.call_args.args[0]
+        self.assertEqual(
+            [global_id_to_product_id[product.global_id] for product in new_products],
+            [product_id for product_id, _ in updated],
+        )
+        self.assertEqual(
+            [product.name for product in new_products],
+            [product.name for _, product in updated],
+        )
+        create_all_mock.assert_called_once()
+        self.__niche_service_mock.mark_updated.assert_called_once_with(niche_id)
+        self.__product_card_service_mock.update.assert_not_called()
+        self.__product_history_service_mock.create.assert_not_called()
+
+    def test_update_niche_appends_only_new_history_units(self):
+        niche_id = 2000
+        niche = Niche("test_niche_name", {}, 0.4)
+        self.__niche_service_mock.find_by_id = Mock(return_value=niche)
+        self.__category_service_mock.find_by_id = Mock(
+            return_value=Category("test_category_name", {niche.name: niche})
+        )
+
+        def create_product(global_id: int, days: range) -> Product:
+            return Product(
+                "name",
+                100,
+                global_id,
+                1.0,
+                "brand",
+                "seller",
+                [],
+                history=ProductHistory(
+                    ProductHistoryUnit(day, datetime(2023, 1, day), StorageDict())
+                    for day in days
+                ),
+            )
+
+        self.__niche_service_mock.find_by_name_atomic = Mock(
+            return_value=(
+                Niche(
+                    niche.name,
+                    {},
+                    0.4,
+                    [
+                        create_product(200, range(1, 3)),
+                        create_product(201, range(1, 3)),
+                    ],
+                ),
+                niche_id,
+            )
+        )
+        self.__data_provider_without_key_mock.get_products_globals_ids = Mock(
+            return_value={200, 201}
+        )
+        self.__data_provider_without_key_mock.get_products = Mock(
+            return_value=[
+                create_product(200, range(0)),
+                create_product(201, range(2, 4)),
+            ]
+        )
+        self.__product_card_service_mock.find_ids_in_niche = Mock(
+            return_value={200: 10, 201: 11}
+        )
+        create_all_mock = Mock()
+        self.__product_history_service_mock.create_all = create_all_mock
+        self.__changer.update_niche(niche_id, 900, 3)
+        self.assertEqual(
+            {10: [], 11: [datetime(2023, 1, 3)]},
+            {
+                product_id: [unit.unit_date for unit in history.get_history()]
+                for product_id, history in create_all_mock.call_args.args[0]
+            },
+        )
+
+    def test_update_niche_in_history_window(self):
+        niche_id = 2000
+        niche = Niche("test_niche_name", {}, 0.4)
+        self.__niche_service_mock.find_by_id = Mock(return_value=niche)
+        self.__category_service_mock.find_by_id = Mock(
+            return_value=Category("test_category_name", {niche.name: niche})
+        )
+
+        def create_product(global_id: int, days: range) -> Product:
+            return Product(
+                "name",
+                100,
+                global_id,
+                1.0,
+                "brand",
+                "seller",
+                [],
+                history=ProductHistory(
+                    ProductHistoryUnit(day, datetime(2023, 1, day), StorageDict())
+                    for day in days
+                ),
+            )
+
+        window = HistoryWindow(since=datetime(2023, 1, 3))
+        find_by_name_atomic_mock = Mock(
+            return_value=(
+                Niche(niche.name, {}, 0.4, [create_product(200, range(3, 5))]),
+                niche_id,
+            )
+        )
+        self.__niche_service_mock.find_by_name_atomic = find_by_name_atomic_mock
+        self.__data_provider_without_key_mock.get_products_globals_ids = Mock(
+            return_value={200}
+        )
+        self.__data_provider_without_key_mock.get_products = Mock(
+            return_value=[create_product(200, range(1, 6))]
+        )
+        self.__product_card_service_mock.find_ids_in_niche = Mock(
+            return_value={200: 10}
+        )
+        create_all_mock = Mock()
+        self.__product_history_service_mock.create_all = create_all_mock
+        self.__create_changer(window).update_niche(niche_id, 900, 3)
+        find_by_name_atomic_mock.assert_called_once_with(niche.name, 900, window)
+        self.assertEqual(
+            {10: [datetime(2023, 1, 5)]},
+            {
+                product_id: [unit.unit_date for unit in history.get_history()]
+                for product_id, history in create_all_mock.call_args.args[0]
+            },
+        )
+
+    def test_load_user_products_imports_in_batches(self):
+        user_id = 100
+        marketplace_id = 2
+        existing_products = {
+            10 + i: Product(f"old_name_{i}", 100, 200 + i, 1.0, "brand", "seller", [])
+            for i in range(2)
+        }
+        loaded_products = [
+            Product(f"new_name_{i}", 150, 200 + i, 2.0, "brand", "seller", [])
+            for i in range(6)
+        ]
+        self.__user_market_data_provider_mock.get_user_products = Mock(
+            return_value=[product.global_id for product in loaded_products]
+        )
+        self.__data_provider_without_key_mock.get_base_products = Mock(
+            return_value=loaded_products
+        )
+        self.__data_provider_without_key_mock.get_category_and_niche = Mock(
+            side_effect=lambda global_id: (
+                f"category_{global_id % 2}",
+                f"niche_{global_id % 2}",
+            )
+        )
+        self.__user_items_service_mock.fetch_user_products = Mock(
+            return_value=existing_products
+        )
+        ensure_categories_mock = Mock(return_value={"category_0": 1, "category_1": 2})
+        self.__category_service_mock.ensure_all = ensure_categories_mock
+        ensure_niches_mock = Mock(return_value={(1, "niche_0"): 30, (2, "niche_1"): 31})
+        self.__niche_service_mock.ensure_all = ensure_niches_mock
+        upsert_products_mock = Mock(
+            side_effect=lambda products, niche_ids, warehouse_ids: {
+                product.global_id: product.global_id * 10 for product in products
+            }
+        )
+        self.__product_card_service_mock.upsert_products = upsert_products_mock
+        update_all_mock = Mock()
+        self.__product_card_service_mock.update_all = update_all_mock
+        result = self.__changer.load_user_products(user_id, marketplace_id)
+        assert result is not None
+        self.assertEqual(6, len(result))
+        ensure_categories_mock.assert_called_once()
+        ensure_niches_mock.assert_called_once()
+        self.assertEqual(2, upsert_products_mock.call_count)
+        niche_to_global_ids = {
+            call.args[1][0]: sorted(product.global_id for product in call.args[0])
+            for call in upsert_products_mock.call_args_list
+        }
+        self.assertEqual({30: [202, 204], 31: [203, 205]}, niche_to_global_ids)
+        warehouse_ids = self.__standard_filler_mock.check_warehouse_filled.return_value
+        for call in upsert_products_mock.call_args_list:
+            self.assertIs(warehouse_ids, call.kwargs["warehouse_ids"])
+        self.__user_items_service_mock.append_products.assert_called_once()
+        append_args = self.__user_items_service_mock.append_products.call_args.args
+        self.assertEqual(user_id, append_args[0])
+        self.assertEqual([2020, 2030, 2040, 2050], sorted(append_args[1]))
+        update_all_mock.assert_called_once()
+        self.assertEqual(
+            [(10, "new_name_0"), (11, "new_name_1")],
+            sorted(
+                (product_id, product.name)
+                for product_id, product in update_all_mock.call_args.args[0]
+            ),
+        )
+        self.__user_items_service_mock.append_product.assert_not_called()
+        self.__product_card_service_mock.update.assert_not_called()
+
+    def test_update_niche_with_fetcher_writes_each_batch(self):
+        niche_id = 2000
+        niche = Niche(
+            "test_niche_name",
+            {
+                HandlerType.CLIENT: 0.1,
+                HandlerType.MARKETPLACE: 0.2,
+                HandlerType.PARTIAL_CLIENT: 0.3,
+            },
+            0.4,
+        )
+        existing_products = [
+            Product(f"old_name_{i}", 100, 200 + i, 1.0, "brand", "seller", [])
+            for i in range(4)
+        ]
+        self.__niche_service_mock.find_by_id = Mock(return_value=niche)
+        self.__category_service_mock.find_by_id = Mock(
+            return_value=Category("test_category_name", {niche.name: niche})
+        )
+        self.__niche_service_mock.find_by_name_atomic = Mock(
+            return_value=(
+                Niche(
+                    niche.name,
+                    niche.commissions,
+                    niche.returned_percent,
+                    existing_products,
+                ),
+                niche_id,
+            )
+        )
+        self.__data_provider_without_key_mock.get_products_globals_ids = Mock(
+            return_value=set(range(200, 210))
+        )
+        self.__data_provider_without_key_mock.get_products = Mock(
+            side_effect=lambda niche_name, category_name, products_ids: [
+                Product(f"new_name_{i}", 150, i, 2.0, "brand", "seller", [])
+                for i in products_ids
+            ]
+        )
+        find_ids_in_niche_mock = Mock(
+            return_value={
+                product.global_id: product.global_id for product in existing_products
+            }
+        )
+        self.__product_card_service_mock.find_ids_in_niche = find_ids_in_niche_mock
+        changer = JormChangerImpl(
+            economy_constants_service=self.__economy_constants_service_mock,
+            category_service=self.__category_service_mock,
+            niche_service=self.__niche_service_mock,
+            product_card_service=self.__product_card_service_mock,
+            product_history_service=self.__product_history_service_mock,
+            economy_service=self.__economy_service_mock,
+            transit_service=self.__transit_service_mock,
+            user_items_service=self.__user_items_service_mock,
+            data_provider_without_key=self.__data_provider_without_key_mock,
+            user_market_data_provider=self.__user_market_data_provider_mock,
+            standard_filler=self.__standard_filler_mock,
+            niche_characteristics_service=self.__niche_characteristics_service_mock,
+            green_trade_zone_service=self.__green_trade_zone_service_mock,
+            provider_fetcher=ProviderFetcher(FetchPolicy(batch_size=3)),
+        )
+        result = changer.update_niche(niche_id, 900, 3)
+        assert result is not None
+        self.assertEqual(
+            list(range(200, 210)),
+            sorted(product.global_id for product in result.products),
+        )
+        self.assertEqual(
+            4, self.__data_provider_without_key_mock.get_products.call_count
+        )
+        self.assertEqual(4, self.__product_card_service_mock.upsert_products.call_count)
+        created = [
+            product.global_id
+            for call in self.__product_card_service_mock.upsert_products.call_args_list
+            for product in call.args[0]
+        ]
+        self.assertEqual(list(range(204, 210)), sorted(created))
+        find_ids_in_niche_mock.assert_called_once_with(niche_id)
+        self.__niche_service_mock.mark_updated.assert_called_once_with(niche_id)
+
     def test_load_user_warehouse(self):
         fill_warehouses_mock = Mock()
         fill_warehouses_mock.return_value = [
@@ -0,0 +1,7 @@
+import os
+import unittest
+
+benchmark = unittest.skipUnless(
+    os.environ.get("JARVIS_DB_BENCHMARKS") == "1",
+    "set JARVIS_DB_BENCHMARKS=1 to run benchmarks",
+)
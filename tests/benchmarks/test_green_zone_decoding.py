@@ -0,0 +1,50 @@
+import json
+import logging
+import time
+import unittest
+
+from jarvis_db.cache.green_trade_zone.green_trade_zone_codec import (
+    GreenZoneSegmentData,
+    decode_segment_data,
+    encode_segment_data,
+)
+from tests.benchmarks import benchmark
+
+_logger = logging.getLogger(__name__)
+
+
+@benchmark
+class GreenZoneDecodingBenchmark(unittest.TestCase):
+    __segments_count = 10_000
+    __repeats = 20
+
+    def test_binary_decode_matches_json_validation(self):
+        count = self.__segments_count
+        segment_data = GreenZoneSegmentData(
+            segments=[(i * 100, (i + 1) * 100) for i in range(count)],
+            segment_profits=list(range(count)),
+            mean_segment_profit=list(range(count)),
+            mean_product_profit=list(range(count)),
+            segment_product_count=list(range(count)),
+            segment_product_with_trades_count=list(range(count)),
+        )
+        json_data = json.dumps(segment_data.model_dump())
+        binary_data = encode_segment_data(segment_data)
+        start = time.perf_counter()
+        for _ in range(self.__repeats):
+            validated = GreenZoneSegmentData.model_validate(json.loads(json_data))
+        json_time = (time.perf_counter() - start) / self.__repeats
+        start = time.perf_counter()
+        for _ in range(self.__repeats):
+            decoded = decode_segment_data(binary_data)
+        binary_time = (time.perf_counter() - start) / self.__repeats
+        _logger.info(
+            f"green zone with {count} segments: "
+            f"json {json_time * 1000:.2f}ms, binary {binary_time * 1000:.2f}ms, "
+            f"{len(json_data)} json bytes, {len(binary_data)} binary bytes"
+        )
+        self.assertEqual(validated, decoded)
+
+
+if __name__ == "__main__":
+    unittest.main()
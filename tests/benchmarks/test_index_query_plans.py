@@ -0,0 +1,215 @@
+import logging
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import Select, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from jarvis_db.schemas import (
+    Address,
+    Category,
+    Leftover,
+    Marketplace,
+    Niche,
+    ProductCard,
+    ProductHistory,
+    ProductToNiche,
+    Warehouse,
+)
+from tests.benchmarks import benchmark
+from tests.db_context import DbContext
+
+_logger = logging.getLogger(__name__)
+
+
+@benchmark
+class IndexQueryPlanBenchmark(unittest.TestCase):
+    __niches_count = 20
+    __products_count = 2000
+    __histories_per_product = 10
+    __leftovers_per_history = 3
+    __repeats = 200
+
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            self.__seed(session)
+
+    def test_lookups_use_indexes(self):
+        queries: dict[str, tuple[Select, str]] = {
+            "product by global id": (
+                select(ProductCard.id).where(ProductCard.global_id == 1500),
+                "ix_product_cards_global_id",
+            ),
+            "histories of product": (
+                select(ProductHistory.id)
+                .where(ProductHistory.product_id == 1500)
+                .where(ProductHistory.date >= datetime(2023, 1, 5)),
+                "ix_product_histories_product_id_date",
+            ),
+            "leftovers of history": (
+                select(Leftover.id).where(Leftover.product_history_id == 1500),
+                "ix_leftovers_product_history_id",
+            ),
+            "products in niche": (
+                select(ProductToNiche.product_id).where(ProductToNiche.niche_id == 5),
+                "ix_products_to_niches_niche_id_product_id",
+            ),
+            "niche by name": (
+                select(Niche.id)
+                .where(Niche.category_id == 1)
+                .where(func.lower(Niche.name) == func.lower("NICHE_5")),
+                "ix_niches_category_id_lower_name",
+            ),
+            "niches by names": (
+                select(Niche.id)
+                .where(Niche.category_id.in_([1, 2]))
+                .where(func.lower(Niche.name).in_(["niche_5", "niche_6"])),
+                "ix_niches_category_id_lower_name",
+            ),
+            "niches in category": (
+                select(Niche.id).where(Niche.category_id == 1),
+                "ix_niches_category_id",
+            ),
+        }
+        indexes = [
+            index
+            for table in (ProductCard, ProductHistory, Leftover, ProductToNiche, Niche)
+            for index in table.__table__.indexes
+        ]
+        with self.__db_context.session() as session, session.begin():
+            for index in indexes:
+                index.drop(session.connection())
+        with self.__db_context.session() as session:
+            not_indexed = {
+                name: self.__measure(session, query)
+                for name, (query, _) in queries.items()
+            }
+        with self.__db_context.session() as session, session.begin():
+            for index in indexes:
+                index.create(session.connection())
+        with self.__db_context.session() as session:
+            indexed = {
+                name: self.__measure(session, query)
+                for name, (query, _) in queries.items()
+            }
+        for name, (_, index_name) in queries.items():
+            indexed_plan, indexed_time = indexed[name]
+            plain_plan, plain_time = not_indexed[name]
+            _logger.info(
+                f"{name}: {plain_time * 1000:.2f}ms -> {indexed_time * 1000:.2f}ms\n"
+                f"\twithout indexes: {plain_plan}\n"
+                f"\twith indexes: {indexed_plan}"
+            )
+            self.assertIn(index_name, indexed_plan)
+            self.assertNotIn(index_name, plain_plan)
+
+    def __measure(self, session: Session, query: Select) -> tuple[str, float]:
+        compiled = query.compile(
+            dialect=session.get_bind().dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = " | ".join(
+            row[-1]
+            for row in session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        )
+        start = time.perf_counter()
+        for _ in range(self.__repeats):
+            session.execute(query).all()
+        return plan, (time.perf_counter() - start) / self.__repeats
+
+    def __seed(self, session: Session):
+        marketplace = Marketplace(name="marketplace")
+        categories = [
+            Category(name=f"category_{i}", marketplace=marketplace) for i in range(5)
+        ]
+        session.add_all(categories)
+        session.add(
+            Warehouse(
+                marketplace=marketplace,
+                global_id=1,
+                type=0,
+                name="warehouse",
+                main_coefficient=100,
+                address=Address(country="", region="", street="", number="", corpus=""),
+            )
+        )
+        session.flush()
+        niche_ids = (
+            session.execute(
+                insert(Niche).returning(Niche.id),
+                [
+                    {
+                        "name": f"niche_{i}",
+                        "category_id": categories[i % len(categories)].id,
+                        "marketplace_commission": 0,
+                        "partial_client_commission": 0,
+                        "client_commission": 0,
+                        "return_percent": 0,
+                    }
+                    for i in range(self.__niches_count)
+                ],
+            )
+            .scalars()
+            .all()
+        )
+        product_ids = (
+            session.execute(
+                insert(ProductCard).returning(ProductCard.id),
+                [
+                    {
+                        "name": f"product_{i}",
+                        "global_id": i,
+                        "cost": i,
+                        "rating": 0,
+                        "brand": "brand",
+                        "seller": "seller",
+                    }
+                    for i in range(self.__products_count)
+                ],
+            )
+            .scalars()
+            .all()
+        )
+        session.execute(
+            insert(ProductToNiche),
+            [
+                {"product_id": product_id, "niche_id": niche_ids[i % len(niche_ids)]}
+                for i, product_id in enumerate(product_ids)
+            ],
+        )
+        history_ids = (
+            session.execute(
+                insert(ProductHistory).returning(ProductHistory.id),
+                [
+                    {
+                        "cost": day,
+                        "date": datetime(2023, 1, 1) + timedelta(days=day),
+                        "product_id": product_id,
+                    }
+                    for product_id in product_ids
+                    for day in range(self.__histories_per_product)
+                ],
+            )
+            .scalars()
+            .all()
+        )
+        warehouse_id = session.execute(select(Warehouse.id)).scalar_one()
+        session.execute(
+            insert(Leftover),
+            [
+                {
+                    "type": f"size_{i}",
+                    "quantity": i,
+                    "warehouse_id": warehouse_id,
+                    "product_history_id": history_id,
+                }
+                for history_id in history_ids
+                for i in range(self.__leftovers_per_history)
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
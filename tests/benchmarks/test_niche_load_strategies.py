@@ -0,0 +1,86 @@
+import logging
+import time
+import unittest
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from jarvis_db.factories.services import create_niche_service
+from jarvis_db.market.infrastructure.niche.niche_service import NicheLoadStrategy
+from tests.benchmarks import benchmark
+from tests.db_context import DbContext
+from tests.fixtures import seed_niche
+from tests.helpers import sort_product
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _LoadReport:
+    queries: int
+    rows: int
+    seconds: float
+
+
+@benchmark
+class NicheLoadStrategiesBenchmark(unittest.TestCase):
+    __products_count = 200
+    __histories_per_product = 30
+    __leftovers_per_history = 4
+
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            self.__niche_id = seed_niche(
+                session,
+                self.__products_count,
+                self.__histories_per_product,
+                self.__leftovers_per_history,
+            )
+
+    def test_load_strategies(self):
+        niches = {}
+        for strategy in NicheLoadStrategy:
+            with self.__db_context.session() as session:
+                report, niche = self.__measure(session, strategy)
+            _logger.info(
+                f"{strategy.value}: {report.queries} queries, "
+                f"{report.rows} rows, {report.seconds * 1000:.1f}ms"
+            )
+            assert niche is not None
+            for product in niche.products:
+                sort_product(product)
+            niche.products.sort(key=lambda product: product.global_id)
+            niches[strategy] = niche
+        for strategy, niche in niches.items():
+            with self.subTest(strategy=strategy):
+                self.assertEqual(niches[NicheLoadStrategy.JOINED], niche)
+
+    def __measure(self, session: Session, strategy: NicheLoadStrategy):
+        statements = []
+        engine = session.get_bind()
+
+        def record_statement(conn, cursor, statement, parameters, context, many):
+            statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", record_statement)
+        try:
+            service = create_niche_service(session, load_strategy=strategy)
+            start = time.perf_counter()
+            niche = service.fetch_by_id_atomic(self.__niche_id)
+            seconds = time.perf_counter() - start
+        finally:
+            event.remove(engine, "before_cursor_execute", record_statement)
+        connection = session.connection()
+        rows = sum(
+            connection.exec_driver_sql(
+                f"SELECT count(*) FROM ({statement})", parameters
+            ).scalar_one()
+            for statement, parameters in statements
+        )
+        return _LoadReport(len(statements), rows, seconds), niche
+
+
+if __name__ == "__main__":
+    unittest.main()
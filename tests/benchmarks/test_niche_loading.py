@@ -0,0 +1,57 @@
+import logging
+import time
+import unittest
+
+from jarvis_db.factories.services import create_niche_flat_loader, create_niche_service
+from tests.benchmarks import benchmark
+from tests.db_context import DbContext
+from tests.fixtures import seed_niche
+from tests.helpers import sort_product
+
+_logger = logging.getLogger(__name__)
+
+
+@benchmark
+class NicheLoadingBenchmark(unittest.TestCase):
+    __products_count = 300
+    __histories_per_product = 30
+    __leftovers_per_history = 4
+
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            self.__niche_id = seed_niche(
+                session,
+                self.__products_count,
+                self.__histories_per_product,
+                self.__leftovers_per_history,
+            )
+
+    def test_flat_loader_matches_atomic_path(self):
+        with self.__db_context.session() as session:
+            start = time.perf_counter()
+            atomic_niche = create_niche_service(session).fetch_by_id_atomic(
+                self.__niche_id
+            )
+            atomic_time = time.perf_counter() - start
+        with self.__db_context.session() as session:
+            start = time.perf_counter()
+            flat_niche = create_niche_flat_loader(session).fetch_by_id(self.__niche_id)
+            flat_time = time.perf_counter() - start
+        _logger.info(
+            f"niche with {self.__products_count} products, "
+            f"{self.__histories_per_product} histories per product, "
+            f"{self.__leftovers_per_history} leftovers per history: "
+            f"atomic {atomic_time * 1000:.1f}ms, flat {flat_time * 1000:.1f}ms"
+        )
+        assert atomic_niche is not None
+        assert flat_niche is not None
+        for niche in (atomic_niche, flat_niche):
+            niche.products.sort(key=lambda product: product.global_id)
+            for product in niche.products:
+                sort_product(product)
+        self.assertEqual(atomic_niche, flat_niche)
+
+
+if __name__ == "__main__":
+    unittest.main()
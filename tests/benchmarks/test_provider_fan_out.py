@@ -0,0 +1,100 @@
+import logging
+import time
+import unittest
+from typing import Iterable
+from unittest.mock import Mock
+
+from jorm.market.infrastructure import Product
+
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetcher
+from jarvis_db.access.jorm_changer import JormChangerImpl
+from tests.benchmarks import benchmark
+
+_logger = logging.getLogger(__name__)
+
+
+class FakeDataProvider:
+    def __init__(self, latency: float):
+        self.__latency = latency
+
+    def get_base_products(self, products_global_ids: Iterable[int]) -> list[Product]:
+        time.sleep(self.__latency)
+        return [
+            Product(f"product_{global_id}", 100, global_id, 1.0, "brand", "seller", [])
+            for global_id in products_global_ids
+        ]
+
+    def get_category_and_niche(self, product_id: int) -> tuple[str, str]:
+        time.sleep(self.__latency)
+        return f"category_{product_id % 3}", f"niche_{product_id % 7}"
+
+
+@benchmark
+class ProviderFanOutBenchmark(unittest.TestCase):
+    __products_count = 200
+    __latency = 0.005
+
+    def test_fan_out_overlaps_provider_calls(self):
+        sequential_time, sequential_products = self.__load(None)
+        fetcher = ProviderFetcher(FetchPolicy(max_workers=16, batch_size=50))
+        concurrent_time, concurrent_products = self.__load(fetcher)
+        _logger.info(
+            f"user products import of {self.__products_count} products "
+            f"with {self.__latency * 1000:.0f}ms provider latency: "
+            f"sequential {sequential_time * 1000:.0f}ms, "
+            f"fan-out {concurrent_time * 1000:.0f}ms"
+        )
+        self.assertEqual(sequential_products, concurrent_products)
+        self.assertLess(concurrent_time, sequential_time)
+
+    def __load(
+        self, fetcher: ProviderFetcher | None
+    ) -> tuple[float, list[tuple[int, list[tuple[str, str]]]]]:
+        user_market_data_provider = Mock()
+        user_market_data_provider.get_user_products = Mock(
+            return_value=list(range(self.__products_count))
+        )
+        user_items_service = Mock()
+        user_items_service.fetch_user_products = Mock(return_value={})
+        category_service = Mock()
+        category_service.ensure_all = Mock(
+            side_effect=lambda categories, _: {
+                category.name: i for i, category in enumerate(categories)
+            }
+        )
+        niche_service = Mock()
+        niche_service.ensure_all = Mock(
+            side_effect=lambda niches: {
+                (category_id, niche.name): i
+                for i, (category_id, niche) in enumerate(niches)
+            }
+        )
+        product_card_service = Mock()
+        product_card_service.upsert_products = Mock(return_value={})
+        changer = JormChangerImpl(
+            economy_constants_service=Mock(),
+            category_service=category_service,
+            niche_service=niche_service,
+            product_card_service=product_card_service,
+            product_history_service=Mock(),
+            economy_service=Mock(),
+            transit_service=Mock(),
+            user_items_service=user_items_service,
+            niche_characteristics_service=Mock(),
+            green_trade_zone_service=Mock(),
+            data_provider_without_key=FakeDataProvider(self.__latency),
+            user_market_data_provider=user_market_data_provider,
+            standard_filler=Mock(),
+            provider_fetcher=fetcher,
+        )
+        start = time.perf_counter()
+        products = changer.load_user_products(1, 1)
+        elapsed = time.perf_counter() - start
+        assert products is not None
+        return elapsed, sorted(
+            (product.global_id, product.category_niche_list) for product in products
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
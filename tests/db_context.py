@@ -1,22 +1,17 @@
-from sqlalchemy import create_engine, event
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker
-
-from jarvis_db.db_config import Base
+from jarvis_db.db_config import (
+    Base,
+    DbSettings,
+    create_db_engine,
+    create_session_factory,
+)
 
 
 class DbContext:
     def __init__(self, connection_sting: str = "sqlite://", echo: bool = False) -> None:
-        if connection_sting.startswith("sqlite://"):
-
-            @event.listens_for(Engine, "connect")
-            def set_sqlite_pragma(dbapi_connection, connection_record):
-                cursor = dbapi_connection.cursor()
-                cursor.execute("PRAGMA foreign_keys=ON")
-                cursor.close()
-
-        engine = create_engine(connection_sting, echo=echo)
-        session = sessionmaker(bind=engine, autoflush=False)
+        engine = create_db_engine(
+            DbSettings(url=connection_sting, echo=echo, sqlite_foreign_keys=True)
+        )
+        session = create_session_factory(engine)
         Base.metadata.drop_all(engine)
         Base.metadata.create_all(engine)
         self.session = session
@@ -1,5 +1,7 @@
+from datetime import datetime, timedelta
+
 from jorm.market.person import UserPrivilege
-from sqlalchemy import select
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
 from jarvis_db.schemas import (
@@ -114,7 +116,10 @@ class AlchemySeeder:
         if not niches:
             self.seed_niches(15)
             niches = retrieve_niches()
-        products = create_products(quantity, niches)
+        existing_products = self.__session.execute(
+            select(func.count()).select_from(ProductCard)
+        ).scalar_one()
+        products = create_products(quantity, niches, existing_products)
         self.__session.add_all(products)
         self.__session.flush()
         self.__session.add_all(
@@ -238,11 +243,13 @@ def create_niches(quantity: int, categories: list[Category]) -> list[Niche]:
     ]
 
 
-def create_products(quantity: int, niches: list[Niche]) -> list[ProductCard]:
+def create_products(
+    quantity: int, niches: list[Niche], start: int = 0
+) -> list[ProductCard]:
     return [
         ProductCard(
             name=f"product_{i}",
-            global_id=i + 200,
+            global_id=start + i + 200,
             cost=i * 100,
             rating=i % 100,
             brand=f"brand_{i}",
@@ -290,3 +297,92 @@ def create_leftovers(
         )
         for i in range(quantity)
     ]
+
+
+def seed_niche(
+    session: Session,
+    products_count: int,
+    histories_per_product: int,
+    leftovers_per_history: int,
+    warehouses_count: int = 5,
+) -> int:
+    marketplace = Marketplace(name="benchmark_marketplace")
+    category = Category(name="benchmark_category", marketplace=marketplace)
+    niche = Niche(
+        name="benchmark_niche",
+        category=category,
+        marketplace_commission=10,
+        partial_client_commission=20,
+        client_commission=30,
+        return_percent=5,
+    )
+    warehouses = [
+        Warehouse(
+            marketplace=marketplace,
+            global_id=100 + i,
+            type=0,
+            name=f"warehouse_{i}",
+            main_coefficient=100,
+            address=Address(country="", region="", street="", number="", corpus=""),
+        )
+        for i in range(warehouses_count)
+    ]
+    session.add_all([niche, *warehouses])
+    session.flush()
+    product_ids = (
+        session.execute(
+            insert(ProductCard).returning(ProductCard.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": f"product_{i}",
+                    "global_id": 1000 + i,
+                    "cost": 100 * i,
+                    "rating": i % 500,
+                    "brand": f"brand_{i}",
+                    "seller": f"seller_{i}",
+                }
+                for i in range(products_count)
+            ],
+        )
+        .scalars()
+        .all()
+    )
+    session.execute(
+        insert(ProductToNiche),
+        [
+            {"product_id": product_id, "niche_id": niche.id}
+            for product_id in product_ids
+        ],
+    )
+    history_ids = (
+        session.execute(
+            insert(ProductHistory).returning(
+                ProductHistory.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "cost": 100 + day,
+                    "date": datetime(2023, 1, 1) + timedelta(days=day),
+                    "product_id": product_id,
+                }
+                for product_id in product_ids
+                for day in range(histories_per_product)
+            ],
+        )
+        .scalars()
+        .all()
+    )
+    session.execute(
+        insert(Leftover),
+        [
+            {
+                "type": f"size_{i}",
+                "quantity": i,
+                "warehouse_id": warehouses[i % len(warehouses)].id,
+                "product_history_id": history_id,
+            }
+            for history_id in history_ids
+            for i in range(leftovers_per_history)
+        ],
+    )
+    return niche.id
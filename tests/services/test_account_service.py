@@ -7,6 +7,7 @@ from jarvis_db.factories.services import create_account_service
 from jarvis_db.market.person.account.account_mappers import AccountTableToJormMapper
 from jarvis_db.schemas import Account
 from tests.db_context import DbContext
+from tests.fixtures import AlchemySeeder
 
 
 class AccountServiceTest(unittest.TestCase):
@@ -114,6 +115,21 @@ class AccountServiceTest(unittest.TestCase):
             self.assertEqual(phone, account.phone_number)
             self.assertIsNone(account.email)
 
+    def test_iter_all(self):
+        mapper = AccountTableToJormMapper()
+        with self.__db_context.session() as session, session.begin():
+            AlchemySeeder(session).seed_accounts(25)
+            expected = [
+                (account.id, mapper.map(account))
+                for account in session.execute(select(Account).order_by(Account.id))
+                .scalars()
+                .all()
+            ]
+        with self.__db_context.session() as session:
+            service = create_account_service(session)
+            actual = list(service.iter_all(page_size=10, yield_per=3))
+            self.assertEqual(expected, actual)
+
 
 if __name__ == "__main__":
     unittest.main()
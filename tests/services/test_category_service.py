@@ -31,6 +31,54 @@ class CategoryServiceTest(unittest.TestCase):
             ).scalar_one()
             self.assertEqual(expected_category.name, actual_category.name)
 
+    def test_ensure_all_creates_only_missing_categories(self):
+        with self.__db_context.session() as session, session.begin():
+            session.add(Category(name="Existing", marketplace_id=self.__marketplace_id))
+            session.flush()
+            existing_id = session.execute(select(Category.id)).scalar_one()
+        with self.__db_context.session() as session, session.begin():
+            service = create_category_service(session)
+            category_ids = service.ensure_all(
+                (
+                    CategoryEntity(name)
+                    for name in ("existing", "first", "second", "first")
+                ),
+                self.__marketplace_id,
+            )
+        with self.__db_context.session() as session:
+            name_to_id = {
+                name: category_id
+                for category_id, name in session.execute(
+                    select(Category.id, Category.name)
+                )
+            }
+        self.assertEqual(
+            {
+                "existing": existing_id,
+                "first": name_to_id["first"],
+                "second": name_to_id["second"],
+            },
+            category_ids,
+        )
+        self.assertEqual(3, len(name_to_id))
+
+    def test_ensure_all_matches_find_by_name(self):
+        with self.__db_context.session() as session, session.begin():
+            session.add_all(
+                Category(name=name, marketplace_id=self.__marketplace_id)
+                for name in ("Фрукты", "Apple")
+            )
+        names = ("Фрукты", "APPLE", "фрукты", "ФРУКТЫ")
+        with self.__db_context.session() as session, session.begin():
+            service = create_category_service(session)
+            category_ids = service.ensure_all(
+                (CategoryEntity(name) for name in names), self.__marketplace_id
+            )
+            for name in names:
+                category_tuple = service.find_by_name(name, self.__marketplace_id)
+                assert category_tuple is not None
+                self.assertEqual(category_tuple[1], category_ids[name])
+
     def test_find_by_id(self):
         category_id = 100
         mapper = create_category_table_mapper()
@@ -122,6 +170,26 @@ class CategoryServiceTest(unittest.TestCase):
             )
             self.assertDictEqual(expected_categories, actual_categories)
 
+    def test_iter_all_in_marketplace_atomic(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_marketplaces(2)
+            seeder.seed_categories(10)
+            seeder.seed_niches(40)
+            seeder.seed_products(100)
+        with self.__db_context.session() as session:
+            service = create_category_service(session)
+            expected = service.fetch_all_in_marketplace_atomic(self.__marketplace_id)
+            actual = list(
+                service.iter_all_in_marketplace_atomic(
+                    self.__marketplace_id, page_size=3
+                )
+            )
+            self.assertEqual(
+                sorted(expected), [category_id for category_id, _ in actual]
+            )
+            self.assertDictEqual(expected, dict(actual))
+
     def test_exists_with_name_returns_true(self):
         category_name = "qwerty"
         with self.__db_context.session() as session, session.begin():
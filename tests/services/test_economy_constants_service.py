@@ -1,6 +1,7 @@
 import unittest
 
 from sqlalchemy import select
+from jarvis_db.factories.caches import create_metadata_cache
 from jarvis_db.factories.services import create_economy_constants_service
 from jarvis_db.market.service.economy_constants.economy_constants_mappers import (
     EconomyConstantsTableToJormMapper,
@@ -160,6 +161,37 @@ class EconomyConstantsServiceTest(unittest.TestCase):
             actual = service.find_by_marketplace_id(self.__marketplace_id)
             self.assertEqual(expected, actual)
 
+    def test_find_by_marketplace_id_cached_until_upsert(self):
+        cache = create_metadata_cache()
+        constants = EconomyConstantsEntity(
+            max_mass=1.1,
+            max_side_sum=2.2,
+            max_side_length=3.3,
+            max_standard_volume_in_liters=4.4,
+            return_price=10,
+            oversize_logistic_price=20,
+            oversize_storage_price=30,
+            standard_warehouse_logistic_price=50,
+            standard_warehouse_storage_price=60,
+            nds_tax=5.5,
+            commercial_tax=6.6,
+            self_employed_tax=7.7,
+        )
+        with self.__db_context.session() as session:
+            service = create_economy_constants_service(session, cache)
+            self.assertIsNone(service.find_by_marketplace_id(self.__marketplace_id))
+            self.assertIsNone(service.find_by_marketplace_id(self.__marketplace_id))
+        self.assertEqual(1, cache.stats.misses)
+        self.assertEqual(1, cache.stats.hits)
+        with self.__db_context.session() as session, session.begin():
+            service = create_economy_constants_service(session, cache)
+            service.upsert_constants(self.__marketplace_id, constants)
+        with self.__db_context.session() as session:
+            service = create_economy_constants_service(session, cache)
+            actual = service.find_by_marketplace_id(self.__marketplace_id)
+            self.assertEqual(constants, actual)
+        self.assertEqual(2, cache.stats.misses)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,14 +1,18 @@
 import unittest
+from datetime import datetime, timedelta
 
 from jorm.support.calculation import GreenTradeZoneCalculateResult
-from sqlalchemy import select
+from sqlalchemy import select, update
 
+from jarvis_db.cache.staleness import CacheStatus
 from jarvis_db.factories.services import create_green_trade_zone_service
 from jarvis_db.cache.green_trade_zone.green_trade_zone_mappers import (
     GreenTradeZoneTableToJormMapper,
 )
 from jarvis_db.schemas import GreenTradeZoneCalculationResult, Niche
-from jarvis_db.cache.green_trade_zone.green_trade_zone_service import GreenZoneSegmentData
+from jarvis_db.cache.green_trade_zone.green_trade_zone_service import (
+    GreenZoneSegmentData,
+)
 from tests.db_context import DbContext
 from tests.fixtures import AlchemySeeder
 
@@ -97,6 +101,72 @@ class GreenTradeZoneServiceTest(unittest.TestCase):
             actual = mapper.map(db_result)
             self.assertEqual(expected, actual)
 
+    def test_upsert_many(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(4)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+
+        def create_result(i: int) -> GreenTradeZoneCalculateResult:
+            return GreenTradeZoneCalculateResult(
+                segments=[(1 + i, 2 + i), (3 + i, 4 + i)],
+                mean_segment_profit=[4 + i, 5],
+                mean_product_profit=[1 + i, 2],
+                segment_product_count=[7 + i, 8],
+                segment_profits=[13 + i, 14],
+                segment_product_with_trades_count=[10 + i, 11],
+                best_mean_product_profit_idx=i,
+                best_mean_segment_profit_idx=i,
+                best_segment_idx=i,
+                best_segment_product_count_idx=i,
+                best_segment_product_with_trades_count_idx=i,
+                best_segment_profit_idx=i,
+            )
+
+        with self.__db_context.session() as session, session.begin():
+            service = create_green_trade_zone_service(session)
+            service.upsert_many({niche_ids[0]: create_result(0)})
+        expected = {
+            niche_id: create_result(i + 1) for i, niche_id in enumerate(niche_ids)
+        }
+        with self.__db_context.session() as session, session.begin():
+            service = create_green_trade_zone_service(session)
+            service.upsert_many(expected, batch_size=3)
+        with self.__db_context.session() as session:
+            service = create_green_trade_zone_service(session)
+            actual = {
+                niche_id: service.find_by_niche_id(niche_id) for niche_id in niche_ids
+            }
+            self.assertDictEqual(expected, actual)
+
+    def test_find_by_niche_ids(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(4)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            expected = {
+                niche_id: GreenTradeZoneCalculateResult(
+                    segments=[(1, 2), (3, 4)],
+                    mean_segment_profit=[4, 5],
+                    mean_product_profit=[1, 2],
+                    segment_product_count=[7, 8],
+                    segment_profits=[13, 14],
+                    segment_product_with_trades_count=[10, 11],
+                    best_mean_product_profit_idx=i,
+                    best_mean_segment_profit_idx=i,
+                    best_segment_idx=i,
+                    best_segment_product_count_idx=i,
+                    best_segment_product_with_trades_count_idx=i,
+                    best_segment_profit_idx=i,
+                )
+                for i, niche_id in enumerate(niche_ids[:3])
+            }
+            create_green_trade_zone_service(session).upsert_many(expected)
+        with self.__db_context.session() as session:
+            service = create_green_trade_zone_service(session)
+            actual = service.find_by_niche_ids(niche_ids)
+            self.assertDictEqual(expected, actual)
+
     def test_find_by_id(self):
         mapper = GreenTradeZoneTableToJormMapper()
         with self.__db_context.session() as session, session.begin():
@@ -125,6 +195,113 @@ class GreenTradeZoneServiceTest(unittest.TestCase):
             actual = service.find_by_niche_id(self.__niche_id)
             self.assertEqual(expected, actual)
 
+    def test_lookup(self):
+        expected = GreenTradeZoneCalculateResult(
+            segments=[(1, 2), (3, 4), (5, 6)],
+            mean_segment_profit=[4, 5, 6],
+            mean_product_profit=[1, 2, 3],
+            segment_product_count=[7, 8, 9],
+            segment_profits=[13, 14, 15],
+            segment_product_with_trades_count=[10, 11, 12],
+            best_mean_product_profit_idx=1,
+            best_mean_segment_profit_idx=2,
+            best_segment_idx=3,
+            best_segment_product_count_idx=4,
+            best_segment_product_with_trades_count_idx=5,
+            best_segment_profit_idx=6,
+        )
+        with self.__db_context.session() as session, session.begin():
+            service = create_green_trade_zone_service(session)
+            self.assertEqual(
+                CacheStatus.MISSING, service.lookup(self.__niche_id).status
+            )
+            session.execute(
+                update(Niche).values(update_date=datetime.utcnow() - timedelta(days=1))
+            )
+            service.upsert(self.__niche_id, expected)
+            actual = service.lookup(self.__niche_id, max_age=timedelta(hours=1))
+            self.assertEqual(CacheStatus.FRESH, actual.status)
+            self.assertEqual(expected, actual.value)
+            session.execute(
+                update(Niche).values(
+                    update_date=datetime.utcnow() + timedelta(minutes=1)
+                )
+            )
+            actual = service.lookup(self.__niche_id)
+            self.assertEqual(CacheStatus.STALE, actual.status)
+            self.assertEqual(expected, actual.value)
+
+    def test_migrate_segment_data(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(2)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            session.add_all(
+                GreenTradeZoneCalculationResult(
+                    niche_id=niche_id,
+                    best_mean_product_profit_index=1,
+                    best_mean_segment_profit_index=2,
+                    best_segment_index=3,
+                    best_segment_product_count_index=4,
+                    best_segment_product_with_trades_count_index=5,
+                    best_segment_profit_index=6,
+                    segment_data=GreenZoneSegmentData(
+                        segments=[(1, 2), (3, 4 + i)],
+                        mean_segment_profit=[4, 5],
+                        mean_product_profit=[1, 2],
+                        segment_product_count=[7, 8],
+                        segment_profits=[13, 14],
+                        segment_product_with_trades_count=[10, 11],
+                    ).model_dump(),
+                )
+                for i, niche_id in enumerate(niche_ids[1:])
+            )
+            session.add(
+                GreenTradeZoneCalculationResult(
+                    niche_id=niche_ids[0],
+                    best_mean_product_profit_index=1,
+                    best_mean_segment_profit_index=2,
+                    best_segment_index=3,
+                    best_segment_product_count_index=4,
+                    best_segment_product_with_trades_count_index=5,
+                    best_segment_profit_index=6,
+                )
+            )
+        niche_ids = niche_ids[1:]
+        with self.__db_context.session() as session:
+            expected = create_green_trade_zone_service(session).find_by_niche_ids(
+                niche_ids
+            )
+        with self.__db_context.session() as session, session.begin():
+            service = create_green_trade_zone_service(session)
+            self.assertEqual(2, service.migrate_segment_data(batch_size=1))
+            self.assertEqual(0, service.migrate_segment_data())
+        with self.__db_context.session() as session:
+            db_results = (
+                session.execute(
+                    select(GreenTradeZoneCalculationResult).where(
+                        GreenTradeZoneCalculationResult.segment_data.is_(None)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            self.assertEqual(3, len(db_results))
+            self.assertEqual(
+                2,
+                len(
+                    [
+                        db_result
+                        for db_result in db_results
+                        if db_result.segment_data_binary is not None
+                    ]
+                ),
+            )
+            actual = create_green_trade_zone_service(session).find_by_niche_ids(
+                niche_ids
+            )
+            self.assertDictEqual(expected, actual)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from datetime import datetime
+
+from jorm.market.items import ProductHistory as ProductHistoryDomain
+from jorm.market.items import ProductHistoryUnit, StorageDict
+from jorm.support.types import SpecifiedLeftover
+from sqlalchemy import create_mock_engine, func, select
+
+from jarvis_db.factories.services import create_product_history_service
+from jarvis_db.market.items.product_card_history.history_partitioning import (
+    RangeHistoryPartitioning,
+    iter_periods,
+    partition_name,
+)
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
+from jarvis_db.schemas import Leftover, ProductHistory, Warehouse
+from tests.db_context import DbContext
+from tests.fixtures import seed_niche
+
+
+class HistoryPartitioningTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            seed_niche(session, 2, 70, 2)
+            self.__product_id = session.execute(
+                select(func.min(ProductHistory.product_id))
+            ).scalar_one()
+
+    def test_iter_periods(self):
+        self.assertEqual(
+            [datetime(2022, 12, 1), datetime(2023, 1, 1), datetime(2023, 2, 1)],
+            list(iter_periods(datetime(2022, 12, 15), datetime(2023, 2, 2))),
+        )
+        self.assertEqual(
+            "product_histories_p202302",
+            partition_name("product_histories", datetime(2023, 2, 1)),
+        )
+
+    def test_postgresql_ddl(self):
+        statements: list[str] = []
+        engine = create_mock_engine(
+            "postgresql://",
+            lambda sql, *_, **__: statements.append(
+                " ".join(str(sql.compile(dialect=engine.dialect)).split())
+            ),
+        )
+        RangeHistoryPartitioning().create_tables(
+            engine, datetime(2023, 1, 15), datetime(2023, 2, 2)
+        )
+        histories = next(
+            s for s in statements if s.startswith("CREATE TABLE product_histories ")
+        )
+        self.assertIn("PRIMARY KEY (id, date)", histories)
+        self.assertIn(
+            "FOREIGN KEY(product_id) REFERENCES product_cards (id) ON DELETE CASCADE",
+            histories,
+        )
+        self.assertTrue(histories.endswith("PARTITION BY RANGE (date)"))
+        leftovers = next(
+            s for s in statements if s.startswith("CREATE TABLE leftovers ")
+        )
+        self.assertIn("PRIMARY KEY (id, product_history_date)", leftovers)
+        self.assertIn(
+            "FOREIGN KEY(product_history_id, product_history_date) "
+            "REFERENCES product_histories (id, date) ON DELETE CASCADE",
+            leftovers,
+        )
+        self.assertTrue(leftovers.endswith("PARTITION BY RANGE (product_history_date)"))
+        self.assertFalse(any("DEFAULT" in statement for statement in statements))
+        self.assertEqual(
+            [
+                f"CREATE TABLE IF NOT EXISTS {table}_p{period} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{since}') TO ('{until}')"
+                for period, since, until in (
+                    ("202301", "2023-01-01", "2023-02-01"),
+                    ("202302", "2023-02-01", "2023-03-01"),
+                )
+                for table in ("product_histories", "leftovers")
+            ],
+            [s for s in statements if "PARTITION OF" in s],
+        )
+
+    def test_plain_tables_outside_postgresql(self):
+        partitioning = RangeHistoryPartitioning()
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                [],
+                partitioning.ensure_partitions(
+                    session, datetime(2023, 1, 1), datetime(2023, 3, 1)
+                ),
+            )
+            self.assertEqual(
+                (ProductHistory.__table__, Leftover.__table__),
+                partitioning.insert_tables(session, [datetime(2023, 1, 1)]),
+            )
+
+    def test_partitioned_history_matches_unpartitioned(self):
+        partitioning = RangeHistoryPartitioning()
+        with self.__db_context.session() as session, session.begin():
+            warehouse_gid = session.execute(
+                select(func.min(Warehouse.global_id))
+            ).scalar_one()
+            create_product_history_service(session, partitioning=partitioning).create(
+                ProductHistoryDomain(
+                    [
+                        ProductHistoryUnit(
+                            cost=500,
+                            unit_date=datetime(2023, 4, 1),
+                            leftover=StorageDict(
+                                {warehouse_gid: [SpecifiedLeftover("s", 7)]}
+                            ),
+                        )
+                    ]
+                ),
+                self.__product_id,
+            )
+        window = HistoryWindow(since=datetime(2023, 1, 20), until=datetime(2023, 3, 5))
+        with self.__db_context.session() as session:
+            service = create_product_history_service(session)
+            partitioned_service = create_product_history_service(
+                session, partitioning=partitioning
+            )
+            for history_window in (None, window, HistoryWindow(last_units=5)):
+                expected = service.find_product_history(
+                    self.__product_id, history_window
+                )
+                actual = partitioned_service.find_product_history(
+                    self.__product_id, history_window
+                )
+                self.assertEqual(
+                    sorted(expected.get_history(), key=lambda u: u.unit_date),
+                    actual.get_history(),
+                )
+            self.assertEqual(
+                {warehouse_gid: [SpecifiedLeftover("s", 7)]},
+                dict(
+                    partitioned_service.find_product_history(
+                        self.__product_id, HistoryWindow(last_units=1)
+                    )
+                    .get_history()[0]
+                    .leftover
+                ),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from jarvis_db.factories.services import (
+    create_history_retention_job,
+    create_niche_flat_loader,
+)
+from jarvis_db.market.items.product_card_history.history_retention import (
+    HistoryRetentionPolicy,
+    HistoryRetentionReport,
+    RetentionBucket,
+)
+from jarvis_db.schemas import Leftover, ProductHistory
+from tests.db_context import DbContext
+from tests.fixtures import seed_niche
+
+
+class HistoryRetentionJobTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            self.__niche_id = seed_niche(session, 3, 30, 2)
+
+    def test_compacts_old_history_into_weekly_units(self):
+        job = create_history_retention_job(
+            self.__db_context.session,
+            HistoryRetentionPolicy(
+                keep_raw_for=timedelta(days=7),
+                bucket=RetentionBucket.WEEK,
+                products_per_batch=2,
+            ),
+        )
+        report = job.run(now=datetime(2023, 1, 30))
+        self.assertEqual(
+            HistoryRetentionReport(
+                products=3,
+                histories_removed=63,
+                leftovers_removed=126,
+                histories_created=9,
+                leftovers_created=18,
+            ),
+            report,
+        )
+        with self.__db_context.session() as session:
+            niche = create_niche_flat_loader(session).fetch_by_id(self.__niche_id)
+            assert niche is not None
+            for product in niche.products:
+                units = sorted(
+                    product.history.get_history(), key=lambda unit: unit.unit_date
+                )
+                self.assertEqual(
+                    [
+                        datetime(2023, 1, 1),
+                        datetime(2023, 1, 2),
+                        datetime(2023, 1, 9),
+                        datetime(2023, 1, 16),
+                        *(datetime(2023, 1, day) for day in range(23, 31)),
+                    ],
+                    [unit.unit_date for unit in units],
+                )
+                self.assertEqual(
+                    [100, 104, 111, 118], [unit.cost for unit in units[:4]]
+                )
+                self.assertEqual(
+                    [0, 7],
+                    sorted(
+                        leftover.leftover
+                        for leftovers in units[1].leftover.values()
+                        for leftover in leftovers
+                    ),
+                )
+
+    def test_rerun_is_noop(self):
+        job = create_history_retention_job(
+            self.__db_context.session,
+            HistoryRetentionPolicy(keep_raw_for=timedelta(days=7)),
+        )
+        with self.__db_context.session() as session:
+            histories_count = session.execute(
+                select(func.count()).select_from(ProductHistory)
+            ).scalar_one()
+        self.assertEqual(
+            HistoryRetentionReport(products=3), job.run(datetime(2023, 2, 1))
+        )
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                histories_count,
+                session.execute(
+                    select(func.count()).select_from(ProductHistory)
+                ).scalar_one(),
+            )
+
+    def test_compacts_several_units_of_a_day(self):
+        with self.__db_context.session() as session, session.begin():
+            history = session.execute(
+                select(ProductHistory).order_by(ProductHistory.id).limit(1)
+            ).scalar_one()
+            product_id = history.product_id
+            session.add(
+                ProductHistory(
+                    product_id=product_id,
+                    cost=103,
+                    date=history.date + timedelta(hours=12),
+                    leftovers=[
+                        Leftover(
+                            type=leftover.type,
+                            quantity=leftover.quantity + 4,
+                            warehouse_id=leftover.warehouse_id,
+                        )
+                        for leftover in history.leftovers
+                    ],
+                )
+            )
+        job = create_history_retention_job(
+            self.__db_context.session,
+            HistoryRetentionPolicy(keep_raw_for=timedelta(days=7)),
+        )
+        report = job.run(datetime(2023, 2, 1))
+        self.assertEqual(
+            HistoryRetentionReport(
+                products=3,
+                histories_removed=2,
+                leftovers_removed=4,
+                histories_created=1,
+                leftovers_created=2,
+            ),
+            report,
+        )
+        with self.__db_context.session() as session:
+            compacted = session.execute(
+                select(ProductHistory)
+                .where(ProductHistory.date == datetime(2023, 1, 1))
+                .where(ProductHistory.product_id == product_id)
+            ).scalar_one()
+            self.assertEqual(102, compacted.cost)
+            self.assertEqual(
+                [4, 6], sorted(leftover.quantity for leftover in compacted.leftovers)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import threading
+import unittest
+
+from jorm.market.infrastructure import Category as CategoryEntity
+from jorm.market.infrastructure import HandlerType, Niche as NicheEntity
+from jorm.market.items import Product
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from jarvis_db.access.fill.fill_checkpoint_service import (
+    FillCheckpointService,
+    FillUnitType,
+)
+from jarvis_db.access.fill.marketplace_fill_job import (
+    MarketplaceFillJob,
+    MarketplaceFillProgress,
+)
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetchError
+from jarvis_db.factories.services import (
+    create_category_service,
+    create_marketplace_fill_job,
+    create_niche_service,
+    create_product_card_service,
+)
+from jarvis_db.market.infrastructure.category.category_service import CategoryService
+from jarvis_db.schemas import Marketplace, Niche, ProductCard, ProductToNiche
+from tests.db_context import DbContext
+
+
+class FakeMarketplaceProvider:
+    def __init__(self, failing_call: int | None = None):
+        self.__failing_call = failing_call
+        self.__lock = threading.Lock()
+        self.requested_niches: list[str] = []
+
+    def get_categories_names(self, category_num: int = -1) -> list[str]:
+        return [f"category_{i}" for i in range(2)]
+
+    def get_niches_names(self, category_name: str, niche_num: int = -1) -> list[str]:
+        return [f"{category_name}_niche_{i}" for i in range(3)]
+
+    def get_niches(self, niches_names: list[str]) -> list[NicheEntity]:
+        return [
+            NicheEntity(name, {handler: 0.1 for handler in HandlerType}, 0.05)
+            for name in niches_names
+        ]
+
+    def get_products_globals_ids(
+        self, niche_name: str, product_num: int = -1
+    ) -> set[int]:
+        with self.__lock:
+            self.requested_niches.append(niche_name)
+            call = len(self.requested_niches)
+        if call == self.__failing_call:
+            raise ConnectionError("provider is unavailable")
+        _, category_index, _, niche_index = niche_name.split("_")
+        offset = 1000 * (int(category_index) * 10 + int(niche_index))
+        return {offset + i for i in range(4)}
+
+    def get_products(
+        self, niche_name: str, category_name: str, products_global_ids: set[int]
+    ) -> list[Product]:
+        return [
+            Product(f"product_{global_id}", 100, global_id, 4.5, "brand", "seller")
+            for global_id in products_global_ids
+        ]
+
+
+class FakeFiller:
+    def fill_categories(
+        self,
+        category_service: CategoryService,
+        data_provider_without_key: FakeMarketplaceProvider,
+        category_num: int = -1,
+    ) -> None:
+        names = category_service.filter_existing_names(
+            data_provider_without_key.get_categories_names(), self.marketplace_id
+        )
+        category_service.create_all(
+            (CategoryEntity(name) for name in names), self.marketplace_id
+        )
+
+    def check_warehouse_filled(self, products: list[Product]) -> dict[int, int]:
+        return {}
+
+    marketplace_id = 0
+
+
+class MarketplaceFillJobTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            marketplace = Marketplace(name="marketplace")
+            session.add(marketplace)
+            session.flush()
+            self.__marketplace_id = marketplace.id
+        self.__filler = FakeFiller()
+        self.__filler.marketplace_id = self.__marketplace_id
+
+    def test_fills_categories_niches_and_products(self):
+        reports: list[MarketplaceFillProgress] = []
+        job = create_marketplace_fill_job(
+            self.__db_context.session,
+            self.__filler_factory,
+            FakeMarketplaceProvider(),
+            self.__marketplace_id,
+            progress_callback=reports.append,
+        )
+        progress = job.run()
+        self.assertEqual(
+            MarketplaceFillProgress(
+                niches_total=6, niches_done=6, products_upserted=24
+            ),
+            progress,
+        )
+        self.assertEqual(6, len(reports))
+        with self.__db_context.session() as session:
+            self.assertEqual(6, self.__count(session, Niche.id))
+            self.assertEqual(24, self.__count(session, ProductCard.id))
+            self.assertEqual(24, self.__count(session, ProductToNiche.product_id))
+            self.assertEqual(
+                6,
+                len(
+                    FillCheckpointService(session, "marketplace_fill").find_completed(
+                        FillUnitType.NICHE
+                    )
+                ),
+            )
+
+    def test_restart_skips_completed_niches(self):
+        failing_provider = FakeMarketplaceProvider(failing_call=4)
+        job = self.__create_job(failing_provider)
+        job.fill_structure()
+        with self.assertRaises(ProviderFetchError):
+            job.fill_products()
+        with self.__db_context.session() as session:
+            completed_ids = FillCheckpointService(
+                session, "marketplace_fill"
+            ).find_completed(FillUnitType.NICHE)
+            pending_names = (
+                session.execute(
+                    select(Niche.name)
+                    .where(Niche.id.not_in(completed_ids))
+                    .order_by(Niche.id)
+                )
+                .scalars()
+                .all()
+            )
+        self.assertEqual(failing_provider.requested_niches[3:], pending_names[:1])
+        provider = FakeMarketplaceProvider()
+        progress = self.__create_job(provider).run()
+        self.assertEqual(
+            MarketplaceFillProgress(
+                niches_total=6,
+                niches_done=3,
+                niches_skipped=3,
+                products_upserted=12,
+            ),
+            progress,
+        )
+        self.assertEqual(pending_names, provider.requested_niches)
+        with self.__db_context.session() as session:
+            self.assertEqual(6, self.__count(session, Niche.id))
+            self.assertEqual(24, self.__count(session, ProductCard.id))
+
+    def test_workers_fill_disjoint_niche_ranges(self):
+        job = self.__create_job(FakeMarketplaceProvider())
+        job.fill_structure()
+        ranges = job.split_niche_ranges(4)
+        self.assertEqual(3, len(ranges))
+        reports = [
+            self.__create_job(FakeMarketplaceProvider()).fill_products(niche_range)
+            for niche_range in ranges
+        ]
+        self.assertEqual([2, 2, 2], [report.niches_done for report in reports])
+        with self.__db_context.session() as session:
+            self.assertEqual(24, self.__count(session, ProductCard.id))
+
+    def __create_job(self, provider: FakeMarketplaceProvider) -> MarketplaceFillJob:
+        return MarketplaceFillJob(
+            self.__db_context.session,
+            self.__filler_factory,
+            create_category_service,
+            create_niche_service,
+            create_product_card_service,
+            provider,
+            self.__marketplace_id,
+            fetch_policy=FetchPolicy(
+                max_workers=1, retries=0, retry_delay=0, max_pending=1
+            ),
+        )
+
+    def __filler_factory(self, session: Session) -> FakeFiller:
+        return self.__filler
+
+    @staticmethod
+    def __count(session: Session, column) -> int:
+        return session.execute(select(func.count(column))).scalar_one()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ from jorm.market.infrastructure import Marketplace as MarketplaceEntity
 from sqlalchemy import select
 from jarvis_db.factories.mappers import create_marketplace_table_mapper
 
+from jarvis_db.factories.caches import create_metadata_cache
 from jarvis_db.factories.services import create_marketplace_service
 from jarvis_db.market.infrastructure.marketplace.marketplace_mappers import (
     MarketplaceTableToJormMapper,
@@ -79,6 +80,25 @@ class MarketplaceServiceTest(unittest.TestCase):
             actual_marketplaces = service.find_all()
             self.assertDictEqual(expected_marketplaces, actual_marketplaces)
 
+    def test_find_all_cached_until_create(self):
+        cache = create_metadata_cache()
+        with self.__db_context.session() as session:
+            service = create_marketplace_service(session, cache=cache)
+            self.assertDictEqual({}, service.find_all())
+            self.assertDictEqual({}, service.find_all())
+        with self.__db_context.session() as session, session.begin():
+            service = create_marketplace_service(session, cache=cache)
+            service.create(MarketplaceEntity("marketplace"))
+        with self.__db_context.session() as session:
+            service = create_marketplace_service(session, cache=cache)
+            actual_marketplaces = service.find_all()
+            self.assertEqual(
+                ["marketplace"],
+                [marketplace.name for marketplace in actual_marketplaces.values()],
+            )
+        self.assertEqual(2, cache.stats.misses)
+        self.assertEqual(1, cache.stats.hits)
+
     def test_fetch_all_atomic(self):
         with self.__db_context.session() as session, session.begin():
             seeder = AlchemySeeder(session)
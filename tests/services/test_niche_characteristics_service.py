@@ -1,12 +1,14 @@
 import unittest
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from jarvis_db.factories.services import create_niche_characteristics_service
 from jarvis_db.cache.niche_characteristics.niche_characteristics_mappers import (
     NicheCharacteristicsTableToJormMapper,
 )
 
-from jarvis_db.schemas import Niche, NicheCharacteristicsCalculationResult
+from jarvis_db.cache.staleness import CacheStatus
+from jarvis_db.schemas import Category, Niche, NicheCharacteristicsCalculationResult
 from tests.db_context import DbContext
 from tests.fixtures import AlchemySeeder
 from jorm.support.calculation import NicheCharacteristicsCalculateResult
@@ -93,6 +95,70 @@ class NicheCharacteristicsServiceTest(unittest.TestCase):
             actual = mapper.map(stats)
             self.assertEqual(expected, actual)
 
+    def test_upsert_many(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(4)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+
+        def create_result(i: int) -> NicheCharacteristicsCalculateResult:
+            return NicheCharacteristicsCalculateResult(
+                card_count=10 + i,
+                niche_profit=20 + i,
+                card_trade_count=30 + i,
+                mean_card_rating=4.5,
+                card_with_trades_count=50 + i,
+                daily_mean_niche_profit=60 + i,
+                daily_mean_trade_count=70 + i,
+                mean_traded_card_cost=80 + i,
+                month_mean_niche_profit_per_card=90 + i,
+                monopoly_percent=10.5,
+                maximum_profit_idx=110 + i,
+            )
+
+        with self.__db_context.session() as session, session.begin():
+            service = create_niche_characteristics_service(session)
+            service.upsert_many({niche_ids[0]: create_result(0)})
+        expected = {
+            niche_id: create_result(i + 1) for i, niche_id in enumerate(niche_ids)
+        }
+        with self.__db_context.session() as session, session.begin():
+            service = create_niche_characteristics_service(session)
+            service.upsert_many(expected, batch_size=2)
+        with self.__db_context.session() as session:
+            service = create_niche_characteristics_service(session)
+            actual = {
+                niche_id: service.find_by_niche_id(niche_id) for niche_id in niche_ids
+            }
+            self.assertDictEqual(expected, actual)
+
+    def test_find_by_niche_ids(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(4)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            expected = {
+                niche_id: NicheCharacteristicsCalculateResult(
+                    card_count=i,
+                    niche_profit=20,
+                    card_trade_count=30,
+                    mean_card_rating=4.5,
+                    card_with_trades_count=50,
+                    daily_mean_niche_profit=60,
+                    daily_mean_trade_count=70,
+                    mean_traded_card_cost=80,
+                    month_mean_niche_profit_per_card=90,
+                    monopoly_percent=10.5,
+                    maximum_profit_idx=110,
+                )
+                for i, niche_id in enumerate(niche_ids[:3])
+            }
+            create_niche_characteristics_service(session).upsert_many(expected)
+        with self.__db_context.session() as session:
+            service = create_niche_characteristics_service(session)
+            actual = service.find_by_niche_ids(niche_ids)
+            self.assertDictEqual(expected, actual)
+
     def test_find_by_niche_id(self):
         mapper = NicheCharacteristicsTableToJormMapper()
         with self.__db_context.session() as session, session.begin():
@@ -118,6 +184,72 @@ class NicheCharacteristicsServiceTest(unittest.TestCase):
             actual = service.find_by_niche_id(self.__niche_id)
             self.assertEqual(expected, actual)
 
+    def test_lookup_many(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(4)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            results = {
+                niche_id: NicheCharacteristicsCalculateResult(
+                    card_count=i,
+                    niche_profit=20,
+                    card_trade_count=30,
+                    mean_card_rating=4.5,
+                    card_with_trades_count=50,
+                    daily_mean_niche_profit=60,
+                    daily_mean_trade_count=70,
+                    mean_traded_card_cost=80,
+                    month_mean_niche_profit_per_card=90,
+                    monopoly_percent=10.5,
+                    maximum_profit_idx=110,
+                )
+                for i, niche_id in enumerate(niche_ids[:3])
+            }
+            session.execute(
+                update(Niche).values(update_date=datetime.utcnow() - timedelta(days=3))
+            )
+            create_niche_characteristics_service(session).upsert_many(results)
+            session.execute(
+                update(NicheCharacteristicsCalculationResult)
+                .where(NicheCharacteristicsCalculationResult.niche_id == niche_ids[1])
+                .values(date=datetime.utcnow() - timedelta(days=2))
+            )
+            session.execute(
+                update(Niche)
+                .where(Niche.id == niche_ids[2])
+                .values(update_date=datetime.utcnow() + timedelta(minutes=1))
+            )
+        with self.__db_context.session() as session:
+            service = create_niche_characteristics_service(session)
+            actual = service.lookup_many(niche_ids, max_age=timedelta(days=1))
+            self.assertEqual(
+                [
+                    CacheStatus.FRESH,
+                    CacheStatus.STALE,
+                    CacheStatus.STALE,
+                    CacheStatus.MISSING,
+                    CacheStatus.MISSING,
+                ],
+                [actual[niche_id].status for niche_id in niche_ids],
+            )
+            for niche_id, expected in results.items():
+                self.assertEqual(expected, actual[niche_id].value)
+            self.assertIsNone(actual[niche_ids[3]].value)
+            self.assertEqual(CacheStatus.FRESH, service.lookup(niche_ids[1]).status)
+            self.assertEqual(
+                [niche_ids[1], niche_ids[2], niche_ids[3], niche_ids[4]],
+                service.find_stale_niche_ids(
+                    session.execute(select(Category.marketplace_id)).scalar_one(),
+                    max_age=timedelta(days=1),
+                ),
+            )
+            self.assertEqual(
+                [niche_ids[2], niche_ids[3], niche_ids[4]],
+                service.find_stale_niche_ids(
+                    session.execute(select(Category.marketplace_id)).scalar_one()
+                ),
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
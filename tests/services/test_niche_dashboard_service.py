@@ -0,0 +1,94 @@
+import unittest
+
+from jorm.support.calculation import (
+    GreenTradeZoneCalculateResult,
+    NicheCharacteristicsCalculateResult,
+)
+from sqlalchemy import select
+from sqlalchemy.orm import noload
+
+from jarvis_db import schemas
+from jarvis_db.cache.niche_dashboard.niche_dashboard_service import NicheDashboard
+from jarvis_db.factories.mappers import create_niche_table_mapper
+from jarvis_db.factories.services import (
+    create_green_trade_zone_service,
+    create_niche_characteristics_service,
+    create_niche_dashboard_service,
+)
+from tests.db_context import DbContext
+from tests.fixtures import AlchemySeeder
+
+
+class NicheDashboardServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_categories(2)
+            seeder.seed_niches(6)
+
+    def test_find_all_in_category(self):
+        characteristics = NicheCharacteristicsCalculateResult(
+            card_count=10,
+            niche_profit=20,
+            card_trade_count=30,
+            mean_card_rating=4.5,
+            card_with_trades_count=50,
+            daily_mean_niche_profit=60,
+            daily_mean_trade_count=70,
+            mean_traded_card_cost=80,
+            month_mean_niche_profit_per_card=90,
+            monopoly_percent=10.5,
+            maximum_profit_idx=110,
+        )
+        green_trade_zone = GreenTradeZoneCalculateResult(
+            segments=[(1, 2), (3, 4)],
+            mean_segment_profit=[4, 5],
+            mean_product_profit=[1, 2],
+            segment_product_count=[7, 8],
+            segment_profits=[13, 14],
+            segment_product_with_trades_count=[10, 11],
+            best_mean_product_profit_idx=1,
+            best_mean_segment_profit_idx=2,
+            best_segment_idx=3,
+            best_segment_product_count_idx=4,
+            best_segment_product_with_trades_count_idx=5,
+            best_segment_profit_idx=6,
+        )
+        with self.__db_context.session() as session, session.begin():
+            category_id = session.execute(
+                select(schemas.Category.id).order_by(schemas.Category.id).limit(1)
+            ).scalar_one()
+            niches = (
+                session.execute(
+                    select(schemas.Niche)
+                    .where(schemas.Niche.category_id == category_id)
+                    .order_by(schemas.Niche.id)
+                    .options(noload(schemas.Niche.products))
+                )
+                .scalars()
+                .all()
+            )
+            create_niche_characteristics_service(session).upsert_many(
+                {niche.id: characteristics for niche in niches[:2]}
+            )
+            create_green_trade_zone_service(session).upsert_many(
+                {niche.id: green_trade_zone for niche in niches[1:]}
+            )
+            mapper = create_niche_table_mapper()
+            expected = {
+                niche.id: NicheDashboard(
+                    niche=mapper.map(niche),
+                    characteristics=characteristics if i < 2 else None,
+                    green_trade_zone=green_trade_zone if i > 0 else None,
+                )
+                for i, niche in enumerate(niches)
+            }
+        with self.__db_context.session() as session:
+            service = create_niche_dashboard_service(session)
+            actual = service.find_all_in_category(category_id)
+            self.assertDictEqual(expected, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from jorm.market.infrastructure import HandlerType, Niche as NicheEntity
+from sqlalchemy import select
+
+from jarvis_db.access.fill.niche_fill_pipeline import (
+    FileNicheFillCheckpoint,
+    InMemoryNicheFillCheckpoint,
+    NicheFillPipeline,
+    NicheFillProgress,
+)
+from jarvis_db.access.fill.provider_fetcher import FetchPolicy, ProviderFetchError
+from jarvis_db.factories.services import (
+    create_category_service,
+    create_niche_fill_pipeline,
+    create_niche_service,
+)
+from jarvis_db.schemas import Category, Marketplace, Niche
+from tests.db_context import DbContext
+
+
+class FakeNicheProvider:
+    def __init__(self, failing_category: str | None = None):
+        self.__failing_category = failing_category
+        self.__lock = threading.Lock()
+        self.requested_categories: list[str] = []
+        self.requested_niches: list[str] = []
+
+    def get_niches_names(self, category_name: str, niche_num: int = -1) -> list[str]:
+        with self.__lock:
+            self.requested_categories.append(category_name)
+        if category_name == self.__failing_category:
+            raise ConnectionError("provider is unavailable")
+        return [f"{category_name}_niche_{i}" for i in range(3)]
+
+    def get_niches(self, niches_names: list[str]) -> list[NicheEntity]:
+        with self.__lock:
+            self.requested_niches.extend(niches_names)
+        return [
+            NicheEntity(name, {handler: 0.1 for handler in HandlerType}, 0.05)
+            for name in niches_names
+        ]
+
+
+class NicheFillPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            marketplace = Marketplace(name="marketplace")
+            categories = [
+                Category(name=f"category_{i}", marketplace=marketplace)
+                for i in range(5)
+            ]
+            session.add_all(categories)
+            session.flush()
+            session.add(
+                Niche(
+                    name="category_0_niche_0",
+                    category_id=categories[0].id,
+                    marketplace_commission=0,
+                    partial_client_commission=0,
+                    client_commission=0,
+                    return_percent=0,
+                )
+            )
+            self.__marketplace_id = marketplace.id
+
+    def test_fills_niches_of_all_categories(self):
+        provider = FakeNicheProvider()
+        reports: list[NicheFillProgress] = []
+        pipeline = create_niche_fill_pipeline(
+            self.__db_context.session,
+            provider,
+            self.__marketplace_id,
+            progress_callback=reports.append,
+        )
+        progress = pipeline.run()
+        self.assertEqual(
+            NicheFillProgress(categories_total=5, categories_done=5, niches_created=14),
+            progress,
+        )
+        self.assertEqual(progress, reports[-1])
+        self.assertNotIn("category_0_niche_0", provider.requested_niches)
+        with self.__db_context.session() as session:
+            names = session.execute(select(Niche.name)).scalars().all()
+        self.assertEqual(
+            sorted(f"category_{i}_niche_{j}" for i in range(5) for j in range(3)),
+            sorted(names),
+        )
+
+    def test_resumes_from_checkpoint_after_failure(self):
+        checkpoint = InMemoryNicheFillCheckpoint()
+        failing_provider = FakeNicheProvider(failing_category="category_3")
+        with self.assertRaises(ProviderFetchError):
+            self.__create_pipeline(failing_provider, checkpoint).run()
+        with self.__db_context.session() as session:
+            completed_names = set(
+                session.execute(
+                    select(Category.name).where(Category.id.in_(checkpoint.load()))
+                ).scalars()
+            )
+        self.assertEqual({"category_0", "category_1", "category_2"}, completed_names)
+        provider = FakeNicheProvider()
+        progress = self.__create_pipeline(provider, checkpoint).run()
+        self.assertEqual(
+            NicheFillProgress(
+                categories_total=5,
+                categories_done=2,
+                categories_skipped=3,
+                niches_created=6,
+            ),
+            progress,
+        )
+        self.assertEqual(["category_3", "category_4"], provider.requested_categories)
+        with self.__db_context.session() as session:
+            self.assertEqual(15, len(session.execute(select(Niche.id)).scalars().all()))
+
+    def test_file_checkpoint_keeps_completed_categories(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "checkpoint.jsonl"
+            FileNicheFillCheckpoint(path).save([3, 1])
+            FileNicheFillCheckpoint(path).save([2])
+            self.assertEqual({1, 2, 3}, FileNicheFillCheckpoint(path).load())
+
+    def __create_pipeline(
+        self, provider: FakeNicheProvider, checkpoint: InMemoryNicheFillCheckpoint
+    ) -> NicheFillPipeline:
+        return NicheFillPipeline(
+            self.__db_context.session,
+            create_category_service,
+            create_niche_service,
+            provider,
+            self.__marketplace_id,
+            checkpoint=checkpoint,
+            fetch_policy=FetchPolicy(
+                max_workers=1, retries=0, retry_delay=0, max_pending=1
+            ),
+            categories_per_commit=1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
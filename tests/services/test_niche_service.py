@@ -1,17 +1,22 @@
 import unittest
+from datetime import datetime, timedelta
 from typing import Iterable
 
 from jorm.market.infrastructure import HandlerType
 from jorm.market.infrastructure import Niche as NicheEntity
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import contains_eager
 
 from jarvis_db import schemas
 from jarvis_db.factories.mappers import create_niche_table_mapper
-from jarvis_db.factories.services import create_niche_service
+from jarvis_db.factories.services import create_niche_flat_loader, create_niche_service
+from jarvis_db.market.infrastructure.niche.niche_service import NicheLoadStrategy
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
 from jarvis_db.schemas import Leftover, Niche, ProductCard, ProductHistory
 from tests.db_context import DbContext
-from tests.fixtures import AlchemySeeder
+from tests.fixtures import AlchemySeeder, seed_niche
 from tests.helpers import sort_product
 
 
@@ -26,6 +31,76 @@ class NicheServiceTest(unittest.TestCase):
             self.__category_id = category.id
             self.__marketplace_id = category.marketplace_id
 
+    def test_ensure_all_creates_only_missing_niches(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_categories(1)
+            session.flush()
+            other_category_id = session.execute(
+                select(schemas.Category.id).where(
+                    schemas.Category.id != self.__category_id
+                )
+            ).scalar_one()
+            niche = Niche(
+                name="Existing",
+                category_id=self.__category_id,
+                marketplace_commission=0,
+                partial_client_commission=0,
+                client_commission=0,
+                return_percent=0,
+            )
+            session.add(niche)
+            session.flush()
+            existing_id = niche.id
+        with self.__db_context.session() as session, session.begin():
+            service = create_niche_service(session)
+            niche_ids = service.ensure_all(
+                (category_id, NicheEntity(name, {}, 0.1))
+                for category_id, name in (
+                    (self.__category_id, "existing"),
+                    (self.__category_id, "new"),
+                    (other_category_id, "existing"),
+                )
+            )
+        with self.__db_context.session() as session:
+            niches = session.execute(select(Niche)).scalars().all()
+            key_to_id = {(niche.category_id, niche.name): niche.id for niche in niches}
+            self.assertEqual(3, len(niches))
+        self.assertEqual(
+            {
+                (self.__category_id, "existing"): existing_id,
+                (self.__category_id, "new"): key_to_id[(self.__category_id, "new")],
+                (other_category_id, "existing"): key_to_id[
+                    (other_category_id, "existing")
+                ],
+            },
+            niche_ids,
+        )
+
+    def test_ensure_all_matches_find_by_name(self):
+        with self.__db_context.session() as session, session.begin():
+            session.add_all(
+                Niche(
+                    name=name,
+                    category_id=self.__category_id,
+                    marketplace_commission=0,
+                    partial_client_commission=0,
+                    client_commission=0,
+                    return_percent=0,
+                )
+                for name in ("Яблоки", "Pears")
+            )
+        names = ("Яблоки", "PEARS", "яблоки", "ЯБЛОКИ")
+        with self.__db_context.session() as session, session.begin():
+            service = create_niche_service(session)
+            niche_ids = service.ensure_all(
+                (self.__category_id, NicheEntity(name, {}, 0.1)) for name in names
+            )
+            for name in names:
+                niche_tuple = service.find_by_name(name, self.__category_id)
+                assert niche_tuple is not None
+                self.assertEqual(niche_tuple[1], niche_ids[(self.__category_id, name)])
+
     def test_create(self):
         niche_entity = NicheEntity(
             "niche",
@@ -124,6 +199,29 @@ class NicheServiceTest(unittest.TestCase):
             self.assertEqual(niche_name, niche_entity.name)
             self.assertEqual(0, len(niche_entity.products))
 
+    def test_find_by_name_ignores_case(self):
+        niche_name = "Qwerty"
+        with self.__db_context.session() as session, session.begin():
+            session.add(
+                Niche(
+                    category_id=self.__category_id,
+                    name=niche_name,
+                    marketplace_commission=0.01,
+                    partial_client_commission=0.02,
+                    client_commission=0.03,
+                    return_percent=0.04,
+                )
+            )
+        with self.__db_context.session() as session:
+            service = create_niche_service(session)
+            result = service.find_by_name(niche_name.upper(), self.__category_id)
+            assert result is not None
+            niche_entity, _ = result
+            self.assertEqual(niche_name, niche_entity.name)
+            self.assertTrue(
+                service.exists_with_name(niche_name.lower(), self.__category_id)
+            )
+
     def test_find_by_id(self):
         mapper = create_niche_table_mapper()
         niche_id = 100
@@ -213,12 +311,112 @@ class NicheServiceTest(unittest.TestCase):
                 .unique()
                 .scalar_one()
             )
+            for product in expected_niche.products:
+                sort_product(product)
         with self.__db_context.session() as session:
             service = create_niche_service(session)
             actual_niche = service.fetch_by_id_atomic(niche_id)
             assert actual_niche is not None
+            for product in actual_niche.products:
+                sort_product(product)
             self.assertEqual(expected_niche, actual_niche)
 
+    def test_fetch_by_id_atomic_with_every_load_strategy(self):
+        niche_id = 100
+        with self.__db_context.session() as session, session.begin():
+            session.add(
+                Niche(
+                    id=niche_id,
+                    category_id=self.__category_id,
+                    name="niche_name",
+                    marketplace_commission=0.01,
+                    partial_client_commission=0.02,
+                    client_commission=0.03,
+                    return_percent=0.04,
+                )
+            )
+            session.flush()
+            seeder = AlchemySeeder(session)
+            seeder.seed_products(5)
+            seeder.seed_product_histories(10)
+            seeder.seed_leftovers(50)
+        with self.__db_context.session() as session:
+            expected_niche = create_niche_service(session).fetch_by_id_atomic(niche_id)
+            assert expected_niche is not None
+            for product in expected_niche.products:
+                sort_product(product)
+        for strategy in NicheLoadStrategy:
+            with self.subTest(
+                strategy=strategy
+            ), self.__db_context.session() as session:
+                service = create_niche_service(session, load_strategy=strategy)
+                actual_niche = service.fetch_by_id_atomic(niche_id)
+                assert actual_niche is not None
+                for product in actual_niche.products:
+                    sort_product(product)
+                self.assertEqual(expected_niche, actual_niche)
+
+    def test_fetch_by_id_atomic_in_window(self):
+        with self.__db_context.session() as session, session.begin():
+            niche_id = seed_niche(session, 4, 10, 2)
+        window = HistoryWindow(since=datetime(2023, 1, 3), until=datetime(2023, 1, 8))
+        with self.__db_context.session() as session:
+            expected_niche = create_niche_flat_loader(session).fetch_by_id(
+                niche_id, window
+            )
+            assert expected_niche is not None
+            expected_niche.products.sort(key=lambda product: product.global_id)
+            for product in expected_niche.products:
+                sort_product(product)
+                self.assertEqual(
+                    [datetime(2023, 1, day) for day in range(3, 8)],
+                    [unit.unit_date for unit in product.history.get_history()],
+                )
+        for strategy in NicheLoadStrategy:
+            with self.subTest(
+                strategy=strategy
+            ), self.__db_context.session() as session:
+                service = create_niche_service(session, load_strategy=strategy)
+                actual_niche = service.fetch_by_id_atomic(niche_id, window)
+                assert actual_niche is not None
+                actual_niche.products.sort(key=lambda product: product.global_id)
+                for product in actual_niche.products:
+                    sort_product(product)
+                self.assertEqual(expected_niche, actual_niche)
+
+    def test_find_by_name_and_category_atomic_in_window(self):
+        with self.__db_context.session() as session, session.begin():
+            niche_id = seed_niche(session, 4, 10, 2)
+            niche = session.execute(
+                select(Niche).where(Niche.id == niche_id)
+            ).scalar_one()
+            niche_name, category_id = niche.name, niche.category_id
+        window = HistoryWindow(since=datetime(2023, 1, 3), until=datetime(2023, 1, 8))
+        with self.__db_context.session() as session:
+            expected_niche = create_niche_flat_loader(session).fetch_by_id(
+                niche_id, window
+            )
+            assert expected_niche is not None
+            expected_niche.products.sort(key=lambda product: product.global_id)
+            for product in expected_niche.products:
+                sort_product(product)
+        for strategy in NicheLoadStrategy:
+            with self.subTest(
+                strategy=strategy
+            ), self.__db_context.session() as session:
+                service = create_niche_service(session, load_strategy=strategy)
+                niche_tuple = service.find_by_name_atomic(
+                    niche_name, category_id, window
+                )
+                assert niche_tuple is not None
+                niches = service.fetch_all_in_category_atomic(category_id, window)
+                self.assertEqual([niche_id], list(niches))
+                for actual_niche in (niche_tuple[0], niches[niche_id]):
+                    actual_niche.products.sort(key=lambda product: product.global_id)
+                    for product in actual_niche.products:
+                        sort_product(product)
+                    self.assertEqual(expected_niche, actual_niche)
+
     def test_find_all_in_category(self):
         with self.__db_context.session() as session, session.begin():
             seeder = AlchemySeeder(session)
@@ -298,6 +496,22 @@ class NicheServiceTest(unittest.TestCase):
             actual_niches = service.find_all_in_marketplace(self.__marketplace_id)
             self.assertDictEqual(expected_niches, actual_niches)
 
+    def test_iter_all_in_marketplace(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(30)
+            seeder.seed_products(200)
+        with self.__db_context.session() as session:
+            service = create_niche_service(session)
+            expected = service.find_all_in_marketplace(self.__marketplace_id)
+            actual = list(
+                service.iter_all_in_marketplace(
+                    self.__marketplace_id, page_size=4, yield_per=2
+                )
+            )
+            self.assertEqual(sorted(expected), [niche_id for niche_id, _ in actual])
+            self.assertDictEqual(expected, dict(actual))
+
     def test_exists_with_name_returns_true(self):
         niche_name = "qwerty"
         with self.__db_context.session() as session, session.begin():
@@ -395,6 +609,23 @@ class NicheServiceTest(unittest.TestCase):
             self.assertEqual(int(client_commission * 100), actual.client_commission)
             self.assertEqual(int(return_percent * 100), actual.return_percent)
 
+    def test_mark_updated(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(2)
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+            update_date = datetime.utcnow() - timedelta(days=1)
+            session.execute(update(Niche).values(update_date=update_date))
+        with self.__db_context.session() as session, session.begin():
+            service = create_niche_service(session)
+            service.mark_updated(niche_ids[0])
+        with self.__db_context.session() as session:
+            update_dates = dict(
+                session.execute(select(Niche.id, Niche.update_date)).tuples().all()
+            )
+            self.assertGreater(update_dates[niche_ids[0]], update_date)
+            self.assertEqual(update_date, update_dates[niche_ids[1]])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,29 @@
 import unittest
+from datetime import datetime
 
-from jorm.market.items import Product
-from sqlalchemy import select
+from jorm.market.items import Product, ProductHistory, ProductHistoryUnit, StorageDict
+from jorm.support.types import SpecifiedLeftover
+from sqlalchemy import func, inspect, select, text
 
 from jarvis_db.factories.mappers import create_product_table_mapper
 from jarvis_db.factories.services import create_product_card_service
-from jarvis_db.schemas import Niche, ProductCard, ProductToNiche
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
+from jarvis_db.schemas import (
+    Account,
+    Category,
+    Leftover,
+    Marketplace,
+    Niche,
+    ProductCard,
+    ProductToNiche,
+    UserToProduct,
+    Warehouse,
+)
+from jarvis_db.schemas import ProductHistory as ProductHistoryTable
 from tests.db_context import DbContext
-from tests.fixtures import AlchemySeeder
+from tests.fixtures import AlchemySeeder, create_users, seed_niche
 from tests.helpers import sort_product
 
 
@@ -78,6 +94,328 @@ class ProductCardServiceTest(unittest.TestCase):
                 ]
                 self.assertEqual(expected, actual)
 
+    def test_create_many_in_batches(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_warehouses(2)
+            warehouse_gids = (
+                session.execute(
+                    select(Warehouse.global_id)
+                    .join(Warehouse.marketplace)
+                    .join(Marketplace.categories)
+                    .join(Category.niches)
+                    .distinct()
+                )
+                .scalars()
+                .all()
+            )
+            niche_ids = session.execute(select(Niche.id)).scalars().all()
+        products_count = 25
+        units_per_product = 3
+        expected_products = {
+            (200 + i): Product(
+                f"product_{i}",
+                100 + 10 * i,
+                200 + i,
+                1.0 + i % 5,
+                f"brand_{i}",
+                f"seller_{i}",
+                [],
+                history=ProductHistory(
+                    [
+                        ProductHistoryUnit(
+                            cost=10 * i + j,
+                            unit_date=datetime(2023, 1, j + 1),
+                            leftover=StorageDict(
+                                {
+                                    gid: [SpecifiedLeftover("s", i + j)]
+                                    for gid in warehouse_gids
+                                }
+                            ),
+                        )
+                        for j in range(units_per_product)
+                    ]
+                ),
+            )
+            for i in range(products_count)
+        }
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            service.create_products(
+                (product for product in expected_products.values()),
+                niche_ids,
+                batch_size=7,
+            )
+        with self.__db_context.session() as session:
+            service = create_product_card_service(session)
+            found_ids = session.execute(select(ProductCard.id)).scalars().all()
+            self.assertEqual(products_count, len(found_ids))
+            self.assertEqual(
+                products_count * len(niche_ids),
+                len(session.execute(select(ProductToNiche)).scalars().all()),
+            )
+            for product_id in found_ids:
+                actual = service.find_by_id_atomic(product_id)
+                assert actual is not None
+                expected = expected_products[actual.global_id]
+                self.assertEqual(len(niche_ids), len(actual.category_niche_list))
+                expected.category_niche_list = actual.category_niche_list
+                self.assertEqual(expected, actual)
+
+    def test_upsert_many(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_warehouses(1)
+            warehouse_gid = session.execute(
+                select(Warehouse.global_id)
+                .join(Warehouse.marketplace)
+                .join(Marketplace.categories)
+                .join(Category.niches)
+                .distinct()
+            ).scalar_one()
+            first_niche_id, second_niche_id = (
+                session.execute(select(Niche.id).order_by(Niche.id).limit(2))
+                .scalars()
+                .all()
+            )
+
+        def create_product(i: int, name: str, days: range) -> Product:
+            return Product(
+                name,
+                100 + i,
+                300 + i,
+                1.0,
+                "brand",
+                "seller",
+                [],
+                history=ProductHistory(
+                    [
+                        ProductHistoryUnit(
+                            cost=day,
+                            unit_date=datetime(2023, 1, day),
+                            leftover=StorageDict(
+                                {warehouse_gid: [SpecifiedLeftover("s", day)]}
+                            ),
+                        )
+                        for day in days
+                    ]
+                ),
+            )
+
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            service.upsert_products(
+                [create_product(i, f"old_{i}", range(1, 3)) for i in range(3)],
+                [first_niche_id],
+            )
+        expected_products = [
+            create_product(i, f"new_{i}", range(1, 5)) for i in range(5)
+        ]
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            product_ids = service.upsert_products(
+                expected_products, [first_niche_id, second_niche_id], batch_size=2
+            )
+            service.upsert_products(
+                expected_products, [first_niche_id, second_niche_id]
+            )
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                5, len(session.execute(select(ProductCard.id)).scalars().all())
+            )
+            self.assertEqual(
+                10, len(session.execute(select(ProductToNiche)).scalars().all())
+            )
+            service = create_product_card_service(session)
+            for expected in expected_products:
+                actual = service.find_by_id_atomic(product_ids[expected.global_id])
+                assert actual is not None
+                self.assertEqual(2, len(actual.category_niche_list))
+                expected.category_niche_list = actual.category_niche_list
+                self.assertEqual(expected, actual)
+
+    def test_upsert_uses_given_warehouse_ids(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_warehouses(1)
+            warehouse_id = session.execute(select(Warehouse.id)).scalar_one()
+            niche_id = session.execute(select(func.min(Niche.id))).scalar_one()
+        unknown_gid = 999_999
+        product = Product(
+            "product",
+            100,
+            500,
+            1.0,
+            "brand",
+            "seller",
+            history=ProductHistory(
+                [
+                    ProductHistoryUnit(
+                        cost=100,
+                        unit_date=datetime(2023, 1, 1),
+                        leftover=StorageDict(
+                            {unknown_gid: [SpecifiedLeftover("s", 10)]}
+                        ),
+                    )
+                ]
+            ),
+        )
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            with self.assertRaises(Exception):
+                with session.begin_nested():
+                    service.upsert_products([product], [niche_id])
+            service.upsert_products(
+                [product], [niche_id], warehouse_ids={unknown_gid: warehouse_id}
+            )
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                [warehouse_id],
+                session.execute(select(Leftover.warehouse_id)).scalars().all(),
+            )
+
+    def test_upsert_scopes_global_id_to_marketplace(self):
+        with self.__db_context.session() as session, session.begin():
+            first_niche_id = session.execute(select(func.min(Niche.id))).scalar_one()
+            marketplace = Marketplace(name="other_marketplace")
+            niche = Niche(
+                name="other_niche",
+                category=Category(name="other_category", marketplace=marketplace),
+                marketplace_commission=0,
+                partial_client_commission=0,
+                client_commission=0,
+                return_percent=0,
+            )
+            session.add(niche)
+            session.flush()
+            second_niche_id = niche.id
+        product = Product("product", 100, 500, 1.0, "brand", "seller")
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            first_ids = service.upsert_products([product], [first_niche_id])
+            second_ids = service.upsert_products([product], [second_niche_id])
+            self.assertNotEqual(first_ids[500], second_ids[500])
+            self.assertEqual(
+                first_ids, service.upsert_products([product], [first_niche_id])
+            )
+            with self.assertRaises(Exception):
+                service.upsert_products([product], [first_niche_id, second_niche_id])
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                2,
+                len(
+                    session.execute(
+                        select(ProductCard.id).where(ProductCard.global_id == 500)
+                    )
+                    .scalars()
+                    .all()
+                ),
+            )
+
+    def test_create_reuses_existing_card(self):
+        product = Product("product", 100, 500, 1.0, "brand", "seller")
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            niche_id = session.execute(select(func.min(Niche.id))).scalar_one()
+            self.assertEqual(
+                service.create_product(product, [niche_id]),
+                service.create_product(product, [niche_id]),
+            )
+            self.assertEqual(
+                service.create_product(product, []),
+                service.create_product(product, []),
+            )
+            service.create_products([product], [niche_id])
+            self.assertEqual(
+                2, session.execute(select(func.count(ProductCard.id))).scalar_one()
+            )
+
+    def test_migrate_marketplace_scope(self):
+        with self.__db_context.session() as session, session.begin():
+            for statement in (
+                "DROP TABLE users_to_products",
+                "CREATE TABLE users_to_products ("
+                "user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE, "
+                "product_id INTEGER NOT NULL UNIQUE "
+                "REFERENCES product_cards (id) ON DELETE CASCADE, "
+                "PRIMARY KEY (user_id, product_id))",
+                "DROP TABLE product_cards",
+                "CREATE TABLE product_cards ("
+                "id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                "global_id INTEGER NOT NULL, cost INTEGER NOT NULL, "
+                "rating INTEGER NOT NULL, brand VARCHAR(255) NOT NULL, "
+                "seller VARCHAR(255) NOT NULL)",
+            ):
+                session.execute(text(statement))
+            niche_id = session.execute(select(func.min(Niche.id))).scalar_one()
+            marketplace_id = session.execute(select(Marketplace.id)).scalar_one()
+            users = create_users(
+                [
+                    Account(phone=f"phone_{i}", email=f"{i}@mail.org", password="")
+                    for i in range(2)
+                ]
+            )
+            session.add_all(users)
+            session.flush()
+            for product_id, global_id in ((1, 500), (2, 500), (3, 500), (4, 500)):
+                session.execute(
+                    text(
+                        "INSERT INTO product_cards "
+                        "(id, name, global_id, cost, rating, brand, seller) "
+                        f"VALUES ({product_id}, 'product', {global_id}, 1, 1, '', '')"
+                    )
+                )
+            session.add_all(
+                [
+                    ProductToNiche(product_id=1, niche_id=niche_id),
+                    ProductToNiche(product_id=2, niche_id=niche_id),
+                    UserToProduct(user_id=users[0].id, product_id=1),
+                    UserToProduct(user_id=users[1].id, product_id=2),
+                    ProductHistoryTable(
+                        cost=1, date=datetime(2023, 1, 1), product_id=2
+                    ),
+                ]
+            )
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            self.assertEqual(2, service.migrate_marketplace_scope())
+            self.assertEqual(0, service.migrate_marketplace_scope())
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                [(1, marketplace_id), (3, None)],
+                session.execute(
+                    select(ProductCard.id, ProductCard.marketplace_id).order_by(
+                        ProductCard.id
+                    )
+                ).all(),
+            )
+            self.assertEqual(
+                [(1, niche_id)],
+                session.execute(
+                    select(ProductToNiche.product_id, ProductToNiche.niche_id)
+                ).all(),
+            )
+            self.assertEqual(
+                [1, 1],
+                session.execute(select(UserToProduct.product_id)).scalars().all(),
+            )
+            self.assertEqual(
+                [1],
+                session.execute(select(ProductHistoryTable.product_id)).scalars().all(),
+            )
+            self.assertTrue(
+                {
+                    "uq_product_cards_marketplace_id_global_id",
+                    "uq_product_cards_global_id_without_marketplace",
+                }
+                <= {
+                    index["name"]
+                    for index in inspect(session.connection()).get_indexes(
+                        "product_cards"
+                    )
+                }
+            )
+
     def test_find_by_id(self):
         product_id = 100
         mapper = create_product_table_mapper()
@@ -154,6 +492,25 @@ class ProductCardServiceTest(unittest.TestCase):
             sort_product(actual)
             self.assertEqual(expected, actual)
 
+    def test_find_by_id_atomic_in_window(self):
+        with self.__db_context.session() as session, session.begin():
+            niche_id = seed_niche(session, 2, 10, 2)
+            product_id = session.execute(
+                select(ProductToNiche.product_id)
+                .where(ProductToNiche.niche_id == niche_id)
+                .limit(1)
+            ).scalar_one()
+        with self.__db_context.session() as session:
+            service = create_product_card_service(session)
+            actual = service.find_by_id_atomic(product_id, HistoryWindow(last_units=3))
+            assert actual is not None
+            self.assertEqual(
+                [datetime(2023, 1, 8), datetime(2023, 1, 9), datetime(2023, 1, 10)],
+                sorted(unit.unit_date for unit in actual.history.get_history()),
+            )
+            for unit in actual.history.get_history():
+                self.assertEqual(2, sum(map(len, unit.leftover.values())))
+
     def test_find_by_global_id(self):
         mapper = create_product_table_mapper()
         global_id = 200
@@ -216,6 +573,42 @@ class ProductCardServiceTest(unittest.TestCase):
             actual_products = service.find_all_in_niche(niche_id)
             self.assertDictEqual(expected_products, actual_products)
 
+    def test_iter_all_in_niche(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(2)
+            seeder.seed_products(100)
+            niche_id = session.execute(
+                select(Niche.id).order_by(Niche.id).limit(1)
+            ).scalar_one()
+        with self.__db_context.session() as session:
+            service = create_product_card_service(session)
+            expected = service.find_all_in_niche(niche_id)
+            actual = list(service.iter_all_in_niche(niche_id, page_size=8, yield_per=3))
+            self.assertEqual(sorted(expected), [product_id for product_id, _ in actual])
+            self.assertDictEqual(expected, dict(actual))
+
+    def test_find_ids_in_niche(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_niches(2)
+            seeder.seed_products(50)
+            niche_id = session.execute(
+                select(Niche.id).order_by(Niche.id).limit(1)
+            ).scalar_one()
+            expected = {
+                product.global_id: product.id
+                for product in session.execute(
+                    select(ProductCard)
+                    .join(ProductToNiche)
+                    .where(ProductToNiche.niche_id == niche_id)
+                ).scalars()
+            }
+        with self.__db_context.session() as session:
+            service = create_product_card_service(session)
+            actual = service.find_ids_in_niche(niche_id)
+            self.assertDictEqual(expected, actual)
+
     def test_filter_existing_ids(self):
         existing_ids = [i for i in range(100, 111)]
         with self.__db_context.session() as session, session.begin():
@@ -275,6 +668,40 @@ class ProductCardServiceTest(unittest.TestCase):
             actual = mapper.map(product)
             self.assertEqual(expected, actual)
 
+    def test_update_all(self):
+        with self.__db_context.session() as session, session.begin():
+            session.add_all(
+                [
+                    ProductCard(
+                        id=100 + i,
+                        name=f"product_{i}",
+                        global_id=20 + i,
+                        cost=10,
+                        rating=5.0,
+                        brand="brand",
+                        seller="seller",
+                    )
+                    for i in range(5)
+                ]
+            )
+        expected = {
+            100
+            + i: Product(
+                f"new_product_{i}", 100 + i, 20 + i, 8.0, "new_brand", "new_seller", []
+            )
+            for i in range(5)
+        }
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_card_service(session)
+            service.update_all(expected.items(), batch_size=2)
+        with self.__db_context.session() as session:
+            mapper = create_product_table_mapper()
+            actual = {
+                product.id: mapper.map(product)
+                for product in session.execute(select(ProductCard)).scalars()
+            }
+            self.assertDictEqual(expected, actual)
+
     def test_add_niche_to_product(self):
         with self.__db_context.session() as session, session.begin():
             product_id = 1
@@ -1,5 +1,5 @@
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from jorm.market.items import ProductHistory, ProductHistoryUnit, StorageDict
 from jorm.support.types import SpecifiedLeftover
@@ -7,7 +7,13 @@ from sqlalchemy import select
 
 from jarvis_db import schemas
 from jarvis_db.factories.mappers import create_product_history_mapper
-from jarvis_db.factories.services import create_product_history_service
+from jarvis_db.factories.services import (
+    create_product_history_service,
+    create_warehouse_registry,
+)
+from jarvis_db.market.items.product_card_history.history_window import (
+    HistoryWindow,
+)
 from jarvis_db.schemas import (
     Leftover,
     ProductCard,
@@ -71,6 +77,91 @@ class ProductHistoryServiceTest(unittest.TestCase):
             actual = ProductHistory((mapper.map(unit) for unit in histories))
             self.assertEqual(expected, actual)
 
+    def test_create_all(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_products(2)
+            product_ids = (
+                session.execute(
+                    select(ProductCard.id)
+                    .join(ProductCard.niches)
+                    .order_by(ProductCard.id)
+                    .distinct()
+                )
+                .scalars()
+                .all()
+            )
+        units_to_add = 10
+        leftovers_per_unit = 5
+        expected = {
+            product_id: ProductHistory(
+                [
+                    ProductHistoryUnit(
+                        cost=10 * i + product_id,
+                        unit_date=datetime(2020, 2, i + 1),
+                        leftover=StorageDict(
+                            {
+                                self.__warehouse_gid: [
+                                    SpecifiedLeftover(f"size_{j}", j)
+                                    for j in range(leftovers_per_unit)
+                                ]
+                            }
+                        ),
+                    )
+                    for i in range(units_to_add)
+                ]
+            )
+            for product_id in product_ids
+        }
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_history_service(session)
+            service.create_all(expected.items())
+        with self.__db_context.session() as session:
+            service = create_product_history_service(session)
+            for product_id, expected_history in expected.items():
+                actual = service.find_product_history(product_id)
+                self.assertEqual(expected_history, actual)
+
+    def test_create_with_warehouse_registry(self):
+        expected = ProductHistory(
+            [
+                ProductHistoryUnit(
+                    cost=10 * i,
+                    unit_date=datetime(2020, 2, i + 1),
+                    leftover=StorageDict(
+                        {self.__warehouse_gid: [SpecifiedLeftover("size", i)]}
+                    ),
+                )
+                for i in range(5)
+            ]
+        )
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_history_service(
+                session, create_warehouse_registry(session)
+            )
+            service.create(expected, self.__product_id)
+        with self.__db_context.session() as session:
+            service = create_product_history_service(session)
+            actual = service.find_product_history(self.__product_id)
+            self.assertEqual(expected, actual)
+
+    def test_create_with_unknown_warehouse(self):
+        history = ProductHistory(
+            [
+                ProductHistoryUnit(
+                    cost=10,
+                    unit_date=datetime(2020, 2, 12),
+                    leftover=StorageDict(
+                        {self.__warehouse_gid + 1000: [SpecifiedLeftover("xl", 5)]}
+                    ),
+                )
+            ]
+        )
+        with self.__db_context.session() as session, session.begin():
+            service = create_product_history_service(session)
+            with self.assertRaises(Exception):
+                service.create(history, self.__product_id)
+
     def test_find_history(self):
         mapper = create_product_history_mapper()
         with self.__db_context.session() as session, session.begin():
@@ -98,6 +189,38 @@ class ProductHistoryServiceTest(unittest.TestCase):
             actual = service.find_product_history(self.__product_id)
             self.assertEqual(expected, actual)
 
+    def test_find_history_in_window(self):
+        with self.__db_context.session() as session, session.begin():
+            session.add_all(
+                schemas.ProductHistory(
+                    cost=200 + day,
+                    date=datetime(2022, 2, 1) + timedelta(days=day),
+                    product_id=self.__product_id,
+                    leftovers=[
+                        Leftover(
+                            type="xl", quantity=10, warehouse_id=self.__warehouse_id
+                        )
+                    ],
+                )
+                for day in range(10)
+            )
+        windows = {
+            HistoryWindow(since=datetime(2022, 2, 8)): [7, 8, 9],
+            HistoryWindow(until=datetime(2022, 2, 3)): [0, 1],
+            HistoryWindow(last_units=4): [6, 7, 8, 9],
+            HistoryWindow(
+                since=datetime(2022, 2, 2), until=datetime(2022, 2, 6), last_units=2
+            ): [3, 4],
+        }
+        for window, expected_days in windows.items():
+            with self.subTest(window=window), self.__db_context.session() as session:
+                service = create_product_history_service(session)
+                actual = service.find_product_history(self.__product_id, window)
+                self.assertEqual(
+                    [200 + day for day in expected_days],
+                    sorted(unit.cost for unit in actual.get_history()),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
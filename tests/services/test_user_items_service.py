@@ -7,9 +7,16 @@ from jarvis_db.factories.services import create_user_items_service
 from jarvis_db.market.infrastructure.warehouse.warehouse_mappers import (
     WarehouseTableToJormMapper,
 )
-from jarvis_db.schemas import Marketplace, ProductCard, User, Warehouse
+from jarvis_db.schemas import (
+    Account,
+    Marketplace,
+    ProductCard,
+    User,
+    UserToProduct,
+    Warehouse,
+)
 from tests.db_context import DbContext
-from tests.fixtures import AlchemySeeder
+from tests.fixtures import AlchemySeeder, create_users
 from tests.helpers import sort_product
 
 
@@ -37,6 +44,54 @@ class UserItemServiceTest(unittest.TestCase):
             product = user.products[0]
             self.assertEqual(product_id, product.id)
 
+    def test_appends_products_skipping_existing_links(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_products(3)
+            product_ids = session.execute(select(ProductCard.id)).scalars().all()
+        with self.__db_context.session() as session, session.begin():
+            service = create_user_items_service(session)
+            service.append_product(self.__user_id, product_ids[0])
+            service.append_products(self.__user_id, product_ids)
+        with self.__db_context.session() as session:
+            user_product_ids = (
+                session.execute(
+                    select(UserToProduct.product_id).where(
+                        UserToProduct.user_id == self.__user_id
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            self.assertEqual(sorted(product_ids), sorted(user_product_ids))
+
+    def test_append_products_shares_product_between_users(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_products(1)
+            other_user = create_users(
+                [Account(phone="other_phone", email="other@mail.org", password="")]
+            )[0]
+            session.add(other_user)
+            session.flush()
+            product_id = session.execute(select(ProductCard.id)).scalar_one()
+            session.add(UserToProduct(user_id=other_user.id, product_id=product_id))
+            other_user_id = other_user.id
+        with self.__db_context.session() as session, session.begin():
+            service = create_user_items_service(session)
+            service.append_products(self.__user_id, [product_id])
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                sorted([self.__user_id, other_user_id]),
+                sorted(
+                    session.execute(
+                        select(UserToProduct.user_id).where(
+                            UserToProduct.product_id == product_id
+                        )
+                    ).scalars()
+                ),
+            )
+
     def test_remove_product(self):
         with self.__db_context.session() as session, session.begin():
             seeder = AlchemySeeder(session)
@@ -149,6 +149,17 @@ class UserServiceTest(unittest.TestCase):
             actual = service.find_all()
             self.assertDictEqual(expected, actual)
 
+    def test_iter_all(self):
+        with self.__db_context.session() as session, session.begin():
+            seeder = AlchemySeeder(session)
+            seeder.seed_users(20)
+        with self.__db_context.session() as session:
+            service = create_user_service(session)
+            expected = service.find_all()
+            actual = list(service.iter_all(page_size=7, yield_per=3))
+            self.assertEqual(sorted(expected), [user_id for user_id, _ in actual])
+            self.assertDictEqual(expected, dict(actual))
+
     def test_append_api_key(self):
         user_id = 100
         with self.__db_context.session() as session, session.begin():
@@ -0,0 +1,160 @@
+import unittest
+
+from jorm.market.infrastructure import Address as AddressEntity
+from jorm.market.infrastructure import HandlerType
+from jorm.market.infrastructure import Warehouse as WarehouseEntity
+from sqlalchemy import select
+
+from jarvis_db.factories.services import (
+    create_warehouse_registry,
+    create_warehouse_service,
+)
+from jarvis_db.market.infrastructure.warehouse.warehouse_mappers import (
+    WarehouseTableToJormMapper,
+)
+from jarvis_db.schemas import Address, Marketplace, Warehouse
+from tests.db_context import DbContext
+
+
+class WarehouseRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            marketplace = Marketplace(name="marketplace_1")
+            session.add(marketplace)
+            session.flush()
+            self.__marketplace_id = marketplace.id
+            warehouses = [
+                WarehouseRegistryTest.__create_warehouse(self.__marketplace_id, 100 + i)
+                for i in range(3)
+            ]
+            session.add_all(warehouses)
+            session.flush()
+            self.__warehouse_ids = {
+                warehouse.global_id: warehouse.id for warehouse in warehouses
+            }
+
+    def test_find_ids(self):
+        with self.__db_context.session() as session:
+            registry = create_warehouse_registry(session)
+            self.assertDictEqual(
+                self.__warehouse_ids, registry.find_ids(self.__marketplace_id)
+            )
+            self.assertEqual(
+                self.__warehouse_ids[101], registry.find_id(self.__marketplace_id, 101)
+            )
+            self.assertIsNone(registry.find_id(self.__marketplace_id, 1))
+
+    def test_find_by_id(self):
+        with self.__db_context.session() as session:
+            warehouse_id = self.__warehouse_ids[102]
+            expected = WarehouseTableToJormMapper().map(
+                session.execute(
+                    select(Warehouse).where(Warehouse.id == warehouse_id)
+                ).scalar_one()
+            )
+            registry = create_warehouse_registry(session)
+            self.assertEqual(expected, registry.find_by_id(warehouse_id))
+            self.assertIsNone(registry.find_by_id(warehouse_id + 100))
+
+    def test_filter_existing_global_ids(self):
+        with self.__db_context.session() as session:
+            registry = create_warehouse_registry(session)
+            self.assertCountEqual(
+                [1, 2],
+                registry.filter_existing_global_ids(
+                    self.__marketplace_id, [1, 2, 100, 101]
+                ),
+            )
+
+    def test_loads_marketplace_once(self):
+        with self.__db_context.session() as session:
+            registry = create_warehouse_registry(session)
+            registry.find_ids(self.__marketplace_id)
+            session.add(
+                WarehouseRegistryTest.__create_warehouse(self.__marketplace_id, 200)
+            )
+            session.flush()
+            self.assertIsNone(registry.find_id(self.__marketplace_id, 200))
+
+    def test_coherent_with_warehouse_service(self):
+        warehouse_entity = WarehouseEntity(
+            "new_warehouse",
+            200,
+            HandlerType.CLIENT,
+            AddressEntity("region_name", "street_name"),
+        )
+        with self.__db_context.session() as session, session.begin():
+            registry = create_warehouse_registry(session)
+            service = create_warehouse_service(session, registry=registry)
+            registry.find_ids(self.__marketplace_id)
+            service.create_warehouse(warehouse_entity, self.__marketplace_id)
+            warehouse_id = session.execute(
+                select(Warehouse.id).where(Warehouse.global_id == 200)
+            ).scalar_one()
+            self.assertEqual(warehouse_id, registry.find_id(self.__marketplace_id, 200))
+            self.assertEqual(
+                (warehouse_id, warehouse_entity),
+                service.find_by_global_id(self.__marketplace_id, 200),
+            )
+
+    def test_cleared_on_rollback(self):
+        with self.__db_context.session() as session:
+            registry = create_warehouse_registry(session)
+            service = create_warehouse_service(session, registry=registry)
+            registry.find_ids(self.__marketplace_id)
+            service.create_warehouse(
+                WarehouseEntity(
+                    "new_warehouse",
+                    200,
+                    HandlerType.CLIENT,
+                    AddressEntity("region_name", "street_name"),
+                ),
+                self.__marketplace_id,
+            )
+            session.rollback()
+            self.assertIsNone(registry.find_id(self.__marketplace_id, 200))
+
+    def test_shared_within_session(self):
+        with self.__db_context.session() as session:
+            registry = create_warehouse_registry(session)
+            self.assertIs(registry, create_warehouse_registry(session))
+        with self.__db_context.session() as session:
+            self.assertIsNot(registry, create_warehouse_registry(session))
+
+    def test_cleared_on_savepoint_rollback(self):
+        with self.__db_context.session() as session, session.begin():
+            registry = create_warehouse_registry(session)
+            service = create_warehouse_service(session, registry=registry)
+            registry.find_ids(self.__marketplace_id)
+            with self.assertRaises(ValueError):
+                with session.begin_nested():
+                    service.create_warehouse(
+                        WarehouseEntity(
+                            "new_warehouse",
+                            200,
+                            HandlerType.CLIENT,
+                            AddressEntity("region_name", "street_name"),
+                        ),
+                        self.__marketplace_id,
+                    )
+                    raise ValueError()
+            self.assertIsNone(registry.find_id(self.__marketplace_id, 200))
+            self.assertDictEqual(
+                self.__warehouse_ids, registry.find_ids(self.__marketplace_id)
+            )
+
+    @staticmethod
+    def __create_warehouse(marketplace_id: int, global_id: int) -> Warehouse:
+        return Warehouse(
+            marketplace_id=marketplace_id,
+            global_id=global_id,
+            type=0,
+            name=f"warehouse_{global_id}",
+            main_coefficient=100,
+            address=Address(country="", region="", street="", number="", corpus=""),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,13 @@ from jorm.market.infrastructure import Address as AddressEntity
 from jorm.market.infrastructure import HandlerType
 from jorm.market.infrastructure import Warehouse as WarehouseEntity
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-from jarvis_db.factories.services import create_warehouse_service
+from jarvis_db.factories.caches import create_metadata_cache
+from jarvis_db.factories.services import (
+    create_warehouse_registry,
+    create_warehouse_service,
+)
 from jarvis_db.market.infrastructure.warehouse.warehouse_mappers import (
     WarehouseTableToJormMapper,
 )
@@ -255,6 +260,141 @@ class WarehouseServiceTest(unittest.TestCase):
             filtered_ids = service.filter_existing_global_ids(ids_to_filter)
             self.assertEqual(sorted(new_ids), sorted(filtered_ids))
 
+    def test_ensure_all_creates_missing_warehouses(self):
+        with self.__db_context.session() as session, session.begin():
+            existing = Warehouse(
+                marketplace_id=self.__marketplace_id,
+                global_id=100,
+                type=1,
+                name="warehouse_100",
+                address=Address(country="", region="", street="", number="", corpus=""),
+                main_coefficient=100,
+            )
+            session.add(existing)
+            session.flush()
+            existing_id = existing.id
+        warehouses = [
+            WarehouseEntity(
+                f"warehouse_{global_id}",
+                global_id,
+                HandlerType.MARKETPLACE,
+                AddressEntity(f"region_{global_id}", f"street_{global_id}"),
+            )
+            for global_id in (100, 200, 300, 200)
+        ]
+        with self.__db_context.session() as session, session.begin():
+            service = create_warehouse_service(session)
+            global_id_to_id = service.ensure_all(warehouses, self.__marketplace_id)
+        self.assertEqual({100, 200, 300}, global_id_to_id.keys())
+        self.assertEqual(existing_id, global_id_to_id[100])
+        with self.__db_context.session() as session:
+            created = (
+                session.execute(
+                    select(Warehouse)
+                    .where(Warehouse.global_id.in_([200, 300]))
+                    .options(joinedload(Warehouse.address))
+                )
+                .scalars()
+                .all()
+            )
+            self.assertEqual(
+                {200: global_id_to_id[200], 300: global_id_to_id[300]},
+                {warehouse.global_id: warehouse.id for warehouse in created},
+            )
+            self.assertEqual(
+                {"region_200", "region_300"},
+                {warehouse.address.region for warehouse in created},
+            )
+            self.assertEqual(
+                3, len(session.execute(select(Address.id)).scalars().all())
+            )
+
+    def test_ensure_all_is_idempotent(self):
+        warehouses = [
+            WarehouseEntity(
+                f"warehouse_{global_id}",
+                global_id,
+                HandlerType.MARKETPLACE,
+                AddressEntity("", ""),
+            )
+            for global_id in range(10)
+        ]
+        with self.__db_context.session() as session, session.begin():
+            first = create_warehouse_service(session).ensure_all(
+                warehouses, self.__marketplace_id
+            )
+        with self.__db_context.session() as session, session.begin():
+            registry = create_warehouse_registry(session)
+            second = create_warehouse_service(session, registry=registry).ensure_all(
+                warehouses, self.__marketplace_id
+            )
+        self.assertEqual(first, second)
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                10, len(session.execute(select(Warehouse.id)).scalars().all())
+            )
+            self.assertEqual(
+                10, len(session.execute(select(Address.id)).scalars().all())
+            )
+
+    def test_ensure_all_resolves_warehouses_missing_from_registry(self):
+        with self.__db_context.session() as session, session.begin():
+            registry = create_warehouse_registry(session)
+            self.assertEqual({}, registry.find_ids(self.__marketplace_id))
+            warehouse = Warehouse(
+                marketplace_id=self.__marketplace_id,
+                global_id=100,
+                type=0,
+                name="warehouse_100",
+                address=Address(country="", region="", street="", number="", corpus=""),
+                main_coefficient=100,
+            )
+            session.add(warehouse)
+            session.flush()
+            global_id_to_id = create_warehouse_service(
+                session, registry=registry
+            ).ensure_all(
+                [
+                    WarehouseEntity(
+                        "warehouse_100",
+                        100,
+                        HandlerType.MARKETPLACE,
+                        AddressEntity("", ""),
+                    )
+                ],
+                self.__marketplace_id,
+            )
+            self.assertEqual({100: warehouse.id}, global_id_to_id)
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                1, len(session.execute(select(Address.id)).scalars().all())
+            )
+
+    def test_find_all_warehouses_cached_until_create(self):
+        cache = create_metadata_cache()
+        warehouse_entity = WarehouseEntity(
+            "warehouse_1",
+            200,
+            HandlerType.CLIENT,
+            AddressEntity("region_name", "street_name"),
+        )
+        with self.__db_context.session() as session:
+            service = create_warehouse_service(session, cache=cache)
+            self.assertDictEqual({}, service.find_all_warehouses(self.__marketplace_id))
+            self.assertDictEqual({}, service.find_all_warehouses(self.__marketplace_id))
+        with self.__db_context.session() as session, session.begin():
+            service = create_warehouse_service(session, cache=cache)
+            service.create_all([warehouse_entity], self.__marketplace_id)
+        with self.__db_context.session() as session:
+            service = create_warehouse_service(session, cache=cache)
+            actual_warehouses = service.find_all_warehouses(self.__marketplace_id)
+            self.assertEqual(
+                ["warehouse_1"],
+                [warehouse.name for warehouse in actual_warehouses.values()],
+            )
+        self.assertEqual(2, cache.stats.misses)
+        self.assertEqual(1, cache.stats.hits)
+
 
 if __name__ == "__main__":
     unittest.main()
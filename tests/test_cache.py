@@ -0,0 +1,132 @@
+import unittest
+from typing import Hashable
+
+from jarvis_db.core.cache import (
+    CacheStats,
+    LocalSharedCacheBackend,
+    LruCacheBackend,
+    TwoLevelCache,
+)
+from tests.db_context import DbContext
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _RecordingBackend(LruCacheBackend):
+    def __init__(self):
+        super().__init__()
+        self.deleted: list[Hashable] = []
+
+    def delete(self, key: Hashable) -> None:
+        self.deleted.append(key)
+        super().delete(key)
+
+
+class LruCacheBackendTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        backend = LruCacheBackend(max_size=2)
+        backend.set("a", 1, 10)
+        backend.set("b", 2, 10)
+        backend.get("a")
+        backend.set("c", 3, 10)
+        self.assertEqual((True, 1), backend.get("a"))
+        self.assertEqual((False, None), backend.get("b"))
+        self.assertEqual((True, 3), backend.get("c"))
+
+    def test_expires_entries(self):
+        clock = _FakeClock()
+        backend = LruCacheBackend(clock=clock)
+        backend.set("a", 1, 10)
+        clock.now = 9
+        self.assertEqual((True, 1), backend.get("a"))
+        clock.now = 10
+        self.assertEqual((False, None), backend.get("a"))
+
+
+class LocalSharedCacheBackendTest(unittest.TestCase):
+    def test_stores_copies(self):
+        backend = LocalSharedCacheBackend()
+        value = {"a": [1, 2]}
+        backend.set(("key", 1), value, 10)
+        value["a"].append(3)
+        self.assertEqual((True, {"a": [1, 2]}), backend.get(("key", 1)))
+
+    def test_expires_entries(self):
+        clock = _FakeClock()
+        backend = LocalSharedCacheBackend(clock)
+        backend.set("a", 1, 10)
+        clock.now = 10
+        self.assertEqual((False, None), backend.get("a"))
+
+
+class TwoLevelCacheTest(unittest.TestCase):
+    def test_loads_once(self):
+        cache = TwoLevelCache(LruCacheBackend())
+        loads = []
+        for _ in range(3):
+            value = cache.get_or_load("key", lambda: loads.append(1) or "value")
+            self.assertEqual("value", value)
+        self.assertEqual(1, len(loads))
+        self.assertEqual(CacheStats(local_hits=2, misses=1), cache.stats)
+
+    def test_promotes_shared_entries(self):
+        shared_backend = LocalSharedCacheBackend()
+        first_cache = TwoLevelCache(LruCacheBackend(), shared_backend)
+        second_cache = TwoLevelCache(LruCacheBackend(), shared_backend)
+        first_cache.get_or_load("key", lambda: "value")
+        self.assertEqual("value", second_cache.get_or_load("key", lambda: "other"))
+        self.assertEqual("value", second_cache.get_or_load("key", lambda: "other"))
+        self.assertEqual(CacheStats(local_hits=1, shared_hits=1), second_cache.stats)
+
+    def test_returns_copies(self):
+        shared_backend = LocalSharedCacheBackend()
+        cache = TwoLevelCache(LruCacheBackend(), shared_backend)
+        loaded = cache.get_or_load("key", lambda: {"a": [1, 2]})
+        loaded["a"].append(3)
+        cached = cache.get_or_load("key", lambda: {})
+        cached["a"].append(4)
+        self.assertEqual({"a": [1, 2]}, cache.get_or_load("key", lambda: {}))
+        promoted = TwoLevelCache(LruCacheBackend(), shared_backend).get_or_load(
+            "key", lambda: {}
+        )
+        promoted["a"].append(5)
+        self.assertEqual({"a": [1, 2]}, shared_backend.get("key")[1])
+
+    def test_invalidate(self):
+        shared_backend = LocalSharedCacheBackend()
+        cache = TwoLevelCache(LruCacheBackend(), shared_backend)
+        cache.get_or_load("key", lambda: "value")
+        cache.invalidate("key")
+        self.assertEqual("new_value", cache.get_or_load("key", lambda: "new_value"))
+        self.assertEqual(2, cache.stats.misses)
+
+    def test_invalidate_in_transaction(self):
+        backend = _RecordingBackend()
+        cache = TwoLevelCache(backend)
+        with DbContext().session() as session:
+            with session.begin():
+                for key in ("first", "second", "first"):
+                    cache.invalidate_in_transaction(session, key)
+            self.assertEqual(["first", "second", "first"], backend.deleted[:3])
+            self.assertEqual(["first", "second"], sorted(backend.deleted[3:]))
+            backend.deleted.clear()
+            session.begin()
+            cache.invalidate_in_transaction(session, "third")
+            session.rollback()
+            self.assertEqual(["third", "third"], backend.deleted)
+
+    def test_reset_stats(self):
+        cache = TwoLevelCache(LruCacheBackend())
+        cache.get_or_load("key", lambda: "value")
+        cache.reset_stats()
+        self.assertEqual(CacheStats(), cache.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
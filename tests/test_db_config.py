@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from jarvis_db import db_config
+from jarvis_db.db_config import DbSettings, create_db_engine, create_session_factory
+
+
+class DbConfigTest(unittest.TestCase):
+    def tearDown(self):
+        db_config.configure(DbSettings())
+
+    def test_sqlite_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_db_engine(
+                DbSettings(
+                    url=f"sqlite:///{os.path.join(directory, 'jarvis.db')}",
+                    sqlite_journal_mode="WAL",
+                    sqlite_synchronous="NORMAL",
+                    sqlite_foreign_keys=True,
+                )
+            )
+            with create_session_factory(engine)() as session:
+                self.assertEqual(
+                    "wal", session.execute(text("PRAGMA journal_mode")).scalar_one()
+                )
+                self.assertEqual(
+                    1, session.execute(text("PRAGMA synchronous")).scalar_one()
+                )
+                self.assertEqual(
+                    1, session.execute(text("PRAGMA foreign_keys")).scalar_one()
+                )
+            engine.dispose()
+
+    def test_engine_options(self):
+        engine = create_db_engine(DbSettings(insertmanyvalues_page_size=50))
+        self.assertEqual(50, engine.dialect.insertmanyvalues_page_size)
+
+    def test_lazy_initialization(self):
+        settings = DbSettings(url="sqlite://", insertmanyvalues_page_size=10)
+        db_config.configure(settings)
+        engine = db_config.get_engine()
+        self.assertIs(engine, db_config.engine)
+        self.assertIs(db_config.get_session_factory(), db_config.session)
+        self.assertEqual(10, engine.dialect.insertmanyvalues_page_size)
+        db_config.configure(DbSettings())
+        self.assertIsNot(engine, db_config.get_engine())
+
+    def test_concurrent_lazy_initialization(self):
+        db_config.configure(DbSettings(url="sqlite://"))
+        barrier = threading.Barrier(8)
+
+        def get_session_factory():
+            barrier.wait()
+            return db_config.get_session_factory()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            factories = list(executor.map(lambda _: get_session_factory(), range(8)))
+        self.assertEqual(1, len({id(factory) for factory in factories}))
+        self.assertIs(db_config.get_engine(), factories[0].kw["bind"])
+
+    def test_async_support_is_imported_lazily(self):
+        script = (
+            "import sys\n"
+            "import jarvis_db.db_config, jarvis_db.factories.collectors\n"
+            "sys.exit('sqlalchemy.ext.asyncio' in sys.modules)\n"
+        )
+        self.assertEqual(0, subprocess.run([sys.executable, "-c", script]).returncode)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import struct
+import unittest
+
+from jarvis_db.cache.green_trade_zone.green_trade_zone_codec import (
+    SEGMENT_DATA_FORMAT_VERSION,
+    GreenZoneSegmentData,
+    decode_segment_data,
+    encode_segment_data,
+)
+
+
+class GreenTradeZoneCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        expected = GreenZoneSegmentData(
+            segments=[(0, 100), (100, 250), (250, 2**40)],
+            segment_profits=[13, -14, 15],
+            mean_segment_profit=[4, 5, 6],
+            mean_product_profit=[1, 2, 3],
+            segment_product_count=[7, 8, 9],
+            segment_product_with_trades_count=[10, 11, 12],
+        )
+        actual = decode_segment_data(encode_segment_data(expected))
+        self.assertEqual(expected, actual)
+        self.assertEqual(expected.model_dump(), actual.model_dump())
+
+    def test_round_trip_empty(self):
+        expected = GreenZoneSegmentData(
+            segments=[],
+            segment_profits=[],
+            mean_segment_profit=[],
+            mean_product_profit=[],
+            segment_product_count=[],
+            segment_product_with_trades_count=[],
+        )
+        self.assertEqual(expected, decode_segment_data(encode_segment_data(expected)))
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            decode_segment_data(b'{"segments": []}')
+
+    def test_rejects_unsupported_version(self):
+        data = struct.pack("<4sB", b"GZSD", SEGMENT_DATA_FORMAT_VERSION + 1)
+        with self.assertRaises(ValueError):
+            decode_segment_data(data)
+
+    def test_rejects_truncated_data(self):
+        data = encode_segment_data(
+            GreenZoneSegmentData(
+                segments=[(1, 2)],
+                segment_profits=[3],
+                mean_segment_profit=[4],
+                mean_product_profit=[5],
+                segment_product_count=[6],
+                segment_product_with_trades_count=[7],
+            )
+        )
+        for size in (len(data) - 4, 7):
+            with self.assertRaises(ValueError):
+                decode_segment_data(data[:size])
+
+
+if __name__ == "__main__":
+    unittest.main()
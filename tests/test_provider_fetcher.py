@@ -0,0 +1,131 @@
+import threading
+import time
+import unittest
+
+from jarvis_db.access.fill.provider_fetcher import (
+    FetchPolicy,
+    ProviderFetcher,
+    ProviderFetchError,
+)
+
+
+class ProviderFetcherTest(unittest.TestCase):
+    def test_map_returns_all_results(self):
+        fetcher = ProviderFetcher(FetchPolicy(max_workers=4, retry_delay=0))
+        results = dict(fetcher.map(lambda value: value * 2, range(20)))
+        self.assertEqual({value: value * 2 for value in range(20)}, results)
+
+    def test_map_bounds_concurrency(self):
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        def call(value: int) -> int:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return value
+
+        fetcher = ProviderFetcher(FetchPolicy(max_workers=3, retry_delay=0))
+        self.assertEqual(12, len(list(fetcher.map(call, range(12)))))
+        self.assertLessEqual(max_running, 3)
+        self.assertGreater(max_running, 1)
+
+    def test_map_limits_pending_calls(self):
+        started: list[int] = []
+        fetcher = ProviderFetcher(
+            FetchPolicy(max_workers=4, max_pending=2, retry_delay=0)
+        )
+        results = fetcher.map(lambda value: started.append(value) or value, range(10))
+        first_value, _ = next(results)
+        time.sleep(0.05)
+        self.assertLessEqual(len(started), 3)
+        self.assertEqual(
+            list(range(10)), sorted([first_value, *(value for value, _ in results)])
+        )
+
+    def test_map_retries_failed_calls(self):
+        attempts: dict[int, int] = {}
+        lock = threading.Lock()
+
+        def call(value: int) -> int:
+            with lock:
+                attempts[value] = attempts.get(value, 0) + 1
+                attempt = attempts[value]
+            if value % 2 == 0 and attempt < 3:
+                raise ConnectionError("temporary failure")
+            return value
+
+        fetcher = ProviderFetcher(FetchPolicy(retries=2, retry_delay=0))
+        self.assertEqual(list(range(6)), sorted(dict(fetcher.map(call, range(6)))))
+        self.assertEqual({0: 3, 1: 1, 2: 3, 3: 1, 4: 3, 5: 1}, attempts)
+
+    def test_map_raises_when_retries_are_exhausted(self):
+        def call(value: int) -> int:
+            raise ConnectionError("permanent failure")
+
+        fetcher = ProviderFetcher(FetchPolicy(retries=1, retry_delay=0))
+        with self.assertRaises(ProviderFetchError) as context:
+            list(fetcher.map(call, range(3)))
+        self.assertIsInstance(context.exception.__cause__, ConnectionError)
+
+    def test_map_retries_timed_out_calls(self):
+        attempts: list[int] = []
+        release = threading.Event()
+        first_finished = threading.Event()
+
+        def call(value: int) -> int:
+            attempts.append(value)
+            if len(attempts) == 1:
+                release.wait(5)
+                first_finished.set()
+            return value
+
+        fetcher = ProviderFetcher(
+            FetchPolicy(max_workers=2, timeout=0.1, retries=1, retry_delay=0)
+        )
+        try:
+            self.assertEqual([(1, 1)], list(fetcher.map(call, [1])))
+            self.assertFalse(first_finished.is_set())
+        finally:
+            release.set()
+        self.assertEqual([1, 1], attempts)
+
+    def test_map_raises_when_all_workers_hang(self):
+        release = threading.Event()
+        errors: list[BaseException] = []
+
+        def fetch():
+            fetcher = ProviderFetcher(
+                FetchPolicy(max_workers=2, timeout=0.1, retries=1, retry_delay=0)
+            )
+            try:
+                list(fetcher.map(lambda value: release.wait(5), range(4)))
+            except ProviderFetchError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=fetch)
+        try:
+            thread.start()
+            thread.join(2)
+            self.assertFalse(thread.is_alive())
+        finally:
+            release.set()
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0].__cause__, TimeoutError)
+
+    def test_map_batches_splits_items(self):
+        fetcher = ProviderFetcher(FetchPolicy(batch_size=4, retry_delay=0))
+        batches = list(fetcher.map_batches(list, range(10)))
+        self.assertEqual(
+            [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]],
+            sorted(batches, key=lambda batch: batch[0]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
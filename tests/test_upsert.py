@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from jarvis_db.core.upsert import upsert
+from jarvis_db.schemas import Marketplace, ProductCard
+from tests.db_context import DbContext
+
+
+class UpsertTest(unittest.TestCase):
+    def setUp(self):
+        self.__db_context = DbContext()
+        with self.__db_context.session() as session, session.begin():
+            marketplace = Marketplace(name="marketplace")
+            session.add(marketplace)
+            session.flush()
+            self.__marketplace_id = marketplace.id
+
+    def test_native(self):
+        self.__check_upsert()
+
+    def test_emulated_for_other_dialects(self):
+        with self.__db_context.session() as session:
+            dialect = session.get_bind().dialect
+        with patch.object(dialect, "name", "other"):
+            self.__check_upsert()
+
+    def __check_upsert(self):
+        def card(global_id: int, name: str, marketplace_id: int | None) -> dict:
+            return {
+                "name": name,
+                "global_id": global_id,
+                "marketplace_id": marketplace_id,
+                "cost": 1,
+                "rating": 1,
+                "brand": "brand",
+                "seller": "seller",
+            }
+
+        key = [ProductCard.marketplace_id, ProductCard.global_id]
+        returning = [ProductCard.global_id, ProductCard.id]
+        with self.__db_context.session() as session, session.begin():
+            created = dict(
+                upsert(
+                    session,
+                    ProductCard,
+                    [card(i, "old", self.__marketplace_id) for i in range(3)],
+                    key,
+                    update_columns=["name"],
+                    returning=returning,
+                )
+            )
+            updated = dict(
+                upsert(
+                    session,
+                    ProductCard,
+                    [card(i, "new", self.__marketplace_id) for i in range(2, 5)],
+                    key,
+                    update_columns=["name"],
+                    returning=returning,
+                )
+            )
+            ignored = dict(
+                upsert(
+                    session,
+                    ProductCard,
+                    [card(i, "ignored", self.__marketplace_id) for i in range(4, 6)],
+                    key,
+                    returning=returning,
+                )
+            )
+            without_marketplace = [
+                dict(
+                    upsert(
+                        session,
+                        ProductCard,
+                        [card(0, name, None)],
+                        [ProductCard.global_id],
+                        update_columns=["name"],
+                        index_where=ProductCard.marketplace_id.is_(None),
+                        returning=returning,
+                    )
+                )
+                for name in ("first", "second")
+            ]
+        self.assertEqual([0, 1, 2], sorted(created))
+        self.assertEqual([2, 3, 4], sorted(updated))
+        self.assertEqual(created[2], updated[2])
+        self.assertEqual([5], list(ignored))
+        self.assertEqual(without_marketplace[0], without_marketplace[1])
+        with self.__db_context.session() as session:
+            self.assertEqual(
+                [
+                    (0, "old"),
+                    (1, "old"),
+                    (2, "new"),
+                    (3, "new"),
+                    (4, "new"),
+                    (5, "ignored"),
+                    (0, "second"),
+                ],
+                session.execute(
+                    select(ProductCard.global_id, ProductCard.name).order_by(
+                        ProductCard.marketplace_id.is_(None), ProductCard.global_id
+                    )
+                ).all(),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()